@@ -0,0 +1,156 @@
+"""
+On-disk store of the large payloads of step records, such as base64 screenshots.
+
+Results of the Playwright service can carry multi-megabyte payloads per step.
+Payloads over a size limit (the values of known payload keys, see PAYLOAD_KEYS,
+and data URLs or base64 blobs under any other key) are written to a file under
+the artifacts directory of the run's output directory, and replaced in the step
+record by a reference holding the file path, its size and content hash.
+Diagnostic text (see step_results.TEXT_KEYS) always stays in the record, so
+reports and failure context can quote it. Base64 payloads are decoded to their
+binary content in bounded chunks, so the artifact can be opened directly and no
+decoded copy of the whole payload is held in memory. Identical payloads are
+stored once.
+"""
+
+import base64
+import hashlib
+import os
+import re
+import tempfile
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from step_results import TEXT_KEYS, get_step_results, with_step_results
+
+# Artifact defaults
+DEFAULT_ARTIFACT_MIN_BYTES = 1024          # Payloads at least this large are stored as artifacts
+ARTIFACT_DIRNAME = "artifacts"             # Subdirectory of the run's output directory
+CHUNK_CHARS = 64 * 1024                    # Characters decoded or encoded at a time, a multiple of 4
+
+_BASE64 = re.compile(r"[A-Za-z0-9+/]*={0,2}")
+_DATA_URL = re.compile(r"data:([\w.+-]+/[\w.+-]+);base64,")
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9_-]+")
+
+# File extensions by leading bytes and by MIME type
+MAGIC_EXTENSIONS = ((b"\x89PNG", ".png"), (b"\xff\xd8\xff", ".jpg"), (b"GIF8", ".gif"), (b"%PDF", ".pdf"), (b"PK\x03\x04", ".zip"))
+MIME_EXTENSIONS = {"image/png": ".png", "image/jpeg": ".jpg", "image/gif": ".gif", "image/webp": ".webp", "application/pdf": ".pdf"}
+
+# Keys of step records whose values are payloads rather than diagnostics
+PAYLOAD_KEYS = ("screenshot", "image", "video", "html", "trace")
+
+
+def _is_base64(value: str, start: int = 0) -> bool:
+    # Check the whole payload up front, chunks of a multiple of 4 characters then always decode
+    return (len(value) - start) % 4 == 0 and _BASE64.fullmatch(value, start) is not None
+
+
+def is_payload(key: str, value: str) -> bool:
+    """Whether a string value of a step record is a payload, diagnostic text never is."""
+    if key in TEXT_KEYS:
+        return False
+    return key in PAYLOAD_KEYS or _DATA_URL.match(value) is not None or _is_base64(value)
+
+
+def _split_payload(name: str, value: str) -> Tuple[int, Optional[str], bool]:
+    """Find where the content of a payload starts, its MIME type and whether it is base64.
+
+    Only data URLs and payloads (see is_payload) are decoded, any other text is stored as is.
+    """
+    match = _DATA_URL.match(value)
+    if match is None and not is_payload(name, value):
+        return 0, None, False
+    start, mime = (match.end(), match.group(1)) if match else (0, None)
+    is_base64 = _is_base64(value, start)
+    return start, mime if is_base64 else None, is_base64
+
+
+def _iter_payload(value: str, start: int, is_base64: bool) -> Iterator[bytes]:
+    for offset in range(start, len(value), CHUNK_CHARS):
+        chunk = value[offset:offset + CHUNK_CHARS]
+        yield base64.b64decode(chunk) if is_base64 else chunk.encode("utf-8")
+
+
+class ArtifactStore:
+    """Artifacts directory of one run.
+
+    Args:
+        output_dir: Output directory of the run, artifact references are relative to it
+        min_bytes: Smallest string value stored as an artifact
+    """
+
+    def __init__(self, output_dir: str, min_bytes: int = DEFAULT_ARTIFACT_MIN_BYTES):
+        self.output_dir = output_dir
+        self.artifact_dir = os.path.join(output_dir, ARTIFACT_DIRNAME)
+        self.min_bytes = min_bytes
+        self.stored = 0
+        self.deduplicated = 0
+        self.bytes_stored = 0
+
+    def path(self, reference: Dict[str, Any]) -> str:
+        """Return the file path of an artifact reference."""
+        return os.path.join(self.output_dir, reference["artifact"])
+
+    def store(self, name: str, value: str) -> Dict[str, Any]:
+        """Write a payload to the artifacts directory.
+
+        Args:
+            name: Name hint of the payload, usually the key of the step record
+            value: Payload, base64 payloads and data URLs are stored decoded, plain text as is
+
+        Returns:
+            The reference replacing the payload in the step record
+        """
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        start, mime, is_base64 = _split_payload(name, value)
+        digest = hashlib.sha256()
+        size = 0
+        extension = MIME_EXTENSIONS.get(mime, ".bin") if mime else (".bin" if is_base64 else ".txt")
+        fd, tmp_path = tempfile.mkstemp(dir=self.artifact_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in _iter_payload(value, start, is_base64):
+                    if size == 0 and is_base64 and mime is None:
+                        extension = next((ext for magic, ext in MAGIC_EXTENSIONS if chunk.startswith(magic)), extension)
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            filename = f"{_UNSAFE_NAME.sub('_', name)[:40] or 'payload'}-{digest.hexdigest()[:16]}{extension}"
+            path = os.path.join(self.artifact_dir, filename)
+            if os.path.exists(path):
+                # Identical payloads are stored once
+                os.remove(tmp_path)
+                self.deduplicated += 1
+            else:
+                os.replace(tmp_path, path)
+                self.stored += 1
+                self.bytes_stored += size
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        return {"artifact": os.path.join(ARTIFACT_DIRNAME, filename), "bytes": size, "sha256": digest.hexdigest()}
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def externalize_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Return a copy of a step record with its large payloads stored as artifacts, diagnostic text is kept."""
+        return {
+            key: self.store(key, value) if isinstance(value, str) and len(value) >= self.min_bytes and is_payload(key, value) else value
+            for key, value in record.items()
+        }
+
+    def externalize_results(self, results: Any) -> Any:
+        """Return a copy of results with the large payloads of its step records and of the results stored as artifacts."""
+        if not isinstance(results, dict):
+            return results
+        records = get_step_results(results)
+        results = self.externalize_record(results)
+        if not records:
+            return results
+        return with_step_results(results, [self.externalize_record(record) for record in records])
+
+    def stats(self) -> Dict[str, Any]:
+        return {"stored": self.stored, "deduplicated": self.deduplicated, "bytes_stored": self.bytes_stored}
@@ -0,0 +1,539 @@
+"""
+Hermetic benchmark of the test pipeline.
+
+Runs the job orchestration of run_test_on_website (run_test_job) end to end
+against a local StubPlaywrightService and a deterministic fake LLM, so no
+browser, MCP server, network or API key is needed. Latency and payload sizes of
+both stubs are configurable.
+
+The benchmark reports:
+- per-stage latency percentiles (fetch, plan, execute, analysis, the local
+  pipeline overhead and the whole job) across page sizes and plan lengths, and
+  for a plan with failing steps, whose analysis asks the LLM to explain them
+- peak Python memory of a single job for every page size and plan length
+- throughput and peak Python memory at different concurrency levels
+
+Results are written to a JSON baseline file that can be compared between commits:
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --output current.json --compare baseline.json
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Awaitable, Dict, List, Sequence
+
+import httpx
+
+from main import DEFAULT_LLM_PROVIDER, RunContext, run_test_job
+from run_metrics import percentile
+from stub_playwright import StubPlaywrightService
+
+# Benchmark defaults
+DEFAULT_PAGE_SIZES = (10_000, 100_000, 1_000_000, 5_000_000)   # Page source sizes in bytes
+DEFAULT_PLAN_LENGTHS = (5, 50, 200)                            # Steps per generated test plan
+DEFAULT_CONCURRENCY_LEVELS = (1, 4, 16)                        # Jobs running at the same time
+DEFAULT_ITERATIONS = 5                                         # Jobs per scenario (and per concurrency level)
+DEFAULT_THROUGHPUT_PAGE_SIZE = 100_000                         # Page size of the throughput runs
+DEFAULT_THROUGHPUT_PLAN_LENGTH = 20                            # Plan length of the throughput runs
+DEFAULT_FAILING_STEPS = (5,)                                   # Steps failed by the stub in the failure scenario
+DEFAULT_REGRESSION_THRESHOLD = 0.2                             # Relative change reported as a regression
+
+STAGES = ("fetch", "plan", "execute", "analysis", "overhead", "total")
+HTTP_STAGES = {"/navigate": "fetch", "/execute": "execute"}
+
+# Stage timings of the job running in the current task
+_current_timings: contextvars.ContextVar = contextvars.ContextVar("benchmark_timings")
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Add the duration of a stage to the timings of the current job."""
+    timings = _current_timings.get(None)
+    if timings is not None:
+        timings[stage] += seconds
+
+
+class QuietLogger:
+    """Logger accepting the MCP logger's call signature and discarding everything."""
+
+    def debug(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    info = warning = error = debug
+
+
+def make_page_source(size_bytes: int) -> str:
+    """Build a page of about size_bytes with the calculator used by the benchmark plans.
+
+    Args:
+        size_bytes: Approximate size of the page source
+
+    Returns:
+        The page source HTML
+    """
+    head = (
+        '<html><head><title>Benchmark</title><style>.row { display: flex; }</style></head><body>\n'
+        '<div class="display">0</div>\n'
+        '<button id="one">1</button><button id="plus">+</button>'
+        '<button id="equals">=</button><button id="clear">C</button>\n'
+    )
+    rows = []
+    size = len(head)
+    index = 0
+    while size < size_bytes:
+        row = (
+            f'<div class="row row-{index}"><span>Item {index}</span>'
+            f'<a href="/items/{index}">Open</a><input name="qty-{index}" type="number"></div>\n'
+        )
+        if index % 10 == 0:
+            row += f'<script>window.items = (window.items || []).concat([{index}]);</script>\n'
+        rows.append(row)
+        size += len(row)
+        index += 1
+    return head + "".join(rows) + "</body></html>"
+
+
+def make_test_plan(url: str, plan_length: int) -> Dict[str, Any]:
+    """Build a test plan of plan_length steps for the benchmark page.
+
+    Args:
+        url: Target website URL
+        plan_length: Number of steps in the plan
+
+    Returns:
+        A test plan in the format generated by the LLM
+    """
+    cycle = [
+        {"action": "click", "selector": "#one"},
+        {"action": "click", "selector": "#plus"},
+        {"action": "click", "selector": "#one"},
+        {"action": "click", "selector": "#equals"},
+        {"action": "check", "selector": ".display", "value": "2"},
+        {"action": "screenshot"},
+        {"action": "click", "selector": "#clear"},
+    ]
+    steps = [{"action": "navigate", "value": url}]
+    while len(steps) < plan_length:
+        steps.append(dict(cycle[(len(steps) - 1) % len(cycle)]))
+    return {"url": url, "test_plan": {"description": "Benchmark calculator addition", "steps": steps[:plan_length]}}
+
+
+class FakeLLM:
+    """Deterministic stand-in for an AugmentedLLM.
+
+    Answers planning prompts with a plan of the configured length and every other
+    prompt with an analysis of the configured size, after the configured latency.
+    """
+
+    def __init__(self, plan_length: int, latency: float = 0.0, analysis_bytes: int = 2000):
+        self.plan_length = plan_length
+        self.latency = latency
+        self.analysis_bytes = analysis_bytes
+
+    async def generate_str(self, message: str, **kwargs: Any) -> str:
+        start = time.perf_counter()
+        await asyncio.sleep(self.latency)
+        match = re.match(r"\s*Create a test plan for (\S+)", message)
+        if match:
+            response = json.dumps(make_test_plan(match.group(1), self.plan_length))
+            record_stage("plan", time.perf_counter() - start)
+        else:
+            # Failure explanations are timed as part of the analysis stage of the job
+            response = "# Test analysis\n\n" + "Step failed. " * (self.analysis_bytes // 13)
+        return response
+
+
+class FakeAgent:
+    """Stand-in for the test agent, attaching a FakeLLM for every job."""
+
+    def __init__(self, plan_length: int, llm_latency: float = 0.0, analysis_bytes: int = 2000):
+        self.plan_length = plan_length
+        self.llm_latency = llm_latency
+        self.analysis_bytes = analysis_bytes
+
+    async def attach_llm(self, llm_class: Any) -> FakeLLM:
+        return FakeLLM(self.plan_length, self.llm_latency, self.analysis_bytes)
+
+
+async def _start_request_timer(request: httpx.Request) -> None:
+    request.extensions["benchmark_start"] = time.perf_counter()
+
+
+async def _stop_request_timer(response: httpx.Response) -> None:
+    stage = HTTP_STAGES.get(response.request.url.path)
+    if stage is None:
+        return
+    # Include reading the body, the hook runs as soon as the headers arrived
+    await response.aread()
+    record_stage(stage, time.perf_counter() - response.request.extensions["benchmark_start"])
+
+
+def summarize_latencies(values: Sequence[float]) -> Dict[str, float]:
+    """Summarize durations in seconds as milliseconds (mean, p50, p90, p99, max)."""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p90_ms": round(percentile(values, 90) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(max(values) * 1000, 3),
+    }
+
+
+async def run_benchmark_job(run_context: RunContext, url: str, playwright_url: str, output_dir: str, **job_options: Any) -> Dict[str, float]:
+    """Run one job and return its stage timings in seconds."""
+    timings: Dict[str, float] = defaultdict(float)
+    _current_timings.set(timings)
+    start = time.perf_counter()
+    result = await run_test_job(
+        run_context, url, "Calculate 1+1 and check the result is 2", playwright_url, output_dir, **job_options
+    )
+    timings["total"] = time.perf_counter() - start
+    if "error" in result:
+        raise RuntimeError(f"Benchmark job failed: {result['error']}")
+    # The local report of passing runs and the LLM explanation of failures
+    timings["analysis"] = result["metrics"]["stages"].get("analysis", 0.0) / 1000
+    # Whatever is not spent waiting on the stubs is local pipeline work
+    timings["overhead"] = max(timings["total"] - sum(timings[stage] for stage in STAGES[:4]), 0.0)
+    return dict(timings)
+
+
+async def run_jobs(
+    stub: StubPlaywrightService,
+    agent: FakeAgent,
+    jobs: int,
+    concurrency: int,
+    output_dir: str,
+    **job_options: Any
+) -> List[Dict[str, float]]:
+    """Run jobs against a stub service with at most concurrency jobs at the same time."""
+    event_hooks = {"request": [_start_request_timer], "response": [_stop_request_timer]}
+    async with httpx.AsyncClient(event_hooks=event_hooks) as client:
+        run_context = RunContext(
+            agent=agent,
+            client=client,
+            logger=QuietLogger(),
+            llm_limiter=asyncio.Semaphore(concurrency),
+            playwright_limiter=asyncio.Semaphore(concurrency)
+        )
+        job_limiter = asyncio.Semaphore(concurrency)
+
+        async def run_bounded(index: int) -> Dict[str, float]:
+            async with job_limiter:
+                return await run_benchmark_job(
+                    run_context, "http://benchmark.local/", stub.url, os.path.join(output_dir, f"job-{index:03d}"),
+                    **job_options
+                )
+
+        return await asyncio.gather(*(run_bounded(index) for index in range(jobs)))
+
+
+async def measure_peak_memory(jobs: Awaitable[Any]) -> int:
+    """Run jobs under tracemalloc and return the peak of the Python memory they allocated."""
+    # Trace memory separately from the timed runs, tracing slows down every allocation
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        await jobs
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+async def benchmark_scenario(
+    page_size: int,
+    plan_length: int,
+    iterations: int,
+    output_dir: str,
+    llm_latency: float = 0.0,
+    navigate_latency: float = 0.0,
+    step_latency: float = 0.0,
+    screenshot_bytes: int = 0,
+    failing_steps: Sequence[int] = (),
+    **job_options: Any
+) -> Dict[str, Any]:
+    """Measure stage latencies and peak memory for one page size and plan length.
+
+    Args:
+        page_size: Page source size in bytes
+        plan_length: Steps per generated test plan
+        iterations: Number of sequential jobs to time
+        output_dir: Directory for the job artifacts
+        llm_latency: Latency of every fake LLM call in seconds
+        navigate_latency: Latency of the stub /navigate endpoint in seconds
+        step_latency: Latency of every executed step in seconds
+        screenshot_bytes: Payload size of every screenshot step
+        failing_steps: Steps (numbered from 1) the stub reports as failed
+        **job_options: Settings passed on to run_test_job
+
+    Returns:
+        Latency percentiles per stage and the peak memory of a single job
+    """
+    agent = FakeAgent(plan_length, llm_latency)
+    stub = StubPlaywrightService(make_page_source(page_size), navigate_latency, step_latency, screenshot_bytes, failing_steps)
+    async with stub:
+        # Warm up connections and caches before timing
+        await run_jobs(stub, agent, 1, 1, output_dir, **job_options)
+        timings = await run_jobs(stub, agent, iterations, 1, output_dir, **job_options)
+
+        peak_memory = await measure_peak_memory(run_jobs(stub, agent, 1, 1, output_dir, **job_options))
+
+    return {
+        "page_size": page_size,
+        "plan_length": plan_length,
+        "failing_steps": list(failing_steps),
+        "stages": {stage: summarize_latencies([timing.get(stage, 0.0) for timing in timings]) for stage in STAGES},
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+async def benchmark_throughput(
+    concurrency: int,
+    jobs: int,
+    output_dir: str,
+    page_size: int = DEFAULT_THROUGHPUT_PAGE_SIZE,
+    plan_length: int = DEFAULT_THROUGHPUT_PLAN_LENGTH,
+    llm_latency: float = 0.0,
+    navigate_latency: float = 0.0,
+    step_latency: float = 0.0,
+    screenshot_bytes: int = 0,
+    **job_options: Any
+) -> Dict[str, Any]:
+    """Measure the job throughput at one concurrency level.
+
+    Args:
+        concurrency: Jobs running at the same time
+        jobs: Number of jobs to run
+        output_dir: Directory for the job artifacts
+        page_size: Page source size in bytes
+        plan_length: Steps per generated test plan
+        llm_latency: Latency of every fake LLM call in seconds
+        navigate_latency: Latency of the stub /navigate endpoint in seconds
+        step_latency: Latency of every executed step in seconds
+        screenshot_bytes: Payload size of every screenshot step
+        **job_options: Settings passed on to run_test_job
+
+    Returns:
+        The wall time, jobs per second, job latency percentiles and the peak memory of
+        one batch of concurrent jobs
+    """
+    agent = FakeAgent(plan_length, llm_latency)
+    stub = StubPlaywrightService(make_page_source(page_size), navigate_latency, step_latency, screenshot_bytes)
+    async with stub:
+        start = time.perf_counter()
+        timings = await run_jobs(stub, agent, jobs, concurrency, output_dir, **job_options)
+        elapsed = time.perf_counter() - start
+        # Payloads held by every running job add up, as in suite runs
+        peak_memory = await measure_peak_memory(run_jobs(stub, agent, concurrency, concurrency, output_dir, **job_options))
+
+    return {
+        "concurrency": concurrency,
+        "jobs": jobs,
+        "seconds": round(elapsed, 4),
+        "jobs_per_second": round(jobs / elapsed, 3) if elapsed else 0.0,
+        "total": summarize_latencies([timing["total"] for timing in timings]),
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+async def run_benchmark(
+    page_sizes: Sequence[int] = DEFAULT_PAGE_SIZES,
+    plan_lengths: Sequence[int] = DEFAULT_PLAN_LENGTHS,
+    concurrency_levels: Sequence[int] = DEFAULT_CONCURRENCY_LEVELS,
+    iterations: int = DEFAULT_ITERATIONS,
+    llm_latency: float = 0.0,
+    navigate_latency: float = 0.0,
+    step_latency: float = 0.0,
+    screenshot_bytes: int = 0,
+    failing_steps: Sequence[int] = DEFAULT_FAILING_STEPS,
+    **job_options: Any
+) -> Dict[str, Any]:
+    """Run every benchmark scenario and throughput level.
+
+    Args:
+        page_sizes: Page source sizes in bytes
+        plan_lengths: Steps per generated test plan
+        concurrency_levels: Jobs running at the same time in the throughput runs
+        iterations: Jobs per scenario, and per concurrency slot in the throughput runs
+        llm_latency: Latency of every fake LLM call in seconds
+        navigate_latency: Latency of the stub /navigate endpoint in seconds
+        step_latency: Latency of every executed step in seconds
+        screenshot_bytes: Payload size of every screenshot step
+        failing_steps: Steps the stub fails in the failure scenario (empty skips the scenario)
+        **job_options: Settings passed on to run_test_job
+
+    Returns:
+        The benchmark results, ready to be written as a baseline
+    """
+    stub_options = {
+        "llm_latency": llm_latency,
+        "navigate_latency": navigate_latency,
+        "step_latency": step_latency,
+        "screenshot_bytes": screenshot_bytes,
+    }
+    job_options.setdefault("llm_provider", DEFAULT_LLM_PROVIDER)
+    results: Dict[str, Any] = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": iterations,
+            **stub_options,
+        },
+        "scenarios": {},
+        "throughput": {},
+    }
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        for page_size in page_sizes:
+            for plan_length in plan_lengths:
+                scenario = await benchmark_scenario(
+                    page_size, plan_length, iterations, output_dir, **stub_options, **job_options
+                )
+                results["scenarios"][f"page={page_size},steps={plan_length}"] = scenario
+
+        if failing_steps:
+            page_size, plan_length = page_sizes[0], max(plan_lengths)
+            scenario = await benchmark_scenario(
+                page_size, plan_length, iterations, output_dir, **stub_options, failing_steps=failing_steps, **job_options
+            )
+            failing = ",".join(str(step) for step in failing_steps)
+            results["scenarios"][f"page={page_size},steps={plan_length},failing={failing}"] = scenario
+
+        for concurrency in concurrency_levels:
+            throughput = await benchmark_throughput(
+                concurrency, concurrency * iterations, output_dir, **stub_options, **job_options
+            )
+            results["throughput"][f"concurrency={concurrency}"] = throughput
+
+    return results
+
+
+def benchmark_metrics(results: Dict[str, Any]) -> Dict[str, tuple]:
+    """Flatten benchmark results into comparable metrics.
+
+    Returns:
+        A mapping of metric name to (value, higher_is_better)
+    """
+    metrics = {}
+    for name, scenario in results.get("scenarios", {}).items():
+        for stage, summary in scenario["stages"].items():
+            if summary.get("count"):
+                metrics[f"{name} {stage} p50_ms"] = (summary["p50_ms"], False)
+                metrics[f"{name} {stage} p90_ms"] = (summary["p90_ms"], False)
+        metrics[f"{name} peak_memory_bytes"] = (scenario["peak_memory_bytes"], False)
+    for name, throughput in results.get("throughput", {}).items():
+        metrics[f"{name} jobs_per_second"] = (throughput["jobs_per_second"], True)
+        if "peak_memory_bytes" in throughput:
+            metrics[f"{name} peak_memory_bytes"] = (throughput["peak_memory_bytes"], False)
+    return metrics
+
+
+def compare_benchmarks(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = DEFAULT_REGRESSION_THRESHOLD
+) -> List[Dict[str, Any]]:
+    """Compare benchmark results against a baseline.
+
+    Args:
+        baseline: Results of an earlier benchmark run
+        current: Results of this benchmark run
+        threshold: Relative change beyond which a metric counts as regressed or improved
+
+    Returns:
+        One entry per metric present in both runs, with the relative change and a
+        status of "regressed", "improved" or "unchanged"
+    """
+    baseline_metrics = benchmark_metrics(baseline)
+    comparison = []
+    for name, (value, higher_is_better) in benchmark_metrics(current).items():
+        if name not in baseline_metrics:
+            continue
+        before = baseline_metrics[name][0]
+        change = (value - before) / before if before else 0.0
+        worse = -change if higher_is_better else change
+        status = "regressed" if worse > threshold else "improved" if worse < -threshold else "unchanged"
+        comparison.append({"metric": name, "baseline": before, "current": value, "change": round(change, 4), "status": status})
+    return comparison
+
+
+def print_comparison(comparison: List[Dict[str, Any]]) -> None:
+    """Print the metrics that changed beyond the threshold."""
+    changed = [entry for entry in comparison if entry["status"] != "unchanged"]
+    for entry in changed:
+        print(f"{entry['status']:>9}  {entry['change']:+8.1%}  {entry['metric']}: {entry['baseline']} -> {entry['current']}")
+    print(f"{len(changed)} of {len(comparison)} metrics changed beyond the threshold")
+
+
+def _parse_int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+# Script entry point
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the test pipeline against local stubs")
+    parser.add_argument("--output", type=str, default=os.path.join("output", "benchmark.json"),
+                        help="JSON file to write the results to (default: output/benchmark.json)")
+    parser.add_argument("--compare", type=str, default=None,
+                        help="Baseline JSON file to compare the results with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help=f"Relative change reported as a regression (default: {DEFAULT_REGRESSION_THRESHOLD})")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with status 1 if any metric regressed")
+    parser.add_argument("--page-sizes", type=_parse_int_list, default=list(DEFAULT_PAGE_SIZES),
+                        help="Comma separated page sizes in bytes (default: 10000,100000,1000000,5000000)")
+    parser.add_argument("--plan-lengths", type=_parse_int_list, default=list(DEFAULT_PLAN_LENGTHS),
+                        help="Comma separated plan lengths in steps (default: 5,50,200)")
+    parser.add_argument("--concurrency", type=_parse_int_list, default=list(DEFAULT_CONCURRENCY_LEVELS),
+                        help="Comma separated concurrency levels of the throughput runs (default: 1,4,16)")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS,
+                        help=f"Jobs per scenario and per concurrency slot (default: {DEFAULT_ITERATIONS})")
+    parser.add_argument("--llm-latency", type=float, default=0.0,
+                        help="Latency of every fake LLM call in seconds (default: 0)")
+    parser.add_argument("--navigate-latency", type=float, default=0.0,
+                        help="Latency of the stub /navigate endpoint in seconds (default: 0)")
+    parser.add_argument("--step-latency", type=float, default=0.0,
+                        help="Latency of every executed step in seconds (default: 0)")
+    parser.add_argument("--screenshot-bytes", type=int, default=0,
+                        help="Payload size of every screenshot step (default: 0)")
+    parser.add_argument("--failing-steps", type=_parse_int_list, default=list(DEFAULT_FAILING_STEPS),
+                        help="Comma separated steps failed in the failure scenario, empty skips it (default: 5)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(
+        args.page_sizes,
+        args.plan_lengths,
+        args.concurrency,
+        args.iterations,
+        args.llm_latency,
+        args.navigate_latency,
+        args.step_latency,
+        args.screenshot_bytes,
+        args.failing_steps
+    ))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Benchmark results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            comparison = compare_benchmarks(json.load(f), results, args.threshold)
+        print_comparison(comparison)
+        if args.fail_on_regression and any(entry["status"] == "regressed" for entry in comparison):
+            sys.exit(1)
@@ -0,0 +1,207 @@
+"""
+Relevance ranked, token bounded selection of element inventory chunks.
+
+When the element inventory of a page does not fit the planning budget, its
+lines are split into chunks of a bounded token size and ranked against the
+test description with BM25. The highest ranked chunks that fit the budget
+are sent to the planner, in document order. If the selected chunks miss
+description terms found elsewhere on the page, the caller can fall back to
+map-reduce planning: ask the LLM for the relevant elements of each ranked
+chunk, then plan on the merged picks (see merge_chunk_picks).
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from dom_extract import BYTES_PER_TOKEN
+
+DEFAULT_CHUNK_TOKENS = 1000            # Token size of an inventory chunk
+DEFAULT_MAP_REDUCE_CHUNKS = 4          # Chunks mapped by the LLM in the map-reduce fallback
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Words that carry no relevance in test descriptions
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "check", "click", "for", "from", "given", "if", "in", "is",
+    "it", "of", "on", "or", "page", "that", "the", "then", "to", "verify", "when", "with",
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+|[+\-*/=%]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word, number and operator tokens."""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _line_bytes(line: str) -> int:
+    return len(line.encode("utf-8")) + 1
+
+
+def chunk_lines(lines: List[str], max_chunk_bytes: int) -> List[List[str]]:
+    """Split inventory lines into consecutive chunks of at most max_chunk_bytes.
+
+    A single line larger than the chunk size becomes a chunk of its own.
+    """
+    chunks: List[List[str]] = []
+    chunk: List[str] = []
+    used = 0
+    for line in lines:
+        size = _line_bytes(line)
+        if chunk and used + size > max_chunk_bytes:
+            chunks.append(chunk)
+            chunk, used = [], 0
+        chunk.append(line)
+        used += size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+class BM25:
+    """Okapi BM25 scorer over a small set of tokenized documents."""
+
+    def __init__(self, documents: List[List[str]], k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(document) for document in documents]
+        self.lengths = [len(document) for document in documents]
+        self.average_length = sum(self.lengths) / len(documents) if documents else 0.0
+        document_frequency: Counter = Counter()
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def scores(self, query: Iterable[str]) -> List[float]:
+        """Score every document against the query tokens."""
+        terms = [term for term in set(query) if term in self.idf]
+        scores = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.average_length) if self.average_length else self.k1
+            scores.append(sum(
+                self.idf[term] * counts[term] * (self.k1 + 1) / (counts[term] + norm)
+                for term in terms if counts[term]
+            ))
+        return scores
+
+
+@dataclass
+class ChunkSelection:
+    """Inventory text selected for planning, with the chunks it was selected from."""
+
+    text: str
+    chunks: List[List[str]] = field(default_factory=list)
+    selected: List[int] = field(default_factory=list)
+    ranked: List[int] = field(default_factory=list)
+    scores: List[float] = field(default_factory=list)
+    coverage: float = 1.0
+    budget: int = 0
+
+    @classmethod
+    def whole(cls, text: str) -> "ChunkSelection":
+        """Selection of a text that fits the budget as is."""
+        return cls(text=text)
+
+    @property
+    def chunked(self) -> bool:
+        """Whether chunks were left out of the selection."""
+        return len(self.selected) < len(self.chunks)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "chunks": len(self.chunks),
+            "selected": len(self.selected),
+            "coverage": round(self.coverage, 2),
+            "selected_bytes": len(self.text.encode("utf-8")),
+        }
+
+
+def select_chunks(
+    lines: List[str],
+    query: str,
+    max_bytes: int,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS
+) -> ChunkSelection:
+    """Select the inventory chunks most relevant to a test description.
+
+    Args:
+        lines: Inventory lines of every element, in document order
+        query: Test description to rank the chunks against
+        max_bytes: Byte budget of the selected text
+        chunk_tokens: Token size of a chunk
+
+    Returns:
+        The selected text and the ranked chunks
+    """
+    text = "\n".join(lines)
+    if len(text.encode("utf-8")) <= max_bytes:
+        return ChunkSelection.whole(text)
+
+    chunks = chunk_lines(lines, min(chunk_tokens * BYTES_PER_TOKEN, max_bytes))
+    documents = [tokenize("\n".join(chunk)) for chunk in chunks]
+    query_tokens = tokenize(query)
+    scores = BM25(documents).scores(query_tokens)
+    ranked = sorted(range(len(chunks)), key=lambda index: (-scores[index], index))
+
+    # Take the best ranked chunks that still fit the budget
+    selected: List[int] = []
+    used = 0
+    for index in ranked:
+        size = sum(_line_bytes(line) for line in chunks[index])
+        if used + size <= max_bytes:
+            selected.append(index)
+            used += size
+    selected.sort()
+
+    # Share of the description terms found on the page that the selection contains
+    page_terms = set(query_tokens) & set().union(*documents)
+    selected_terms = set().union(*(documents[index] for index in selected)) if selected else set()
+    coverage = len(page_terms & selected_terms) / len(page_terms) if page_terms else 1.0
+
+    omitted = len(lines) - sum(len(chunks[index]) for index in selected)
+    selected_text = "\n".join(line for index in selected for line in chunks[index])
+    if omitted:
+        selected_text += f"\n- ... {omitted} less relevant elements omitted"
+    return ChunkSelection(
+        text=selected_text,
+        chunks=chunks,
+        selected=selected,
+        ranked=ranked,
+        scores=scores,
+        coverage=coverage,
+        budget=max_bytes,
+    )
+
+
+def merge_chunk_picks(selection: ChunkSelection, picks: Dict[int, List[str]], max_bytes: Optional[int] = None) -> str:
+    """Merge the lines picked from several chunks into one inventory text.
+
+    Args:
+        selection: Chunk selection the picks were made from
+        picks: Picked lines by chunk index
+        max_bytes: Byte budget of the merged text (default: the selection's budget)
+
+    Returns:
+        The picked lines in document order within the budget, or the selection's
+        own text if nothing was picked
+    """
+    budget = max_bytes or selection.budget
+    lines: List[str] = []
+    seen = set()
+    used = 0
+    for index in sorted(picks):
+        for line in picks[index]:
+            size = _line_bytes(line)
+            if line in seen or used + size > budget:
+                continue
+            seen.add(line)
+            lines.append(line)
+            used += size
+    return "\n".join(lines) if lines else selection.text
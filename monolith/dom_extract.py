@@ -0,0 +1,379 @@
+"""
+Compact DOM extraction for LLM test planning.
+
+Turns the raw page source returned by the Playwright service into a small,
+deduplicated inventory of the elements a test plan can actually target:
+interactive controls, elements with ids/roles, and output areas used by
+`check` steps. Each element carries candidate Playwright selectors such as
+`#elementID` or `button:has-text("Submit")`.
+
+The HTML is parsed incrementally in fixed size chunks, so scripts, styles and
+SVG payloads are skipped without ever building a DOM tree in memory. Other
+consumers of the page structure (such as the selector index) can listen to the
+same parse instead of parsing the page again.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Sequence
+
+# Extraction defaults
+DEFAULT_INVENTORY_MAX_BYTES = 16000   # Budget for the inventory text sent to the LLM
+DEFAULT_CHUNK_SIZE = 64 * 1024        # Size of the chunks fed to the parser
+DEFAULT_MAX_ELEMENTS = 2000           # Hard cap on collected elements
+DEFAULT_MAX_TEXT_LENGTH = 80          # Visible text is truncated to this many characters
+BYTES_PER_TOKEN = 4                   # Rough bytes-per-token estimate for budgeting
+
+# Tags whose content is never useful for test planning
+SKIPPED_TAGS = {"script", "style", "svg", "noscript", "template", "head", "math", "canvas"}
+
+# Tags without closing tags
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+# Tags that are always interactive
+INTERACTIVE_TAGS = {
+    "a", "button", "input", "select", "textarea", "option",
+    "label", "summary", "details", "form", "output",
+}
+
+# ARIA roles that mark an element as interactive
+INTERACTIVE_ROLES = {
+    "button", "link", "checkbox", "radio", "tab", "menuitem", "menuitemcheckbox",
+    "menuitemradio", "switch", "textbox", "combobox", "option", "slider",
+    "searchbox", "listbox", "spinbutton", "status", "alert",
+}
+
+# Headings are kept as navigation anchors for the planner
+HEADING_TAGS = {"h1", "h2", "h3"}
+
+# Class name fragments that usually identify result/output areas used by `check` steps
+OUTPUT_CLASS_HINTS = ("display", "result", "output", "message", "error", "alert", "status", "total", "screen")
+
+# Tags whose visible text makes a good `:has-text()` selector
+TEXT_SELECTOR_TAGS = {"a", "button", "label", "option", "summary", "li", "span", "h1", "h2", "h3"}
+
+_CSS_IDENTIFIER = re.compile(r"^-?[_a-zA-Z][_a-zA-Z0-9-]*$")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str, max_length: int = DEFAULT_MAX_TEXT_LENGTH) -> str:
+    """Collapse whitespace and truncate text for use in selectors and prompts.
+
+    Args:
+        text: Raw text content
+        max_length: Maximum number of characters to keep
+
+    Returns:
+        The normalized text
+    """
+    text = _WHITESPACE.sub(" ", text).strip()
+    if len(text) > max_length:
+        text = text[:max_length].rstrip()
+    return text
+
+
+def _quote(value: str) -> str:
+    """Quote a value for use inside a Playwright selector."""
+    return json.dumps(value, ensure_ascii=False)
+
+
+def candidate_selectors(element: Dict[str, Any], max_selectors: int = 3) -> List[str]:
+    """Build candidate Playwright selectors for an extracted element.
+
+    Args:
+        element: Element record produced by the extractor
+        max_selectors: Maximum number of selectors to return
+
+    Returns:
+        Selectors ordered from most to least specific
+    """
+    tag = element["tag"]
+    attrs = element.get("attrs", {})
+    text = element.get("text", "")
+    selectors: List[str] = []
+
+    element_id = attrs.get("id")
+    if element_id:
+        if _CSS_IDENTIFIER.match(element_id):
+            selectors.append(f"#{element_id}")
+        else:
+            selectors.append(f"[id={_quote(element_id)}]")
+    if attrs.get("data-testid"):
+        selectors.append(f"[data-testid={_quote(attrs['data-testid'])}]")
+    if attrs.get("name") and tag in ("input", "select", "textarea", "button"):
+        selectors.append(f"{tag}[name={_quote(attrs['name'])}]")
+    if text and (tag in TEXT_SELECTOR_TAGS or attrs.get("role")):
+        selectors.append(f"{tag}:has-text({_quote(text)})")
+    if attrs.get("aria-label"):
+        selectors.append(f"[aria-label={_quote(attrs['aria-label'])}]")
+    if attrs.get("placeholder"):
+        selectors.append(f"{tag}[placeholder={_quote(attrs['placeholder'])}]")
+    for class_name in attrs.get("class", "").split():
+        if _CSS_IDENTIFIER.match(class_name):
+            selectors.append(f"{tag}.{class_name}")
+            break
+
+    return selectors[:max_selectors]
+
+
+class ElementExtractor(HTMLParser):
+    """Incremental HTML parser collecting targetable elements.
+
+    Feed it chunks of HTML with `feed()` and call `close()` when done; the
+    collected element records are available in `elements`. Listeners receive
+    every start tag, end tag and text event of the parse (self-closing tags as a
+    start and, unless void, an end tag) and are closed with the parser.
+    """
+
+    def __init__(
+        self,
+        max_elements: int = DEFAULT_MAX_ELEMENTS,
+        max_text_length: int = DEFAULT_MAX_TEXT_LENGTH,
+        listeners: Sequence[Any] = ()
+    ):
+        super().__init__(convert_charrefs=True)
+        self.listeners = list(listeners)
+        self.max_elements = max_elements
+        self.max_text_length = max_text_length
+        self.elements: List[Dict[str, Any]] = []
+        self.duplicates = 0
+        self.dropped = 0
+        self._seen: Dict[tuple, Dict[str, Any]] = {}
+        self._open: List[List[Any]] = []  # [tag, element record or None, text parts, text length]
+        self._skip_depth = 0
+        self._skip_tag: Optional[str] = None
+
+    def _is_target(self, tag: str, attrs: Dict[str, str]) -> bool:
+        """Decide whether an element belongs in the inventory."""
+        if tag in INTERACTIVE_TAGS or tag in HEADING_TAGS:
+            return True
+        if attrs.get("role") in INTERACTIVE_ROLES:
+            return True
+        if any(key in attrs for key in ("id", "onclick", "data-testid", "aria-label", "contenteditable", "aria-live")):
+            return True
+        if "tabindex" in attrs and attrs["tabindex"] != "-1":
+            return True
+        classes = attrs.get("class", "").lower()
+        return any(hint in classes for hint in OUTPUT_CLASS_HINTS)
+
+    def handle_starttag(self, tag: str, attrs_list: List[tuple]) -> None:
+        for listener in self.listeners:
+            listener.handle_starttag(tag, attrs_list)
+        if self._skip_depth:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+        if tag in SKIPPED_TAGS:
+            self._skip_tag = tag
+            self._skip_depth = 1
+            return
+
+        attrs = {key: (value or "") for key, value in attrs_list}
+        record = None
+        if self._is_target(tag, attrs):
+            record = {"tag": tag, "attrs": attrs}
+
+        if tag in VOID_TAGS:
+            if record is not None:
+                self._finish(record, "")
+            return
+        self._open.append([tag, record, [], 0])
+
+    def handle_startendtag(self, tag: str, attrs_list: List[tuple]) -> None:
+        # Self-closing skipped tags (e.g. <svg/>) have no content to skip
+        if self._skip_depth or tag in SKIPPED_TAGS:
+            return
+        self.handle_starttag(tag, attrs_list)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        for listener in self.listeners:
+            listener.handle_endtag(tag)
+        if self._skip_depth:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if not self._skip_depth:
+                    self._skip_tag = None
+            return
+        # Tolerate unclosed tags by unwinding the stack up to the matching tag
+        if not any(entry[0] == tag for entry in self._open):
+            return
+        while self._open:
+            open_tag, record, parts, _ = self._open.pop()
+            if record is not None:
+                self._finish(record, "".join(parts))
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data: str) -> None:
+        for listener in self.listeners:
+            listener.handle_data(data)
+        if self._skip_depth or not data.strip():
+            return
+        # Text belongs to every open element that is being collected, up to what
+        # normalize_text keeps of it (twice that, as whitespace still collapses)
+        data = _WHITESPACE.sub(" ", data)
+        limit = 2 * self.max_text_length
+        for entry in self._open:
+            if entry[1] is not None and entry[3] < limit:
+                part = data[:limit - entry[3]]
+                entry[2].append(part)
+                entry[3] += len(part)
+
+    def close(self) -> None:
+        super().close()
+        while self._open:
+            _, record, parts, _ = self._open.pop()
+            if record is not None:
+                self._finish(record, "".join(parts))
+        for listener in self.listeners:
+            listener.close()
+
+    def _finish(self, record: Dict[str, Any], text: str) -> None:
+        """Finalize an element record, deduplicating by its selector set."""
+        attrs = record["attrs"]
+        record["text"] = normalize_text(text or attrs.get("value", "") or attrs.get("alt", ""), self.max_text_length)
+        record["selectors"] = candidate_selectors(record)
+        if not record["selectors"]:
+            self.dropped += 1
+            return
+
+        key = (record["tag"], tuple(record["selectors"]))
+        if key in self._seen:
+            self._seen[key]["count"] += 1
+            self.duplicates += 1
+            return
+        if len(self.elements) >= self.max_elements:
+            self.dropped += 1
+            return
+
+        record["count"] = 1
+        self._seen[key] = record
+        self.elements.append(record)
+
+
+def format_element(element: Dict[str, Any]) -> str:
+    """Render an element record as one compact prompt line.
+
+    Args:
+        element: Element record produced by the extractor
+
+    Returns:
+        A single line describing the element and its selectors
+    """
+    attrs = element.get("attrs", {})
+    parts = [element["tag"]]
+    for key in ("type", "role", "name", "href", "placeholder", "aria-label"):
+        if attrs.get(key):
+            parts.append(f"{key}={_quote(normalize_text(attrs[key]))}")
+    if element.get("text"):
+        parts.append(f"text={_quote(element['text'])}")
+    if element.get("count", 1) > 1:
+        parts.append(f"x{element['count']}")
+    return f"- {' '.join(parts)} -> {', '.join(element['selectors'])}"
+
+
+@dataclass
+class ElementInventory:
+    """Compact inventory of the targetable elements of a page."""
+
+    elements: List[Dict[str, Any]]
+    text: str
+    source_bytes: int
+    omitted: int = 0
+    duplicates: int = 0
+    dropped: int = 0
+
+    @property
+    def inventory_bytes(self) -> int:
+        return len(self.text.encode("utf-8"))
+
+    @property
+    def estimated_tokens(self) -> int:
+        return self.inventory_bytes // BYTES_PER_TOKEN
+
+    @property
+    def compression_ratio(self) -> float:
+        """Ratio of page source size to inventory size (higher is better)."""
+        return self.source_bytes / max(self.inventory_bytes, 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Summarize the extraction for logging and metrics."""
+        return {
+            "source_bytes": self.source_bytes,
+            "inventory_bytes": self.inventory_bytes,
+            "estimated_tokens": self.estimated_tokens,
+            "compression_ratio": round(self.compression_ratio, 2),
+            "elements": len(self.elements),
+            "omitted": self.omitted,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+        }
+
+
+def inventory_budget(max_bytes: int, max_tokens: Optional[int] = None) -> int:
+    """Return the byte budget of an inventory, applying the optional token budget."""
+    if max_tokens is not None:
+        return min(max_bytes, max_tokens * BYTES_PER_TOKEN)
+    return max_bytes
+
+
+def extract_element_inventory(
+    page_source: str,
+    max_bytes: int = DEFAULT_INVENTORY_MAX_BYTES,
+    max_tokens: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_elements: int = DEFAULT_MAX_ELEMENTS,
+    listeners: Sequence[Any] = (),
+) -> ElementInventory:
+    """Extract a compact element inventory from a page source.
+
+    Args:
+        page_source: Raw HTML returned by the Playwright service
+        max_bytes: Maximum size of the rendered inventory text
+        max_tokens: Optional token budget, converted to bytes with BYTES_PER_TOKEN
+        chunk_size: Number of characters fed to the parser at a time
+        max_elements: Maximum number of distinct elements to collect
+        listeners: Receivers of the parse events (see ElementExtractor), built from the same parse
+
+    Returns:
+        The element inventory, rendered within the configured budget
+    """
+    budget = inventory_budget(max_bytes, max_tokens)
+
+    # Parse the page in chunks so large pages never need a full DOM tree
+    extractor = ElementExtractor(max_elements=max_elements, listeners=listeners)
+    for start in range(0, len(page_source), chunk_size):
+        extractor.feed(page_source[start:start + chunk_size])
+    extractor.close()
+
+    # Render elements in document order until the budget is spent
+    lines: List[str] = []
+    used = 0
+    for element in extractor.elements:
+        line = format_element(element)
+        line_bytes = len(line.encode("utf-8")) + 1
+        if used + line_bytes > budget:
+            break
+        lines.append(line)
+        used += line_bytes
+
+    omitted = len(extractor.elements) - len(lines)
+    text = "\n".join(lines)
+    if omitted:
+        text += f"\n- ... {omitted} more elements omitted"
+
+    return ElementInventory(
+        elements=extractor.elements,
+        text=text,
+        source_bytes=len(page_source.encode("utf-8")),
+        omitted=omitted,
+        duplicates=extractor.duplicates,
+        dropped=extractor.dropped,
+    )
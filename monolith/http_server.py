@@ -0,0 +1,186 @@
+"""
+Minimal asyncio HTTP/1.1 server helpers.
+
+Just enough HTTP for local JSON APIs: one request per connection, JSON request
+and response bodies, and chunked responses for streaming NDJSON. Servers can
+listen on a TCP port or on a Unix socket.
+"""
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+MAX_HEADER_LINES = 100              # Maximum number of request headers
+MAX_BODY_BYTES = 1024 * 1024        # Maximum size of a request body
+
+REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HttpError(Exception):
+    """Error that is reported to the client with an HTTP status code."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class HttpRequest:
+    """A parsed HTTP request."""
+
+    method: str
+    path: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    def json(self) -> Any:
+        """Decode the request body as JSON.
+
+        Raises:
+            HttpError: If the body is not valid JSON
+        """
+        try:
+            return json.loads(self.body or b"null")
+        except ValueError as e:
+            raise HttpError(400, f"Invalid JSON body: {e}")
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[HttpRequest]:
+    """Read one HTTP request from a connection.
+
+    Args:
+        reader: Stream of the client connection
+
+    Returns:
+        The parsed request, or None if the client closed the connection
+
+    Raises:
+        HttpError: If the request is malformed or too large
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+
+    headers: Dict[str, str] = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HttpError(400, "Too many headers")
+
+    try:
+        length = int(headers.get("content-length", "0") or 0)
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length header")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return HttpRequest(method=method.upper(), path=target.split("?", 1)[0], headers=headers, body=body)
+
+
+async def send_response(writer: asyncio.StreamWriter, status: int, body: bytes, content_type: str) -> None:
+    """Send a complete HTTP response and close the connection."""
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+async def send_json(writer: asyncio.StreamWriter, status: int, payload: Any) -> None:
+    """Send a JSON response."""
+    await send_response(writer, status, json.dumps(payload, default=str).encode("utf-8"), "application/json")
+
+
+async def start_chunked(writer: asyncio.StreamWriter, status: int = 200, content_type: str = "application/x-ndjson") -> None:
+    """Start a chunked (streaming) response."""
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        "Transfer-Encoding: chunked\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1"))
+    await writer.drain()
+
+
+async def send_chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+    """Send one chunk of a chunked response."""
+    if data:
+        writer.write(f"{len(data):X}\r\n".encode("latin-1") + data + b"\r\n")
+        await writer.drain()
+
+
+async def send_json_line(writer: asyncio.StreamWriter, payload: Any) -> None:
+    """Send one NDJSON record as a chunk."""
+    await send_chunk(writer, json.dumps(payload, default=str).encode("utf-8") + b"\n")
+
+
+async def end_chunked(writer: asyncio.StreamWriter) -> None:
+    """Terminate a chunked response."""
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+RequestHandler = Callable[[HttpRequest, asyncio.StreamWriter], Awaitable[None]]
+
+
+async def start_http_server(
+    handler: RequestHandler,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    socket_path: Optional[str] = None,
+) -> asyncio.AbstractServer:
+    """Start an HTTP server on a TCP port or a Unix socket.
+
+    Args:
+        handler: Coroutine handling one parsed request and writing the response
+        host: Host to bind when listening on TCP
+        port: Port to bind when listening on TCP (0 picks a free port)
+        socket_path: Unix socket path, takes precedence over host/port
+
+    Returns:
+        The started asyncio server
+    """
+    async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await read_request(reader)
+            if request is not None:
+                await handler(request, writer)
+        except HttpError as e:
+            await send_json(writer, e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # The client went away, nothing left to answer
+            pass
+        except Exception as e:
+            try:
+                await send_json(writer, 500, {"error": f"Unexpected error: {str(e)}"})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    if socket_path:
+        return await asyncio.start_unix_server(handle_connection, path=socket_path)
+    return await asyncio.start_server(handle_connection, host=host, port=port)
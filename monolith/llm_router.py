@@ -0,0 +1,274 @@
+"""
+Latency and cost aware routing of LLM calls across several providers.
+
+A provider spec lists the providers a job may use, optionally with their cost
+per million prompt tokens:
+
+    anthropic=3,openai=0.15
+
+Every call goes to the fastest healthy provider, measured over its recent
+calls; of providers within a latency tolerance of the fastest, the cheapest
+one is preferred. A provider whose recent error rate is too high is only
+used again once it recovered. A failed call fails over to the next provider,
+and a call that is still pending after the hedge delay is sent to the next
+provider as well; the first response wins and the other call is cancelled.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from run_metrics import estimate_tokens
+
+LLM_PROVIDERS = ("anthropic", "openai")
+
+# Routing defaults
+DEFAULT_LATENCY_WINDOW = 20            # Recent calls the latency and error rate of a provider are measured over
+DEFAULT_MAX_ERROR_RATE = 0.5           # Error rate above which a provider is unhealthy
+DEFAULT_RECOVERY_TIME = 30.0           # Seconds after its last failure an unhealthy provider is tried again
+DEFAULT_COST_TOLERANCE = 0.25          # Latency margin within which the cheaper provider is preferred
+DEFAULT_HEDGE_AFTER = 0.0              # Seconds before a pending call is also sent to the next provider (0 disables)
+
+
+class LLMRouterError(ValueError):
+    """Raised for an invalid provider spec."""
+    pass
+
+
+def parse_provider_spec(spec: str) -> Dict[str, float]:
+    """Parse a provider spec into the providers and their cost.
+
+    Args:
+        spec: Comma separated provider names in order of preference, "name=cost"
+            sets the cost per million prompt tokens (default 0)
+
+    Returns:
+        The cost of every provider by name, in order of preference
+
+    Raises:
+        LLMRouterError: If the spec names an unknown provider or has an invalid cost
+    """
+    providers: Dict[str, float] = {}
+    for item in spec.split(","):
+        name, _, cost = item.strip().partition("=")
+        name = name.lower()
+        if not name:
+            continue
+        if name not in LLM_PROVIDERS:
+            raise LLMRouterError(f"Unknown LLM provider: {name} (available: {', '.join(LLM_PROVIDERS)})")
+        try:
+            providers[name] = float(cost) if cost else 0.0
+        except ValueError:
+            raise LLMRouterError(f"Invalid cost for LLM provider {name}: {cost}")
+    if not providers:
+        raise LLMRouterError("No LLM provider given")
+    return providers
+
+
+class ProviderStats:
+    """Rolling latency and error rate of one provider."""
+
+    def __init__(self, window: int = DEFAULT_LATENCY_WINDOW):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.prompt_tokens = 0
+        self.last_failure = 0.0
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Mean duration of the recent successful calls in seconds, None before the first one."""
+        return sum(self.latencies) / len(self.latencies) if self.latencies else None
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def record_success(self, duration: float, prompt_tokens: int) -> None:
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.latencies.append(duration)
+        self.outcomes.append(True)
+
+    def record_failure(self) -> None:
+        self.calls += 1
+        self.errors += 1
+        self.outcomes.append(False)
+        self.last_failure = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        latency = self.latency
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "error_rate": round(self.error_rate, 3),
+            "latency_ms": round(latency * 1000, 3) if latency is not None else None,
+            "prompt_tokens": self.prompt_tokens,
+        }
+
+
+class ProviderHealth:
+    """Health of the LLM providers and the routing settings, shared by all runs of a process."""
+
+    def __init__(
+        self,
+        hedge_after: float = DEFAULT_HEDGE_AFTER,
+        window: int = DEFAULT_LATENCY_WINDOW,
+        max_error_rate: float = DEFAULT_MAX_ERROR_RATE,
+        recovery_time: float = DEFAULT_RECOVERY_TIME,
+        cost_tolerance: float = DEFAULT_COST_TOLERANCE,
+    ):
+        self.hedge_after = hedge_after
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.recovery_time = recovery_time
+        self.cost_tolerance = cost_tolerance
+        self.providers: Dict[str, ProviderStats] = {}
+
+    def get(self, provider: str) -> ProviderStats:
+        if provider not in self.providers:
+            self.providers[provider] = ProviderStats(self.window)
+        return self.providers[provider]
+
+    def is_healthy(self, provider: str) -> bool:
+        """Check whether a provider may be preferred, unhealthy providers recover after a while."""
+        stats = self.get(provider)
+        if stats.error_rate <= self.max_error_rate:
+            return True
+        return time.monotonic() - stats.last_failure >= self.recovery_time
+
+    def rank(self, costs: Dict[str, float]) -> List[str]:
+        """Order providers for a call: fastest healthy first, untried next, unhealthy last.
+
+        Args:
+            costs: Cost of every provider by name, in order of preference
+
+        Returns:
+            The provider names in the order they should be tried
+        """
+        measured: List[Tuple[float, str]] = []
+        untried: List[str] = []
+        unhealthy: List[str] = []
+        for provider in costs:
+            latency = self.get(provider).latency
+            if not self.is_healthy(provider):
+                unhealthy.append(provider)
+            elif latency is None:
+                untried.append(provider)
+            else:
+                measured.append((latency, provider))
+
+        measured.sort()
+        if measured:
+            # Prefer the cheapest provider that is about as fast as the fastest one
+            limit = measured[0][0] * (1 + self.cost_tolerance)
+            close = sorted((item for item in measured if item[0] <= limit), key=lambda item: (costs[item[1]], item[0]))
+            measured = close + [item for item in measured if item[0] > limit]
+        unhealthy.sort(key=lambda provider: self.get(provider).error_rate)
+        return [provider for _, provider in measured] + untried + unhealthy
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {provider: stats.stats() for provider, stats in self.providers.items()}
+
+
+class LLMRouter:
+    """LLM facade routing every call to one of several provider LLMs.
+
+    Args:
+        llms: LLM instance of every provider by name
+        costs: Cost of every provider by name, in order of preference
+        health: Provider health shared by all runs of the process
+        logger: Logger instance for recording failovers and hedges
+    """
+
+    def __init__(self, llms: Dict[str, Any], costs: Dict[str, float], health: ProviderHealth, logger: Any = None):
+        self.llms = llms
+        self.costs = costs
+        self.health = health
+        self.logger = logger
+        self.calls = 0
+        self.failovers = 0
+        self.hedges = 0
+        self.served: Dict[str, int] = {}
+        self.last_provider: Optional[str] = None
+
+    async def _call(self, provider: str, message: str, request_params: Any) -> str:
+        stats = self.health.get(provider)
+        kwargs = {"message": message}
+        if request_params is not None:
+            kwargs["request_params"] = request_params
+        start = time.perf_counter()
+        try:
+            response = await self.llms[provider].generate_str(**kwargs)
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        except Exception:
+            stats.record_failure()
+            raise
+        stats.record_success(time.perf_counter() - start, estimate_tokens(message))
+        return response
+
+    async def generate_str(self, message: str, request_params: Any = None) -> str:
+        """Prompt the best ranked provider, failing over and hedging as configured.
+
+        Raises:
+            Exception: The error of the last provider if every provider failed
+        """
+        self.calls += 1
+        remaining = self.health.rank(self.costs)
+        pending: Dict[asyncio.Future, str] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch() -> None:
+            provider = remaining.pop(0)
+            pending[asyncio.ensure_future(self._call(provider, message, request_params))] = provider
+
+        launch()
+        try:
+            while pending:
+                hedge_after = self.health.hedge_after if self.health.hedge_after > 0 and remaining else None
+                done, _ = await asyncio.wait(pending, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The call is slow, race it against the next provider
+                    self.hedges += 1
+                    if self.logger is not None:
+                        self.logger.info(f"Hedging LLM call on {remaining[0]} after {hedge_after}s")
+                    launch()
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        self.last_provider = provider
+                        self.served[provider] = self.served.get(provider, 0) + 1
+                        return task.result()
+                    last_error = task.exception()
+                    if remaining:
+                        self.failovers += 1
+                        if self.logger is not None:
+                            self.logger.warning(f"LLM provider {provider} failed, failing over to {remaining[0]}: {last_error}")
+                        launch()
+            raise last_error
+        finally:
+            # The first response wins, the calls still running are not needed
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the routing counters of this router and the shared provider health."""
+        return {
+            "calls": self.calls,
+            "failovers": self.failovers,
+            "hedges": self.hedges,
+            "served": self.served,
+            "providers": {provider: self._provider_stats(provider) for provider in self.costs},
+        }
+
+    def _provider_stats(self, provider: str) -> Dict[str, Any]:
+        stats = self.health.get(provider).stats()
+        stats["estimated_cost"] = round(stats["prompt_tokens"] * self.costs[provider] / 1_000_000, 6)
+        return stats
@@ -3,9 +3,10 @@ MCP Agent Monolith: A tool for generating and executing automated Playwright tes
 
 This script provides functionality to:
 1. Fetch a website's page source
-2. Generate a test plan using an LLM (Anthropic or OpenAI)
-3. Execute the test plan using a Playwright service
-4. Analyze and report test results
+2. Extract a compact inventory of the page's targetable elements
+3. Generate a test plan using an LLM (Anthropic or OpenAI)
+4. Execute the test plan using a Playwright service
+5. Analyze and report test results
 
 Usage:
     python main.py <url> <test_description> [options]
@@ -15,22 +16,58 @@ Author: QE AI Agent Swarm Team
 
 import asyncio
 import argparse
+import contextlib
+import glob
 import json
 import os
-from typing import Dict, Any, Optional
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, AsyncIterator, Callable, List, Optional, Sequence
 
 import httpx
 from mcp_agent.app import MCPApp
 from mcp_agent.agents.agent import Agent
+from mcp_agent.workflows.llm.augmented_llm import RequestParams
 from mcp_agent.workflows.llm.augmented_llm_anthropic import AnthropicAugmentedLLM
 from mcp_agent.workflows.llm.augmented_llm_openai import OpenAIAugmentedLLM
 
+from artifact_store import ArtifactStore
+from chunk_planner import DEFAULT_MAP_REDUCE_CHUNKS, ChunkSelection, merge_chunk_picks, select_chunks
+from dom_extract import DEFAULT_INVENTORY_MAX_BYTES, ElementInventory, extract_element_inventory, format_element, inventory_budget
+from llm_router import DEFAULT_HEDGE_AFTER, LLM_PROVIDERS, LLMRouter, LLMRouterError, ProviderHealth, parse_provider_spec
+from plan_optimizer import DEFAULT_PLAN_OPTIMIZATIONS, PlanOptimizerError, optimize_test_plan, parse_optimizations
+from plan_stream import PlanStreamError, PlanStreamParser
+from plan_cache import DEFAULT_PLAN_CACHE_MAX_AGE, PlanCache, make_plan_cache_key
+from suite import JOB_OPTION_KEYS, job_output_dir, load_suite_manifest, make_job_id, summarize_suite
+from run_history import DEFAULT_HISTORY_MAX_AGE_DAYS, DEFAULT_HISTORY_MAX_RUNS, RunHistory
+from run_output import is_run_id, latest_run_file, make_run_id, prune_run_dirs, run_output_dir, write_text_atomic
+from snapshot_store import DEFAULT_SNAPSHOT_TTL, SnapshotStore, has_changes
+from sharding import DEFAULT_RESET_TEXTS, LeastLoadedScheduler, merge_segment_results, split_test_plan
+from selector_index import PageIndex, PageIndexBuilder, check_plan_selectors
+from report import build_results_report, failure_context, has_failures
+from retry_policy import (
+    DEFAULT_RETRY_BUDGET, CircuitBreakerRegistry, CircuitOpenError, RetryBudget, RetryController, RetryPolicy,
+    get_llm_retry_after, is_retryable_llm_error, parse_retry_after
+)
+from run_metrics import (
+    METRICS_FORMATS, RunMetrics, activate_run_metrics, current_run_metrics, record_http_response, to_otel_spans, to_prometheus
+)
+from step_results import compact_results, compact_step_record, first_failed_step, get_step_results, step_passed, with_step_results
+from service import DEFAULT_SERVICE_HOST, DEFAULT_SERVICE_PORT, DEFAULT_SERVICE_WORKERS, TestJobService
+
 # Configuration constants with default values
 DEFAULT_PLAYWRIGHT_URL = "http://localhost:8000"  # URL for Playwright service
 DEFAULT_OUTPUT_DIR = "output"                     # Directory to store test artifacts
 DEFAULT_TIMEOUT = 300.0                           # Request timeout in seconds
 DEFAULT_MAX_RETRIES = 1                           # Maximum retry attempts for API calls
 DEFAULT_LLM_PROVIDER = "anthropic"                # Default LLM provider
+DEFAULT_SUITE_CONCURRENCY = 4                     # Jobs running at the same time in suite mode
+DEFAULT_LLM_CONCURRENCY = 2                       # Concurrent LLM calls in suite mode
+DEFAULT_PLAYWRIGHT_CONCURRENCY = 4                # Concurrent Playwright service calls in suite mode
+DEFAULT_MAX_REPAIRS = 0                           # Re-planning attempts for failed steps (0 disables repair)
+DEFAULT_SELECTOR_CHECK = "warn"                   # Local selector resolution mode: off, warn, fix or strict
+SELECTOR_CHECK_MODES = ("off", "warn", "fix", "strict")
+DEFAULT_METRICS_FORMAT = "none"                   # Run metrics export: none, prometheus or otel
 
 # Initialize the MCP application
 app = MCPApp(name="mcp-agent-mono")
@@ -43,7 +80,80 @@ class ExecutionError(Exception):
     """
     pass
 
-async def fetch_page_source(client: httpx.AsyncClient, playwright_url: str, url: str, logger: Any) -> str:
+@dataclass
+class RunContext:
+    """Resources shared by every test job running in the same MCP application.
+    
+    A single run uses one context per job; suite mode shares one context, and so one
+    agent, HTTP connection pool and plan cache, across all jobs. Replays without LLM
+    analysis run without an agent. A single run starts its job before the agent has
+    started; agent_ready is set once the agent can be used. Run directories in the
+    output directory are kept within the retention limits of the run history, whether
+    or not a history database is configured.
+    """
+    agent: Optional[Agent]
+    client: httpx.AsyncClient
+    logger: Any
+    config: Any = None
+    plan_cache: Optional[PlanCache] = None
+    snapshot_store: Optional[SnapshotStore] = None
+    run_history: Optional[RunHistory] = None
+    output_max_runs: Optional[int] = DEFAULT_HISTORY_MAX_RUNS
+    output_max_age_days: Optional[float] = DEFAULT_HISTORY_MAX_AGE_DAYS
+    llm_limiter: asyncio.Semaphore = field(default_factory=lambda: asyncio.Semaphore(DEFAULT_LLM_CONCURRENCY))
+    playwright_limiter: asyncio.Semaphore = field(default_factory=lambda: asyncio.Semaphore(DEFAULT_PLAYWRIGHT_CONCURRENCY))
+    retry_policy: RetryPolicy = field(default_factory=RetryPolicy)
+    circuit_breakers: CircuitBreakerRegistry = field(default_factory=CircuitBreakerRegistry)
+    provider_health: ProviderHealth = field(default_factory=ProviderHealth)
+    agent_ready: Optional[asyncio.Event] = None
+    
+    def create_retry_controller(self, retry_budget: int = DEFAULT_RETRY_BUDGET) -> RetryController:
+        """Create the retry controller of one job, sharing the circuit breakers of all jobs."""
+        return RetryController(self.retry_policy, RetryBudget(retry_budget), self.circuit_breakers)
+
+async def gather_or_cancel(*aws: Any) -> List[Any]:
+    """Run awaitables concurrently, cancelling the others as soon as one fails.
+    
+    Args:
+        *aws: Coroutines or futures to run
+        
+    Returns:
+        The results in the order of the awaitables
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+def is_retryable_http_error(error: Exception) -> bool:
+    """Check whether an HTTP error is transient (network errors, 429 and 5xx)."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, httpx.RequestError)
+
+def is_http_service_failure(error: Exception) -> bool:
+    """Check whether an HTTP error counts against the service's circuit (network errors and 5xx)."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.RequestError)
+
+def get_http_retry_after(error: Exception) -> Optional[float]:
+    """Extract the Retry-After delay of an HTTP status error, if any."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return parse_retry_after(error.response.headers.get("Retry-After"))
+    return None
+
+async def fetch_page_source(
+    client: httpx.AsyncClient,
+    playwright_url: str,
+    url: str,
+    logger: Any,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    retry_controller: Optional[RetryController] = None
+) -> str:
     """Fetch the page source from the Playwright service.
     
     Args:
@@ -51,6 +161,8 @@ async def fetch_page_source(client: httpx.AsyncClient, playwright_url: str, url:
         playwright_url: URL of the Playwright service
         url: Target website URL to fetch
         logger: Logger instance for recording events
+        max_retries: Maximum number of retry attempts for transient errors
+        retry_controller: Backoff, retry budget and circuit breakers of the run
         
     Returns:
         The page source HTML as a string
@@ -58,13 +170,26 @@ async def fetch_page_source(client: httpx.AsyncClient, playwright_url: str, url:
     Raises:
         ExecutionError: If page source fetching fails
     """
-    try:
+    retry_controller = retry_controller or RetryController()
+    
+    async def navigate() -> httpx.Response:
         # Send a POST request to the Playwright service to navigate to the URL
         response = await client.post(f"{playwright_url}/navigate", json={"url": url})
+        record_http_response(response)
         response.raise_for_status()
+        return response
+    
+    try:
+        response = await retry_controller.call(
+            playwright_url, navigate, max_retries, is_retryable_http_error, get_http_retry_after, is_http_service_failure
+        )
         page_source = response.text
         logger.info(f"200 :: Successfully fetched page source")
         return page_source
+    except CircuitOpenError as e:
+        # Fail fast while the service is known to be down
+        logger.error(f"400 :: Failed to fetch page source: {e}")
+        raise ExecutionError(f"Failed to fetch page source: {str(e)}")
     except httpx.RequestError as e:
         # Handle network-related errors
         logger.error(f"400 :: Failed to fetch page source: {e}")
@@ -74,15 +199,291 @@ async def fetch_page_source(client: httpx.AsyncClient, playwright_url: str, url:
         logger.error(f"400 :: HTTP error: {e.response.status_code} - {e}")
         raise ExecutionError(f"HTTP {e.response.status_code} error: {str(e)}")
 
-async def generate_test_plan(llm: OpenAIAugmentedLLM, url: str, page_source: str, test_description: str, logger: Any) -> Dict[str, Any]:
+async def fetch_page_snapshot(
+    run_context: RunContext,
+    playwright_url: str,
+    url: str,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    retry_controller: Optional[RetryController] = None
+) -> tuple:
+    """Get the page source from the snapshot store, fetching it once the snapshot expired.
+    
+    A fetched page is not stored here; store it with store_page_snapshot once its
+    element inventory was extracted.
+    
+    Args:
+        run_context: Shared HTTP client, logger, snapshot store and concurrency limits
+        playwright_url: URL of the Playwright service
+        url: Target website URL to fetch
+        max_retries: Maximum number of retry attempts for transient errors
+        retry_controller: Backoff, retry budget and circuit breakers of the run
+        
+    Returns:
+        A (page_source, snapshot) tuple, snapshot describes the reused snapshot
+        (None if the page was fetched)
+        
+    Raises:
+        ExecutionError: If page source fetching fails
+    """
+    logger = run_context.logger
+    snapshot_store = run_context.snapshot_store
+    if snapshot_store is not None:
+        snapshot = await asyncio.to_thread(snapshot_store.get, url)
+        if snapshot is not None:
+            logger.info(f"200 :: Reusing page snapshot of {url} fetched {snapshot.age:.0f}s ago", data=snapshot_store.stats())
+            return snapshot.page_source, {"reused": True, "sha256": snapshot.sha256, "age": round(snapshot.age, 1)}
+    
+    async with run_context.playwright_limiter:
+        page_source = await fetch_page_source(run_context.client, playwright_url, url, logger, max_retries, retry_controller)
+    return page_source, None
+
+async def store_page_snapshot(
+    run_context: RunContext,
+    url: str,
+    page_source: str,
+    inventory: Optional[ElementInventory] = None
+) -> Optional[Dict[str, Any]]:
+    """Store a fetched page in the snapshot store, diffing its elements against the previous snapshot.
+    
+    Args:
+        run_context: Shared logger and snapshot store
+        url: Target website URL
+        page_source: Fetched HTML source
+        inventory: Element inventory already extracted from the page, saves parsing it again
+        
+    Returns:
+        The description of the stored snapshot (None without a snapshot store)
+    """
+    logger = run_context.logger
+    snapshot_store = run_context.snapshot_store
+    if snapshot_store is None:
+        return None
+    
+    # Store the page off the event loop
+    update = await asyncio.to_thread(snapshot_store.put, url, page_source, inventory)
+    if has_changes(update.diff):
+        diff = update.diff
+        logger.info(
+            f"Page {url} changed since the last snapshot: {len(diff['added'])} elements added, "
+            f"{len(diff['removed'])} removed, {len(diff['changed'])} changed",
+            data=diff
+        )
+    return {"reused": False, **update.to_dict()}
+
+def select_page_elements(
+    page_source: str,
+    max_bytes: int,
+    max_tokens: Optional[int],
+    logger: Any,
+    query: Optional[str] = None,
+    inventory: Optional[ElementInventory] = None
+) -> ChunkSelection:
+    """Extract the element inventory and select the planning context within the budget.
+    
+    Inventories over the budget are split into chunks; with a query the chunks most
+    relevant to it are selected, otherwise the elements are kept in document order.
+    
+    Args:
+        page_source: HTML source of the target website
+        max_bytes: Byte budget for the inventory (0 disables extraction)
+        max_tokens: Optional token budget for the inventory
+        logger: Logger instance for recording events
+        query: Text to rank the inventory chunks against, usually the test description
+        inventory: Inventory already extracted with the same budget, saves parsing the page again
+        
+    Returns:
+        The selected inventory text and the chunks it was selected from
+    """
+    if not max_bytes:
+        return ChunkSelection.whole(page_source)
+    
+    if inventory is None:
+        inventory = extract_element_inventory(page_source, max_bytes=max_bytes, max_tokens=max_tokens)
+    logger.info(
+        f"200 :: Extracted {len(inventory.elements)} elements "
+        f"({inventory.compression_ratio:.1f}x smaller than page source)",
+        data=inventory.stats()
+    )
+    
+    # Fall back to the raw page source when nothing targetable was found
+    if not inventory.elements:
+        logger.warning("No targetable elements found, using raw page source")
+        return ChunkSelection.whole(page_source)
+    if not inventory.omitted or not query:
+        return ChunkSelection.whole(inventory.text)
+    
+    # Send the chunks most relevant to the query instead of the first elements
+    selection = select_chunks(
+        [format_element(element) for element in inventory.elements],
+        query,
+        inventory_budget(max_bytes, max_tokens)
+    )
+    logger.info(f"200 :: Selected {len(selection.selected)} of {len(selection.chunks)} inventory chunks", data=selection.stats())
+    return selection
+
+def extract_page_elements(
+    page_source: str,
+    max_bytes: int,
+    max_tokens: Optional[int],
+    logger: Any,
+    query: Optional[str] = None
+) -> str:
+    """Extract the compact element inventory used as planning context.
+    
+    Args:
+        page_source: HTML source of the target website
+        max_bytes: Byte budget for the inventory (0 disables extraction)
+        max_tokens: Optional token budget for the inventory
+        logger: Logger instance for recording events
+        query: Text to rank the inventory chunks against when the inventory is over budget
+        
+    Returns:
+        The rendered element inventory, or the raw page source if extraction is disabled
+    """
+    return select_page_elements(page_source, max_bytes, max_tokens, logger, query).text
+
+async def generate_llm_str(
+    llm: OpenAIAugmentedLLM,
+    message: str,
+    retry_controller: Optional[RetryController] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    use_history: bool = True
+) -> str:
+    """Prompt the LLM, retrying rate limits, timeouts and server errors with backoff.
+    
+    Args:
+        llm: LLM instance to prompt
+        message: Prompt message
+        retry_controller: Backoff, retry budget and circuit breakers of the run
+        max_retries: Maximum number of retry attempts
+        use_history: Keep the prompt and response in the conversation history of the LLM
+        
+    Returns:
+        The LLM response text
+        
+    Raises:
+        ExecutionError: If the LLM circuit is open
+    """
+    retry_controller = retry_controller or RetryController()
+    start = time.perf_counter()
+    # Side prompts stay out of the conversation history so they don't grow later prompts
+    request = (lambda: llm.generate_str(message=message)) if use_history else (
+        lambda: llm.generate_str(message=message, request_params=RequestParams(use_history=False))
+    )
+    try:
+        response = await retry_controller.call(
+            "llm", request, max_retries,
+            is_retryable_llm_error, get_llm_retry_after
+        )
+    except CircuitOpenError as e:
+        raise ExecutionError(f"LLM is unavailable: {str(e)}")
+    
+    # Record prompt and response sizes of the running job
+    metrics = current_run_metrics()
+    if metrics is not None:
+        metrics.record_llm_call(message, response, time.perf_counter() - start)
+    return response
+
+async def stream_llm_str(llm: OpenAIAugmentedLLM, message: str, on_chunk: Callable[[str], bool]) -> str:
+    """Prompt the LLM, handing the response to on_chunk as it streams.
+    
+    LLMs without a generate_stream method return the whole response as one chunk.
+    
+    Args:
+        llm: LLM instance to prompt
+        message: Prompt message
+        on_chunk: Called with every chunk, returns True once the rest of the response is not needed
+        
+    Returns:
+        The response text read up to the point on_chunk stopped it
+    """
+    # Look the method up on the class so mocks and proxies don't appear to stream
+    if getattr(type(llm), "generate_stream", None) is None:
+        response = await llm.generate_str(message=message)
+        on_chunk(response)
+        return response
+    
+    chunks: List[str] = []
+    stream = llm.generate_stream(message=message)
+    try:
+        async for chunk in stream:
+            chunks.append(chunk)
+            if on_chunk(chunk):
+                break
+    finally:
+        # Closing the stream stops the generation
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    return "".join(chunks)
+
+async def generate_llm_json(
+    llm: OpenAIAugmentedLLM,
+    message: str,
+    create_parser: Callable[[], PlanStreamParser],
+    retry_controller: Optional[RetryController] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES
+) -> Dict[str, Any]:
+    """Prompt the LLM for a JSON plan, parsing the response incrementally as it streams.
+    
+    Every attempt feeds a fresh parser. The parser stops reading the response once the
+    JSON object is complete and aborts the generation as soon as it leaves the schema.
+    
+    Args:
+        llm: LLM instance to prompt
+        message: Prompt message
+        create_parser: Creates the parser of an attempt
+        retry_controller: Backoff, retry budget and circuit breakers of the run
+        max_retries: Maximum number of retry attempts
+        
+    Returns:
+        The parsed JSON object
+        
+    Raises:
+        ExecutionError: If the LLM circuit is open
+        PlanStreamError: If the response is not a valid plan
+    """
+    retry_controller = retry_controller or RetryController()
+    start = time.perf_counter()
+    response: List[str] = []
+    
+    async def request() -> Dict[str, Any]:
+        parser = create_parser()
+        response[:] = [await stream_llm_str(llm, message, parser.feed)]
+        return parser.close()
+    
+    try:
+        return await retry_controller.call("llm", request, max_retries, is_retryable_llm_error, get_llm_retry_after)
+    except CircuitOpenError as e:
+        raise ExecutionError(f"LLM is unavailable: {str(e)}")
+    finally:
+        # Record prompt and response sizes of the running job, aborted responses included
+        metrics = current_run_metrics()
+        if metrics is not None and response:
+            metrics.record_llm_call(message, response[0], time.perf_counter() - start)
+
+async def generate_test_plan(
+    llm: OpenAIAugmentedLLM,
+    url: str,
+    page_source: str,
+    test_description: str,
+    logger: Any,
+    retry_controller: Optional[RetryController] = None,
+    on_step: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
     """Generate a test plan using the provided LLM.
     
+    The response is parsed as it streams, prose and code fences around the plan are
+    ignored, and generation stops early once the response leaves the plan schema.
+    
     Args:
         llm: LLM instance for generating test plans
         url: Target website URL for testing
-        page_source: HTML source of the target website
+        page_source: Element inventory (or raw HTML source) of the target website
         test_description: Description of the test requirements
         logger: Logger instance for recording events
+        retry_controller: Backoff, retry budget and circuit breakers of the run
+        on_step: Called with every validated step as soon as it has been generated
         
     Returns:
         A dictionary containing the generated test plan
@@ -93,8 +494,7 @@ async def generate_test_plan(llm: OpenAIAugmentedLLM, url: str, page_source: str
     logger.info(f"Generating test plan for {url} using page source and description: {test_description}")
     
     # Prompt the LLM to generate a test plan based on the page source and requirements
-    plan_result = await llm.generate_str(
-        message=f"""Create a test plan for {url}
+    message = f"""Create a test plan for {url}
         using Playwright CSS selector rules like button:has-text("Submit") or #elementID
         ONLY using these list of elements {page_source}
         with the following requirements:
@@ -125,16 +525,183 @@ async def generate_test_plan(llm: OpenAIAugmentedLLM, url: str, page_source: str
         - Do not include any explanations or additional text.
         - Do not include any code blocks or formatting.
         """
-    )
-    
-    # Parse the JSON response from the LLM
     try:
-        plan_json = json.loads(plan_result)
-        return plan_json
-    except json.JSONDecodeError as e:
+        return await generate_llm_json(llm, message, lambda: PlanStreamParser(on_step=on_step), retry_controller)
+    except PlanStreamError as e:
         logger.error(f"400 :: Failed to decode JSON from LLM response: {e}")
         raise ExecutionError(f"Failed to decode JSON from LLM response: {str(e)}")
 
+async def map_reduce_page_elements(
+    llm: OpenAIAugmentedLLM,
+    url: str,
+    selection: ChunkSelection,
+    test_description: str,
+    logger: Any,
+    retry_controller: Optional[RetryController] = None,
+    max_chunks: int = DEFAULT_MAP_REDUCE_CHUNKS
+) -> str:
+    """Pick the elements relevant to a test from the best ranked inventory chunks.
+    
+    Every chunk is sent to the LLM on its own, outside the conversation history,
+    and the picked elements are merged into a single inventory within the budget.
+    
+    Args:
+        llm: LLM instance for picking elements
+        url: Target website URL for testing
+        selection: Chunked element inventory (see select_page_elements)
+        test_description: Description of the test requirements
+        logger: Logger instance for recording events
+        retry_controller: Backoff, retry budget and circuit breakers of the run
+        max_chunks: Maximum number of chunks sent to the LLM
+        
+    Returns:
+        The merged element inventory
+    """
+    chunk_indexes = selection.ranked[:max_chunks]
+    logger.info(f"Mapping {len(chunk_indexes)} of {len(selection.chunks)} inventory chunks of {url}")
+    
+    async def pick_elements(index: int) -> List[str]:
+        lines = selection.chunks[index]
+        numbered = "\n".join(f"[{number}] {line}" for number, line in enumerate(lines))
+        response = await generate_llm_str(
+            llm,
+            f"""From this part of the elements of {url}
+        {numbered}
+        select the elements needed for a test with the following requirements:
+        {test_description}
+        
+        Return ONLY a JSON object with the numbers of the selected elements:
+        {{"elements": [0, 3]}}
+        Return an empty list if none of the elements are needed.
+        """,
+            retry_controller,
+            use_history=False
+        )
+        try:
+            numbers = json.loads(response)["elements"]
+            return [lines[number] for number in numbers if isinstance(number, int) and 0 <= number < len(lines)]
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable element picks of inventory chunk {index}: {e}")
+            return []
+    
+    picks = await gather_or_cancel(*(pick_elements(index) for index in chunk_indexes))
+    return merge_chunk_picks(selection, dict(zip(chunk_indexes, picks)))
+
+async def generate_chunked_test_plan(
+    llm: OpenAIAugmentedLLM,
+    url: str,
+    selection: ChunkSelection,
+    test_description: str,
+    logger: Any,
+    retry_controller: Optional[RetryController] = None,
+    on_step: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """Generate a test plan from a chunk selection, falling back to map-reduce planning.
+    
+    Plans from the selected chunks when they cover every description term found on
+    the page. When they don't, or when planning on them fails, the relevant elements
+    are first picked from the best ranked chunks (see map_reduce_page_elements).
+    
+    Args:
+        llm: LLM instance for generating test plans
+        url: Target website URL for testing
+        selection: Selected element inventory (see select_page_elements)
+        test_description: Description of the test requirements
+        logger: Logger instance for recording events
+        retry_controller: Backoff, retry budget and circuit breakers of the run
+        on_step: Called with every validated step as soon as it has been generated
+        
+    Returns:
+        A dictionary containing the generated test plan
+        
+    Raises:
+        ExecutionError: If JSON parsing fails
+    """
+    if not selection.chunked:
+        return await generate_test_plan(llm, url, selection.text, test_description, logger, retry_controller, on_step)
+    
+    if selection.coverage >= 1.0:
+        try:
+            return await generate_test_plan(llm, url, selection.text, test_description, logger, retry_controller, on_step)
+        except ExecutionError as e:
+            logger.warning(f"Planning on the selected inventory chunks failed, mapping chunks instead: {e}")
+    else:
+        logger.info(f"Selected inventory chunks cover {selection.coverage:.0%} of the description terms, mapping chunks")
+    
+    page_elements = await map_reduce_page_elements(llm, url, selection, test_description, logger, retry_controller)
+    return await generate_test_plan(llm, url, page_elements, test_description, logger, retry_controller, on_step)
+
+async def repair_test_plan(
+    llm: OpenAIAugmentedLLM,
+    url: str,
+    steps: List[Dict[str, Any]],
+    failed_index: int,
+    error: str,
+    page_elements: str,
+    logger: Any,
+    retry_controller: Optional[RetryController] = None
+) -> List[Dict[str, Any]]:
+    """Ask the LLM to replace the failed step and the steps after it.
+    
+    Only the remaining steps are regenerated; the steps before the failure are
+    sent as context and kept unchanged. The response is parsed like a test plan,
+    so prose and code fences around the JSON object are ignored.
+    
+    Args:
+        llm: LLM instance that generated the test plan
+        url: Target website URL for testing
+        steps: Steps of the executed test plan
+        failed_index: Index of the first failed step
+        error: Error reported for the failed step
+        page_elements: Fresh element inventory of the page
+        logger: Logger instance for recording events
+        retry_controller: Backoff, retry budget and circuit breakers of the run
+        
+    Returns:
+        The replacement steps for steps[failed_index:]
+        
+    Raises:
+        ExecutionError: If the LLM response is not a valid list of steps
+    """
+    logger.info(f"Repairing test plan for {url} from step {failed_index + 1}: {error}")
+    
+    # Prompt the LLM for a patch of the remaining steps only
+    message = f"""Step {failed_index + 1} of the test plan for {url} failed with this error:
+        {error}
+        
+        These steps already passed and must not be repeated:
+        {json.dumps(steps[:failed_index])}
+        
+        These are the failed step and the remaining steps:
+        {json.dumps(steps[failed_index:])}
+        
+        Fix the failed step and the remaining steps so they keep the same test intent,
+        using Playwright CSS selector rules like button:has-text("Submit") or #elementID
+        ONLY using these list of elements {page_elements}
+        
+        Return ONLY a JSON object with the following structure:
+        {{
+          "steps": [
+              {{
+              "action": "navigate|click|type|wait|waitForLoadState|scroll|check|screenshot",
+              "selector": "CSS selector or XPath (not needed for navigate/wait actions)",
+              "value": "Value for type actions or URL for navigate"
+              }}
+          ]
+        }}
+        
+        IMPORTANT:
+        - only return the JSON object with the replacement steps.
+        - Do not include any explanations or additional text.
+        - Do not include any code blocks or formatting.
+        """
+    try:
+        patch_json = await generate_llm_json(llm, message, lambda: PlanStreamParser(steps_path=("steps",)), retry_controller)
+    except PlanStreamError as e:
+        logger.error(f"400 :: Failed to decode JSON from LLM repair response: {e}")
+        raise ExecutionError(f"Failed to decode JSON from LLM repair response: {str(e)}")
+    return patch_json["steps"]
+
 def save_test_plan(plan_json: Dict[str, Any], output_dir: str, logger: Any) -> None:
     """Save the test plan to a file.
     
@@ -151,14 +718,33 @@ def save_test_plan(plan_json: Dict[str, Any], output_dir: str, logger: Any) -> N
         os.makedirs(output_dir, exist_ok=True)
         output_path = os.path.join(output_dir, "plan.json")
         
-        # Write the test plan to a JSON file
-        with open(output_path, "w") as f:
-            json.dump(plan_json, f, indent=2)
+        # Write the test plan atomically, concurrent readers never see a partial plan
+        write_text_atomic(output_path, json.dumps(plan_json, indent=2))
         logger.info(f"Test plan saved to {output_path}")
     except Exception as e:
         logger.error(f"400 :: Failed to save test plan: {e}")
         raise ExecutionError(f"Failed to save test plan: {str(e)}")
 
+def save_analysis(analysis: str, output_dir: str, logger: Any) -> None:
+    """Save the analysis report to a markdown file.
+    
+    Args:
+        analysis: The analysis in markdown
+        output_dir: Directory to save the report
+        logger: Logger instance for recording events
+        
+    Raises:
+        ExecutionError: If saving fails
+    """
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, "test_analysis.md")
+        write_text_atomic(output_path, analysis)
+        logger.info(f"Test analysis saved to {output_path}")
+    except Exception as e:
+        logger.error(f"400 :: Failed to save test analysis: {e}")
+        raise ExecutionError(f"Failed to save test analysis: {str(e)}")
+
 def validate_test_plan(plan_json: Dict[str, Any], logger: Any) -> None:
     """Validate the test plan structure.
     
@@ -179,13 +765,86 @@ def validate_test_plan(plan_json: Dict[str, Any], logger: Any) -> None:
         logger.error("Test plan does not contain steps")
         raise ExecutionError("Test plan does not contain steps")
 
+def check_test_plan_selectors(
+    plan_json: Dict[str, Any],
+    page_source: str,
+    mode: str,
+    logger: Any,
+    page_index: Optional[PageIndex] = None
+) -> Dict[str, Any]:
+    """Resolve the plan's selectors against the fetched page source before execution.
+    
+    Args:
+        plan_json: Validated test plan
+        page_source: HTML source the plan was generated for
+        mode: "off" skips the check, "warn" logs unresolved selectors, "fix" also replaces
+            them with a resolvable suggestion, "strict" fails on any unresolved selector
+        logger: Logger instance for recording events
+        page_index: Index of the page source built during extraction, saves parsing the page again
+        
+    Returns:
+        The test plan, with corrected selectors in "fix" mode
+        
+    Raises:
+        ExecutionError: If a selector cannot be resolved in "strict" mode
+    """
+    if mode == "off":
+        return plan_json
+    
+    report = check_plan_selectors(plan_json, page_source, auto_correct=(mode == "fix"), page_index=page_index)
+    for issue in report["issues"]:
+        suggestion = f", did you mean {issue['suggestion']}" if issue["suggestion"] else ""
+        logger.warning(f"Step {issue['step']} selector {issue['selector']} not found on the page{suggestion}")
+    logger.info("Selector check finished", data=report["counts"])
+    
+    if mode == "strict" and report["issues"]:
+        steps = ", ".join(str(issue["step"]) for issue in report["issues"])
+        logger.error(f"400 :: Unresolved selectors in steps {steps}")
+        raise ExecutionError(f"Unresolved selectors in steps {steps}")
+    return report["plan"]
+
+def optimize_plan(plan_json: Dict[str, Any], plan_optimizations: str, logger: Any) -> tuple:
+    """Remove redundant and wasteful steps from a validated test plan.
+    
+    Args:
+        plan_json: Validated test plan
+        plan_optimizations: Optimization spec, comma separated rules (see parse_optimizations)
+        logger: Logger instance for recording events
+        
+    Returns:
+        A (plan, report) tuple with the optimized plan and the optimizer report,
+        the report is None if no step was changed
+        
+    Raises:
+        ExecutionError: If the optimization spec is invalid
+    """
+    try:
+        rules = parse_optimizations(plan_optimizations)
+    except PlanOptimizerError as e:
+        logger.error(f"400 :: {e}")
+        raise ExecutionError(str(e))
+    if not rules:
+        return plan_json, None
+    
+    optimized, report = optimize_test_plan(plan_json, rules)
+    if not report.changed:
+        return plan_json, None
+    logger.info(
+        f"200 :: Optimized test plan from {report.steps_before} to {report.steps_after} steps, "
+        f"saving an estimated {report.estimated_ms_saved / 1000:.1f}s",
+        data=report.to_dict()
+    )
+    return optimized, report.to_dict()
+
 async def execute_test_plan(
     client: httpx.AsyncClient, 
     playwright_url: str, 
     test_plan: Dict[str, Any], 
     max_retries: int, 
     timeout: float,
-    logger: Any
+    logger: Any,
+    retry_controller: Optional[RetryController] = None,
+    artifacts: Optional[ArtifactStore] = None
 ) -> Dict[str, Any]:
     """Execute the test plan using the Playwright service.
     
@@ -196,6 +855,8 @@ async def execute_test_plan(
         max_retries: Maximum number of retry attempts
         timeout: Request timeout in seconds
         logger: Logger instance for recording events
+        retry_controller: Backoff, retry budget and circuit breakers of the run
+        artifacts: Artifact store large payloads such as screenshots are moved to
         
     Returns:
         A dictionary containing the test results
@@ -206,10 +867,16 @@ async def execute_test_plan(
     logger.info("Executing test plan with Playwright service")
     logger.debug(f"Sending request to Playwright API at {playwright_url}/execute")
     
+    retry_controller = retry_controller or RetryController()
     retry_count = 0
     
     # Retry loop for handling transient errors
     while retry_count <= max_retries:
+        # Fail fast while the service is known to be down
+        if not retry_controller.allow(playwright_url):
+            logger.error(f"400 :: Playwright API at {playwright_url} is unavailable (circuit open)")
+            raise ExecutionError(f"Playwright API at {playwright_url} is unavailable (circuit open)")
+        
         try:
             # Send the test plan to the Playwright service for execution
             response = await client.post(
@@ -219,13 +886,17 @@ async def execute_test_plan(
             )
             
             logger.debug(f"Received response with status code: {response.status_code}")
+            record_http_response(response)
+            
+            # Any answer releases a half open circuit, only server errors count as failures
+            retry_controller.record_response(playwright_url, response.status_code)
             
             # Handle special case for 422 error (usually indicates JSON formatting issues)
             if response.status_code == 422:
                 error_details = response.json() if response.content else "No error details provided"
                 logger.error(f"Playwright API rejected the request with 422 Unprocessable Entity: {error_details}")
                 
-                if retry_count < max_retries:
+                if retry_count < max_retries and await retry_controller.backoff(playwright_url, retry_count):
                     logger.info(f"Attempting to retry request ({retry_count + 1}/{max_retries})")
                     retry_count += 1
                     continue
@@ -237,16 +908,20 @@ async def execute_test_plan(
             
             # Parse the test results
             results = response.json()
+            if artifacts is not None:
+                # Keep only light step records in memory, the payloads go to disk
+                results = await asyncio.to_thread(artifacts.externalize_results, results)
             logger.info("Successfully executed test plan")
-            logger.debug(f"Raw results: {json.dumps(results, indent=2)}")
+            logger.debug(f"Raw results: {json.dumps(compact_results(results))}")
             
             return results
         
         except httpx.TimeoutException:
             # Handle request timeout
+            retry_controller.record_failure(playwright_url)
             logger.warning(f"Request timed out. Retry {retry_count + 1}/{max_retries}")
             retry_count += 1
-            if retry_count > max_retries:
+            if retry_count > max_retries or not await retry_controller.backoff(playwright_url, retry_count - 1):
                 raise ExecutionError("Request to Playwright API timed out after multiple attempts")
         
         except httpx.HTTPStatusError as e:
@@ -264,54 +939,409 @@ async def execute_test_plan(
             if 400 <= e.response.status_code < 500 and e.response.status_code != 429:
                 raise ExecutionError(f"HTTP {e.response.status_code} error: {str(e)}")
             
+            # Honour the delay requested by an overloaded service
+            retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
             retry_count += 1
-            if retry_count > max_retries:
+            if retry_count > max_retries or not await retry_controller.backoff(playwright_url, retry_count - 1, retry_after):
                 raise ExecutionError(f"Failed after {max_retries} retries: {str(e)}")
             logger.info(f"Retrying request ({retry_count}/{max_retries})...")
+        
+        except httpx.RequestError as e:
+            # Handle connection errors, usually the service is down
+            retry_controller.record_failure(playwright_url)
+            logger.error(f"400 :: Request to Playwright API failed: {e}")
+            retry_count += 1
+            if retry_count > max_retries or not await retry_controller.backoff(playwright_url, retry_count - 1):
+                raise ExecutionError(f"Request to Playwright API failed: {str(e)}")
+            logger.info(f"Retrying request ({retry_count}/{max_retries})...")
 
-async def analyze_results(llm: OpenAIAugmentedLLM, results: Dict[str, Any], logger: Any) -> str:
-    """Analyze the test results using the LLM.
+async def stream_test_plan(
+    client: httpx.AsyncClient,
+    playwright_url: str,
+    test_plan: Dict[str, Any],
+    timeout: float,
+    logger: Any
+) -> AsyncIterator[Dict[str, Any]]:
+    """Execute a test plan with the streaming protocol of the Playwright service.
+    
+    The service answers `/execute/stream` with one NDJSON record per executed step,
+    followed by a record of type "summary". Records are yielded as they arrive.
     
     Args:
-        llm: LLM instance for analyzing results
-        results: Test results to analyze
+        client: HTTP client for making requests
+        playwright_url: URL of the Playwright service
+        test_plan: Test plan to execute
+        timeout: Request timeout in seconds
         logger: Logger instance for recording events
         
-    Returns:
-        A string containing the analysis
+    Yields:
+        The decoded NDJSON records
+        
+    Raises:
+        httpx.HTTPStatusError: If the service answers with an error status
+        httpx.RequestError: If the request fails or times out
+        ExecutionError: If a record is not valid JSON
     """
-    # Ask the LLM to analyze the test results
-    analysis = await llm.generate_str(
-        message=f"""
-        Create a markdown file with NOW date stamp as ddmmdd:time in the output folder 
-        Analyze these test results and provide a summary:\n{json.dumps(results, indent=2)}
-        Include the following sections:
-        - Summary of test execution
-        - Key findings
-        - Recommendations for improvement
-        - Any errors encountered during execution
-        - Suggestions for further testing
-        - Any other relevant observations
-        IMPORTANT:
-        - Use clear and concise language.
-        - Format the analysis in markdown.
-        - Include code snippets if necessary.
-        - Do not include any unnecessary information.
-        """
-    )
-    
-    logger.info("Test results analyzed")
-    return analysis
+    logger.debug(f"Streaming request to Playwright API at {playwright_url}/execute/stream")
+    async with client.stream("POST", f"{playwright_url}/execute/stream", json=test_plan, timeout=timeout) as response:
+        if response.status_code >= 400:
+            await response.aread()
+            logger.error(f"HTTP error: {response.status_code} - {response.text}")
+            record_http_response(response)
+            response.raise_for_status()
+        try:
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.error(f"400 :: Invalid record in result stream: {e}")
+                    raise ExecutionError(f"Invalid record in result stream: {str(e)}")
+        finally:
+            record_http_response(response)
 
-async def get_llm_instance(agent: Agent, llm_provider: str) -> OpenAIAugmentedLLM:
-    """Get an instance of the selected LLM provider.
+async def execute_test_plan_streaming(
+    client: httpx.AsyncClient,
+    playwright_url: str,
+    test_plan: Dict[str, Any],
+    max_retries: int,
+    timeout: float,
+    logger: Any,
+    fail_fast: bool = False,
+    retry_controller: Optional[RetryController] = None,
+    artifacts: Optional[ArtifactStore] = None
+) -> Dict[str, Any]:
+    """Execute a test plan, reporting step results live as they stream in.
+    
+    Only compact step records (without large payloads such as screenshots) are kept
+    in memory, the payloads are written to the artifact store if one is given. The
+    request is retried only if it fails before the first record, and only for the
+    transient errors execute_test_plan retries (network errors, 429 and 5xx).
     
     Args:
-        agent: Agent to attach the LLM to
-        llm_provider: Name of the LLM provider to use
+        client: HTTP client for making requests
+        playwright_url: URL of the Playwright service
+        test_plan: Test plan to execute
+        max_retries: Maximum number of retry attempts
+        timeout: Request timeout in seconds
+        logger: Logger instance for recording events
+        fail_fast: Stop the execution at the first failed check step
+        retry_controller: Backoff, retry budget and circuit breakers of the run
+        artifacts: Artifact store large payloads such as screenshots are moved to
         
     Returns:
-        An instance of the selected LLM
+        A dictionary containing the test results
+        
+    Raises:
+        ExecutionError: If execution fails
+    """
+    logger.info("Executing test plan with Playwright service (streaming)")
+    total_steps = len(test_plan.get("test_plan", {}).get("steps", []))
+    
+    retry_controller = retry_controller or RetryController()
+    retry_count = 0
+    while True:
+        # Fail fast while the service is known to be down
+        if not retry_controller.allow(playwright_url):
+            logger.error(f"400 :: Playwright API at {playwright_url} is unavailable (circuit open)")
+            raise ExecutionError(f"Playwright API at {playwright_url} is unavailable (circuit open)")
+        
+        records: List[Dict[str, Any]] = []
+        summary: Dict[str, Any] = {}
+        aborted = False
+        try:
+            # The stream is closed as soon as the loop ends, also on a fail fast break
+            async with contextlib.aclosing(stream_test_plan(client, playwright_url, test_plan, timeout, logger)) as stream:
+                async for record in stream:
+                    if record.get("type") == "summary":
+                        summary = {key: value for key, value in record.items() if key != "type"}
+                        continue
+                    
+                    if artifacts is not None:
+                        record = await asyncio.to_thread(artifacts.externalize_record, record)
+                    else:
+                        record = compact_step_record(record)
+                    records.append(record)
+                    passed = step_passed(record)
+                    logger.info(
+                        f"{'200' if passed else '400'} :: Step {len(records)}/{total_steps} "
+                        f"{record.get('action', '')}: {record.get('status', 'done')}"
+                    )
+                    
+                    # Closing the stream aborts the remaining steps on the service
+                    if fail_fast and not passed and record.get("action") == "check":
+                        logger.warning(f"Failing fast after failed check in step {len(records)}")
+                        aborted = True
+                        break
+            retry_controller.record_success(playwright_url)
+            break
+        except httpx.HTTPError as e:
+            if isinstance(e, httpx.TimeoutException):
+                error = "Streaming request to Playwright API timed out"
+            elif isinstance(e, httpx.HTTPStatusError):
+                error = f"HTTP {e.response.status_code} error: {e.response.text}"
+            else:
+                error = f"Streaming request to Playwright API failed: {str(e)}"
+            logger.error(f"400 :: {error}")
+            
+            # Any answer releases a half open circuit, only server errors count as failures
+            if isinstance(e, httpx.HTTPStatusError):
+                retry_controller.record_response(playwright_url, e.response.status_code)
+            else:
+                retry_controller.record_failure(playwright_url)
+            
+            # Don't retry client errors (4xx) except for 429 (Too Many Requests)
+            if not is_retryable_http_error(e):
+                raise ExecutionError(error)
+            if records or retry_count >= max_retries or not await retry_controller.backoff(
+                playwright_url, retry_count, get_http_retry_after(e)
+            ):
+                raise ExecutionError(error)
+            retry_count += 1
+            logger.info(f"Retrying streaming request ({retry_count}/{max_retries})...")
+        except Exception:
+            # The service answered (e.g. with an invalid record), release a half open circuit
+            retry_controller.record_success(playwright_url)
+            raise
+    
+    results = {**summary, "results": records}
+    results["success"] = summary.get("success", True) and all(step_passed(record) for record in records)
+    if aborted:
+        results["aborted"] = True
+    logger.info("Successfully executed test plan")
+    return results
+
+async def execute_sharded_test_plan(
+    client: httpx.AsyncClient,
+    playwright_urls: List[str],
+    test_plan: Dict[str, Any],
+    max_retries: int,
+    timeout: float,
+    logger: Any,
+    stream_results: bool = False,
+    fail_fast: bool = False,
+    retry_controller: Optional[RetryController] = None,
+    artifacts: Optional[ArtifactStore] = None,
+    reset_texts: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """Execute a test plan split into independent segments across several Playwright services.
+    
+    The plan is split at reset steps, each segment is sent with a navigate prefix to the
+    least loaded service, and the results are merged back in the original step order.
+    
+    Args:
+        client: HTTP client for making requests
+        playwright_urls: URLs of the Playwright services to shard across
+        test_plan: Validated test plan to execute
+        max_retries: Maximum number of retry attempts per segment
+        timeout: Request timeout in seconds
+        logger: Logger instance for recording events
+        stream_results: Use the streaming protocol and report step results live
+        fail_fast: Stop a (streamed) execution at the first failed check step
+        retry_controller: Backoff, retry budget and circuit breakers of the run
+        artifacts: Artifact store large payloads such as screenshots are moved to
+        reset_texts: Visible texts of the controls the plan is split at (default: DEFAULT_RESET_TEXTS)
+        
+    Returns:
+        A dictionary containing the merged test results
+    """
+    retry_controller = retry_controller or RetryController()
+    
+    async def execute(endpoint: str, plan: Dict[str, Any]) -> Dict[str, Any]:
+        if stream_results:
+            return await execute_test_plan_streaming(
+                client, endpoint, plan, max_retries, timeout, logger, fail_fast, retry_controller, artifacts
+            )
+        return await execute_test_plan(client, endpoint, plan, max_retries, timeout, logger, retry_controller, artifacts)
+    
+    segments = split_test_plan(test_plan, reset_texts or DEFAULT_RESET_TEXTS)
+    if len(playwright_urls) == 1 or len(segments) <= 1:
+        return await execute(playwright_urls[0], test_plan)
+    
+    logger.info(f"Executing test plan as {len(segments)} segments across {len(playwright_urls)} Playwright services")
+    scheduler = LeastLoadedScheduler(playwright_urls)
+    
+    async def execute_segment(segment) -> Dict[str, Any]:
+        async with scheduler.slot() as endpoint:
+            try:
+                results = await execute(endpoint, segment.to_plan(test_plan))
+                return {"endpoint": endpoint, "results": results}
+            except ExecutionError as e:
+                # Keep the other segments running, the failure is reported per step
+                logger.error(f"400 :: Segment {segment.index} failed on {endpoint}: {e}")
+                return {"endpoint": endpoint, "error": str(e)}
+    
+    segment_results = await asyncio.gather(*(execute_segment(segment) for segment in segments))
+    results = merge_segment_results(segments, segment_results)
+    logger.info("Successfully executed sharded test plan", data=results["shards"])
+    return results
+
+async def repair_failed_steps(
+    run_context: RunContext,
+    llm: OpenAIAugmentedLLM,
+    url: str,
+    plan_json: Dict[str, Any],
+    results: Dict[str, Any],
+    playwright_urls: List[str],
+    max_retries: int,
+    timeout: float,
+    max_repairs: int,
+    inventory_max_bytes: int = DEFAULT_INVENTORY_MAX_BYTES,
+    inventory_max_tokens: Optional[int] = None,
+    stream_results: bool = False,
+    fail_fast: bool = False,
+    retry_controller: Optional[RetryController] = None,
+    artifacts: Optional[ArtifactStore] = None,
+    reset_texts: Optional[Sequence[str]] = None
+) -> tuple:
+    """Re-plan and re-execute failed steps, resuming from the last good checkpoint.
+    
+    The checkpoint is the start of the independent segment (see split_test_plan) that
+    contains the failed step, so only that segment's steps up to the failure are
+    replayed before the patched steps instead of the whole plan.
+    
+    Args:
+        run_context: Shared HTTP client, logger and concurrency limits
+        llm: LLM instance that generated the test plan
+        url: Target website URL for testing
+        plan_json: Executed test plan
+        results: Results of the executed test plan
+        playwright_urls: URLs of the Playwright services to execute on
+        max_retries: Maximum number of retry attempts
+        timeout: Request timeout in seconds
+        max_repairs: Maximum number of repair attempts
+        inventory_max_bytes: Byte budget for the fresh element inventory
+        inventory_max_tokens: Optional token budget for the fresh element inventory
+        stream_results: Use the streaming protocol and report step results live
+        fail_fast: Stop a (streamed) execution at the first failed check step
+        retry_controller: Backoff, retry budget and circuit breakers of the run
+        artifacts: Artifact store large payloads such as screenshots are moved to
+        reset_texts: Visible texts of the controls that start a segment (default: DEFAULT_RESET_TEXTS)
+        
+    Returns:
+        A (plan, results, repairs) tuple with the repaired plan, the merged results
+        and a record of every repair attempt
+    """
+    logger = run_context.logger
+    repairs: List[Dict[str, Any]] = []
+    
+    for _ in range(max_repairs):
+        steps = plan_json["test_plan"]["steps"]
+        failed_index = first_failed_step(results)
+        if failed_index is None or failed_index >= len(steps):
+            break
+        
+        step_records = get_step_results(results)
+        failed_record = step_records[failed_index]
+        error = str(failed_record.get("error") or failed_record.get("message") or failed_record.get("status"))
+        
+        # Resume from the start of the segment containing the failed step
+        segments = split_test_plan(plan_json, reset_texts or DEFAULT_RESET_TEXTS)
+        segment = [segment for segment in segments if segment.start <= failed_index][-1]
+        navigate_steps = [step for step in segment.prefix + steps[segment.start:failed_index] if step.get("action") == "navigate"]
+        page_url = (navigate_steps[-1].get("value") if navigate_steps else None) or url
+        
+        # Take a fresh inventory of the page the failed segment runs on
+        async with run_context.playwright_limiter:
+            page_source = await fetch_page_source(
+                run_context.client, playwright_urls[0], page_url, logger, max_retries, retry_controller
+            )
+        # Rank the inventory against the error and the steps still to run
+        query = " ".join([error] + [f"{step.get('selector', '')} {step.get('value', '')}" for step in steps[failed_index:]])
+        page_elements = await asyncio.to_thread(
+            extract_page_elements, page_source, inventory_max_bytes, inventory_max_tokens, logger, query
+        )
+        
+        async with run_context.llm_limiter:
+            patch_steps = await repair_test_plan(
+                llm, url, steps, failed_index, error, page_elements, logger, retry_controller
+            )
+        
+        repaired_steps = steps[:failed_index] + patch_steps
+        resume_plan = {
+            **plan_json,
+            "test_plan": {**plan_json["test_plan"], "steps": segment.prefix + repaired_steps[segment.start:]}
+        }
+        async with run_context.playwright_limiter:
+            resume_results = await execute_sharded_test_plan(
+                run_context.client, playwright_urls, resume_plan, max_retries, timeout, logger,
+                stream_results, fail_fast, retry_controller, artifacts, reset_texts
+            )
+        
+        # Keep the records before the checkpoint, take the rest from the resumed run
+        resumed_records = get_step_results(resume_results)[len(segment.prefix):]
+        results = with_step_results(resume_results, step_records[:segment.start] + resumed_records)
+        plan_json = {**plan_json, "test_plan": {**plan_json["test_plan"], "steps": repaired_steps}}
+        repairs.append({
+            "failed_step": failed_index + 1,
+            "error": error,
+            "checkpoint": segment.start + 1,
+            "patched_steps": len(patch_steps)
+        })
+        logger.info(f"Resumed test plan from step {segment.start + 1} after repairing step {failed_index + 1}")
+    
+    return plan_json, results, repairs
+
+async def analyze_results(
+    llm: Optional[OpenAIAugmentedLLM],
+    results: Dict[str, Any],
+    logger: Any,
+    retry_controller: Optional[RetryController] = None,
+    plan_json: Optional[Dict[str, Any]] = None
+) -> str:
+    """Analyze the test results.
+    
+    The report is built locally from the results. The LLM is only asked to explain
+    failures, and only receives the failing steps and the steps leading up to them.
+    
+    Args:
+        llm: LLM instance for explaining failures (None reports without explanation)
+        results: Test results to analyze
+        logger: Logger instance for recording events
+        retry_controller: Backoff, retry budget and circuit breakers of the run
+        plan_json: Executed test plan
+        
+    Returns:
+        A string containing the analysis
+    """
+    analysis = build_results_report(plan_json, results)
+    if llm is None or not has_failures(results):
+        logger.info("Test results analyzed locally")
+        return analysis
+    
+    # Ask the LLM to explain the failures only
+    explanation = await generate_llm_str(
+        llm,
+        f"""
+        A Playwright test plan failed. These are the failing steps with the steps leading up to them:
+        {json.dumps(failure_context(plan_json, results), indent=2)}
+        Explain the failures in markdown with the following sections:
+        - Likely cause of each failure
+        - Recommendations to fix the test or the application
+        IMPORTANT:
+        - Use clear and concise language.
+        - Do not repeat the step results, they are already reported.
+        - Do not include any unnecessary information.
+        """,
+        retry_controller
+    )
+    
+    logger.info("Test results analyzed")
+    return f"{analysis}\n## Failure Analysis\n\n{explanation.strip()}\n"
+
+async def get_llm_instance(agent: Agent, llm_provider: str) -> OpenAIAugmentedLLM:
+    """Get an instance of the selected LLM provider.
+    
+    Args:
+        agent: Agent to attach the LLM to
+        llm_provider: Name of the LLM provider to use
+        
+    Returns:
+        An instance of the selected LLM
+        
+    Raises:
+        ExecutionError: If the provider is not recognized
     """
     # Select the appropriate LLM provider based on the configuration
     if llm_provider.lower() == "anthropic":
@@ -319,8 +1349,415 @@ async def get_llm_instance(agent: Agent, llm_provider: str) -> OpenAIAugmentedLL
     elif llm_provider.lower() == "openai":
         return await agent.attach_llm(OpenAIAugmentedLLM)
     else:
-        # Default to Anthropic if provider is not recognized
-        return await agent.attach_llm(AnthropicAugmentedLLM)
+        # A typo must not silently run the job on another provider
+        raise ExecutionError(f"Unknown LLM provider: {llm_provider} (available: {', '.join(LLM_PROVIDERS)})")
+
+async def get_job_llm(run_context: RunContext, llm_provider: str) -> OpenAIAugmentedLLM:
+    """Get the LLM of a job, routed across the providers when several are given.
+    
+    Args:
+        run_context: Shared agent, logger and provider health
+        llm_provider: Provider spec, a provider name or comma separated providers (see parse_provider_spec)
+        
+    Returns:
+        An instance of the provider's LLM, or a router over the instances of all providers
+        
+    Raises:
+        ExecutionError: If the provider spec is invalid
+    """
+    try:
+        costs = parse_provider_spec(llm_provider)
+    except LLMRouterError as e:
+        run_context.logger.error(f"400 :: {e}")
+        raise ExecutionError(str(e))
+    if len(costs) == 1:
+        return await get_llm_instance(run_context.agent, next(iter(costs)))
+    
+    # Every provider gets its own LLM instance, the router picks one per call
+    llms = {provider: await get_llm_instance(run_context.agent, provider) for provider in costs}
+    return LLMRouter(llms, costs, run_context.provider_health, run_context.logger)
+
+def get_llm_model_name(config: Any, llm_provider: str) -> Optional[str]:
+    """Get the configured default model of an LLM provider.
+    
+    Args:
+        config: MCP application settings
+        llm_provider: Name of the LLM provider
+        
+    Returns:
+        The configured model name, or None if it is not set
+    """
+    if "," in llm_provider:
+        # A routed plan may come from any of the providers
+        return ",".join(str(get_llm_model_name(config, provider)) for provider in parse_provider_spec(llm_provider))
+    # Unknown providers have no configured model
+    provider = llm_provider.strip().lower()
+    provider_settings = getattr(config, provider, None) if provider in LLM_PROVIDERS else None
+    return getattr(provider_settings, "default_model", None)
+
+async def get_cached_test_plan(
+    llm: OpenAIAugmentedLLM,
+    plan_cache: Optional[PlanCache],
+    cache_key: Optional[str],
+    url: str,
+    page_elements: str,
+    test_description: str,
+    logger: Any,
+    retry_controller: Optional[RetryController] = None,
+    selection: Optional[ChunkSelection] = None,
+    on_step: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """Get a test plan from the plan cache, generating it with the LLM on a miss.
+    
+    Args:
+        llm: LLM instance for generating test plans
+        plan_cache: Plan cache, or None if caching is disabled
+        cache_key: Content address of the plan in the cache
+        url: Target website URL for testing
+        page_elements: Element inventory of the target website
+        test_description: Description of the test requirements
+        logger: Logger instance for recording events
+        retry_controller: Backoff, retry budget and circuit breakers of the run
+        selection: Chunks the element inventory was selected from, if it was over budget
+        on_step: Called with every validated step as soon as it has been generated
+        
+    Returns:
+        A dictionary containing the test plan
+    """
+    if plan_cache is not None:
+        plan_json = plan_cache.get(cache_key)
+        if plan_json is not None:
+            logger.info(f"200 :: Plan cache hit for {url}", data=plan_cache.stats())
+            return plan_json
+        logger.info(f"Plan cache miss for {url}", data=plan_cache.stats())
+    
+    selection = selection or ChunkSelection.whole(page_elements)
+    return await generate_chunked_test_plan(llm, url, selection, test_description, logger, retry_controller, on_step)
+
+def create_test_agent() -> Agent:
+    """Create the test automation agent.
+    
+    Returns:
+        An agent connected to the fetch and filesystem MCP servers
+    """
+    return Agent(
+        name="tester",
+        instruction="""You are a Test Automation Expert. 
+            You can create test plans based on a given URL and description.
+            Important:
+            - Focus on creating detailed step-by-step test plans that can be executed by a Playwright testing service.
+            - When traslating from Actions to JSON only use these actions: navigate, click, type, wait, waitForLoadState, scroll, check, screenshot
+            - The test plans should be JSON objects with a description and array of steps.
+            - Review existing test analysis and results to improve your test plans from the output folder.
+            """,
+        server_names=["fetch", "filesystem"]
+    )
+
+async def record_run_history(
+    run_context: RunContext,
+    run_id: str,
+    url: str,
+    test_description: str,
+    test_data: Dict[str, Any],
+    error: Optional[str] = None,
+    mode: str = "run"
+) -> None:
+    """Record a run in the run history, if one is configured.
+    
+    Args:
+        run_context: Shared resources holding the run history
+        run_id: ID of the run
+        url: Target website URL
+        test_description: Description of the test requirements
+        test_data: Test data of the run
+        error: Error message of a run that did not finish
+        mode: How the run was started (run or replay)
+    """
+    if run_context.run_history is None:
+        return
+    status = "error" if error else ("failed" if has_failures(test_data.get("results")) else "passed")
+    try:
+        # Write off the event loop, a busy database must not stall other jobs
+        await asyncio.to_thread(
+            run_context.run_history.record_run, run_id, url, test_description, test_data, status, error, mode
+        )
+    except Exception as e:
+        # A history failure must not fail the test itself
+        run_context.logger.warning(f"Failed to record run {run_id} in the run history: {e}")
+
+async def prune_run_outputs(run_context: RunContext, output_dir: str) -> None:
+    """Remove the run directories of an output directory over the retention limits.
+    
+    Args:
+        run_context: Shared resources holding the retention limits
+        output_dir: Output directory holding the run directories
+    """
+    try:
+        # Removing screenshots of many runs takes a while, keep it off the event loop
+        removed = await asyncio.to_thread(
+            prune_run_dirs, output_dir, run_context.output_max_runs, run_context.output_max_age_days
+        )
+    except Exception as e:
+        # A cleanup failure must not fail the test itself
+        run_context.logger.warning(f"Failed to prune the run directories of {output_dir}: {e}")
+        return
+    if removed:
+        run_context.logger.info(f"Removed {len(removed)} old run directories from {output_dir}")
+
+def export_run_metrics(metrics: Dict[str, Any], metrics_format: str, logger: Any, labels: Dict[str, Any]) -> None:
+    """Export the metrics of a run through the logger and its configured transports.
+    
+    Args:
+        metrics: Metrics of the run (see RunMetrics.to_dict)
+        metrics_format: Export format: none, prometheus or otel
+        logger: Logger instance for recording events
+        labels: Labels (or span attributes) identifying the run
+    """
+    if metrics_format == "prometheus":
+        logger.info("Run metrics", data={"format": "prometheus", "exposition": to_prometheus(metrics, labels)})
+    elif metrics_format == "otel":
+        # One event per span, a file transport then writes OpenTelemetry compatible JSONL
+        for span in to_otel_spans(metrics, labels):
+            logger.info("Run span", data={"format": "otel", "span": span})
+
+async def run_test_job(
+    run_context: RunContext,
+    url: str,
+    test_description: str,
+    playwright_url: str = DEFAULT_PLAYWRIGHT_URL,
+    output_dir: str = DEFAULT_OUTPUT_DIR,
+    timeout: float = DEFAULT_TIMEOUT,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    llm_provider: str = DEFAULT_LLM_PROVIDER,
+    inventory_max_bytes: int = DEFAULT_INVENTORY_MAX_BYTES,
+    inventory_max_tokens: Optional[int] = None,
+    playwright_workers: Optional[List[str]] = None,
+    max_repairs: int = DEFAULT_MAX_REPAIRS,
+    selector_check: str = DEFAULT_SELECTOR_CHECK,
+    stream_results: bool = False,
+    fail_fast: bool = False,
+    retry_budget: int = DEFAULT_RETRY_BUDGET,
+    metrics_format: str = DEFAULT_METRICS_FORMAT,
+    plan_optimizations: str = DEFAULT_PLAN_OPTIMIZATIONS,
+    reset_texts: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """Run a single test job with already started shared resources.
+    
+    Args:
+        run_context: Shared agent, HTTP client, logger, plan cache and concurrency limits
+        url: Target website URL to test
+        test_description: Description of the test requirements
+        playwright_url: URL of the Playwright service
+        output_dir: Directory to save test artifacts, every run writes to its own <run id> subdirectory
+        timeout: Request timeout in seconds
+        max_retries: Maximum retry attempts for API calls
+        llm_provider: LLM provider to use (anthropic or openai), comma separated providers are routed by latency
+        inventory_max_bytes: Byte budget for the element inventory sent to the LLM (0 sends the raw page source)
+        inventory_max_tokens: Optional token budget for the element inventory
+        playwright_workers: Playwright services to shard plan execution across (default: playwright_url only)
+        max_repairs: Maximum number of re-planning attempts for failed steps (0 disables repair)
+        selector_check: Local selector resolution mode (off, warn, fix or strict)
+        stream_results: Use the streaming protocol of the Playwright service and report step results live
+        fail_fast: Stop a streamed execution at the first failed check step
+        retry_budget: Maximum number of retries across all calls of the test
+        metrics_format: Export format of the run metrics (none, prometheus or otel)
+        plan_optimizations: Plan optimizer rules applied before execution ("none" disables the optimizer)
+        reset_texts: Visible texts of the reset controls plans are sharded and repaired at (default: DEFAULT_RESET_TEXTS)
+        
+    Returns:
+        A dictionary containing the test plan, results, and analysis, and the run ID and output directory
+        
+    Raises:
+        ExecutionError: If any stage of the test fails
+    """
+    logger = run_context.logger
+    client = run_context.client
+    plan_cache = run_context.plan_cache
+    retry_controller = run_context.create_retry_controller(retry_budget)
+    metrics = RunMetrics()
+    run_id = make_run_id()
+    # Concurrent and consecutive runs never overwrite each other's files
+    runs_dir = output_dir
+    output_dir = run_output_dir(runs_dir, run_id)
+    # Screenshots and other large payloads are kept on disk next to the plan
+    artifacts = ArtifactStore(output_dir)
+    
+    async def fetch_page_elements() -> tuple:
+        # Fetch page source, unless a recent snapshot of the page is stored
+        with metrics.span("fetch") as span:
+            page_source, snapshot = await fetch_page_snapshot(run_context, playwright_url, url, max_retries, retry_controller)
+            if snapshot is not None:
+                span["attributes"]["snapshot_reused"] = snapshot["reused"]
+        
+        # Reduce the page source to the elements the planner can target, most relevant first.
+        # Parsing a large page takes seconds, keep it off the event loop
+        with metrics.span("extract", page_bytes=len(page_source)) as span:
+            inventory = None
+            page_index = None
+            if inventory_max_bytes:
+                # The selector check indexes the page from the same parse
+                listeners = [PageIndexBuilder()] if selector_check != "off" else []
+                inventory = await asyncio.to_thread(
+                    extract_element_inventory,
+                    page_source,
+                    max_bytes=inventory_max_bytes,
+                    max_tokens=inventory_max_tokens,
+                    listeners=listeners
+                )
+                page_index = await asyncio.to_thread(listeners[0].build) if listeners else None
+            selection = await asyncio.to_thread(
+                select_page_elements,
+                page_source, inventory_max_bytes, inventory_max_tokens, logger, query=test_description, inventory=inventory
+            )
+            span["attributes"].update(selection.stats())
+        
+        # A fetched page is stored with the inventory of the same parse
+        if snapshot is None:
+            snapshot = await store_page_snapshot(run_context, url, page_source, inventory)
+        return page_source, selection, snapshot, page_index
+    
+    async def attach_llm() -> OpenAIAugmentedLLM:
+        # The agent may still be starting its MCP servers
+        if run_context.agent_ready is not None:
+            await run_context.agent_ready.wait()
+        # Connect to the specified LLM, each job gets its own conversation history
+        return await get_job_llm(run_context, llm_provider)
+    
+    try:
+        with activate_run_metrics(metrics), metrics.span("job", url=url, llm_provider=llm_provider):
+            # Fetch the page while the LLM is attached
+            (page_source, selection, snapshot, page_index), llm = await gather_or_cancel(fetch_page_elements(), attach_llm())
+            page_elements = selection.text
+        
+            # Reuse a cached plan for unchanged pages and descriptions
+            cache_key = None
+            if plan_cache is not None:
+                model = get_llm_model_name(run_context.config, llm_provider)
+                cache_key = make_plan_cache_key(url, page_elements, test_description, llm_provider, model)
+        
+            # Generate test plan
+            with metrics.span("plan") as span:
+                plan_started = time.perf_counter()
+            
+                def record_step(step: Dict[str, Any]) -> None:
+                    # Latency until the first step was parsed from the streamed plan
+                    span["attributes"].setdefault("first_step_ms", round((time.perf_counter() - plan_started) * 1000, 3))
+            
+                async with run_context.llm_limiter:
+                    plan_json = await get_cached_test_plan(
+                        llm, plan_cache, cache_key, url, page_elements, test_description, logger, retry_controller, selection,
+                        record_step
+                    )
+        
+            with metrics.span("validate") as span:
+                # Save the test plan off the event loop
+                await asyncio.to_thread(save_test_plan, plan_json, output_dir, logger)
+            
+                # Validate the test plan
+                validate_test_plan(plan_json, logger)
+            
+                # Resolve the selectors locally before any remote execution, off the event loop
+                checked_plan = await asyncio.to_thread(
+                    check_test_plan_selectors, plan_json, page_source, selector_check, logger, page_index
+                )
+                # The index of a large page is big, it is not needed after the check
+                page_index = None
+            
+                # Drop redundant waits, navigations and screenshots
+                checked_plan, optimizations = optimize_plan(checked_plan, plan_optimizations, logger)
+                if optimizations:
+                    span["attributes"]["estimated_ms_saved"] = optimizations["estimated_ms_saved"]
+                if checked_plan != plan_json:
+                    plan_json = checked_plan
+                    await asyncio.to_thread(save_test_plan, plan_json, output_dir, logger)
+        
+            # Only cache plans that passed validation
+            if plan_cache is not None:
+                plan_cache.put(cache_key, plan_json)
+        
+            # Execute the test plan
+            with metrics.span("execute", steps=len(plan_json["test_plan"]["steps"])):
+                async with run_context.playwright_limiter:
+                    results = await execute_sharded_test_plan(
+                        client, 
+                        playwright_workers or [playwright_url], 
+                        plan_json, 
+                        max_retries, 
+                        timeout,
+                        logger,
+                        stream_results,
+                        fail_fast,
+                        retry_controller,
+                        artifacts,
+                        reset_texts
+                    )
+        
+            # Re-plan failed steps and resume from the last good checkpoint
+            repairs = []
+            if max_repairs:
+                with metrics.span("repair"):
+                    plan_json, results, repairs = await repair_failed_steps(
+                        run_context, llm, url, plan_json, results, playwright_workers or [playwright_url],
+                        max_retries, timeout, max_repairs, inventory_max_bytes, inventory_max_tokens,
+                        stream_results, fail_fast, retry_controller, artifacts, reset_texts
+                    )
+                # A repaired plan that passes replaces the cached one
+                if repairs and plan_cache is not None and first_failed_step(results) is None:
+                    plan_cache.put(cache_key, plan_json)
+        
+            async def analyze() -> str:
+                with metrics.span("analysis"):
+                    # Passing runs are reported locally without taking an LLM slot
+                    if not has_failures(results):
+                        analysis = await analyze_results(None, results, logger, plan_json=plan_json)
+                    else:
+                        async with run_context.llm_limiter:
+                            analysis = await analyze_results(llm, results, logger, retry_controller, plan_json)
+                await asyncio.to_thread(save_analysis, analysis, output_dir, logger)
+                return analysis
+        
+            # Analyze the results while the repaired plan is saved
+            if repairs:
+                analysis, _ = await gather_or_cancel(
+                    analyze(), asyncio.to_thread(save_test_plan, plan_json, output_dir, logger)
+                )
+            else:
+                analysis = await analyze()
+    
+    except Exception as e:
+        # Failed runs are part of the history too
+        metrics_data = metrics.to_dict(retry_controller.stats())
+        await record_run_history(run_context, run_id, url, test_description, {"metrics": metrics_data}, str(e), "run")
+        await prune_run_outputs(run_context, runs_dir)
+        raise
+    
+    # Return the complete test data
+    test_data = {
+        "run_id": run_id,
+        "output_dir": output_dir,
+        "test_plan": plan_json,
+        "results": results,
+        "analysis": analysis,
+        "retries": retry_controller.stats()
+    }
+    test_data["metrics"] = metrics.to_dict(test_data["retries"])
+    if optimizations:
+        test_data["optimizations"] = optimizations
+    if snapshot is not None:
+        test_data["snapshot"] = snapshot
+    if repairs:
+        test_data["repairs"] = repairs
+    if plan_cache is not None:
+        test_data["plan_cache"] = plan_cache.stats()
+    if isinstance(llm, LLMRouter):
+        test_data["llm_routing"] = llm.stats()
+    if artifacts.stored or artifacts.deduplicated:
+        test_data["artifacts"] = artifacts.stats()
+    if run_context.run_history is not None:
+        await record_run_history(run_context, run_id, url, test_description, test_data)
+    await prune_run_outputs(run_context, runs_dir)
+    export_run_metrics(test_data["metrics"], metrics_format, logger, {"url": url, "llm_provider": llm_provider})
+    return test_data
 
 async def run_test_on_website(
     url: str, 
@@ -329,7 +1766,25 @@ async def run_test_on_website(
     output_dir: str = DEFAULT_OUTPUT_DIR,
     timeout: float = DEFAULT_TIMEOUT,
     max_retries: int = DEFAULT_MAX_RETRIES,
-    llm_provider: str = DEFAULT_LLM_PROVIDER
+    llm_provider: str = DEFAULT_LLM_PROVIDER,
+    inventory_max_bytes: int = DEFAULT_INVENTORY_MAX_BYTES,
+    inventory_max_tokens: Optional[int] = None,
+    plan_cache_dir: Optional[str] = None,
+    plan_cache_max_age: float = DEFAULT_PLAN_CACHE_MAX_AGE,
+    snapshot_dir: Optional[str] = None,
+    snapshot_ttl: float = DEFAULT_SNAPSHOT_TTL,
+    history_db: Optional[str] = None,
+    history_max_age_days: float = DEFAULT_HISTORY_MAX_AGE_DAYS,
+    llm_hedge_after: float = DEFAULT_HEDGE_AFTER,
+    playwright_workers: Optional[List[str]] = None,
+    max_repairs: int = DEFAULT_MAX_REPAIRS,
+    selector_check: str = DEFAULT_SELECTOR_CHECK,
+    stream_results: bool = False,
+    fail_fast: bool = False,
+    retry_budget: int = DEFAULT_RETRY_BUDGET,
+    metrics_format: str = DEFAULT_METRICS_FORMAT,
+    plan_optimizations: str = DEFAULT_PLAN_OPTIMIZATIONS,
+    reset_texts: Optional[Sequence[str]] = None
 ) -> Dict[str, Any]:
     """Run tests on a website using the Playwright service based on a prompt.
     
@@ -342,7 +1797,25 @@ async def run_test_on_website(
         output_dir: Directory to save test artifacts
         timeout: Request timeout in seconds
         max_retries: Maximum retry attempts for API calls
-        llm_provider: LLM provider to use (anthropic or openai)
+        llm_provider: LLM provider to use (anthropic or openai), comma separated providers are routed by latency
+        inventory_max_bytes: Byte budget for the element inventory sent to the LLM (0 sends the raw page source)
+        inventory_max_tokens: Optional token budget for the element inventory
+        plan_cache_dir: Directory of the test plan cache (None disables caching)
+        plan_cache_max_age: Maximum age of a cached test plan in seconds
+        snapshot_dir: Directory of the page snapshot store (None disables snapshots)
+        snapshot_ttl: Seconds a stored page snapshot is used instead of fetching the page
+        history_db: SQLite database of the run history (None disables the history)
+        history_max_age_days: Days a run is kept in the run history
+        llm_hedge_after: Seconds before a pending call to a routed LLM provider is also sent to the next one (0 disables)
+        playwright_workers: Playwright services to shard plan execution across (default: playwright_url only)
+        max_repairs: Maximum number of re-planning attempts for failed steps (0 disables repair)
+        selector_check: Local selector resolution mode (off, warn, fix or strict)
+        stream_results: Use the streaming protocol of the Playwright service and report step results live
+        fail_fast: Stop a streamed execution at the first failed check step
+        retry_budget: Maximum number of retries across all calls of the test
+        metrics_format: Export format of the run metrics (none, prometheus or otel)
+        plan_optimizations: Plan optimizer rules applied before execution ("none" disables the optimizer)
+        reset_texts: Visible texts of the reset controls plans are sharded and repaired at (default: DEFAULT_RESET_TEXTS)
         
     Returns:
         A dictionary containing the test plan, results, and analysis
@@ -352,63 +1825,454 @@ async def run_test_on_website(
         logger = mcp_agent_app.logger
         
         # Create a test automation agent
-        test_agent = Agent(
-            name="tester",
-            instruction="""You are a Test Automation Expert. 
-                You can create test plans based on a given URL and description.
-                Important:
-                - Focus on creating detailed step-by-step test plans that can be executed by a Playwright testing service.
-                - When traslating from Actions to JSON only use these actions: navigate, click, type, wait, waitForLoadState, scroll, check, screenshot
-                - The test plans should be JSON objects with a description and array of steps.
-                - Review existing test analysis and results to improve your test plans from the output folder.
-                """,
-            server_names=["fetch", "filesystem"]
+        test_agent = create_test_agent()
+
+        try:
+            # Create HTTP client for API calls
+            async with httpx.AsyncClient() as client:
+                run_context = RunContext(
+                    agent=test_agent,
+                    client=client,
+                    logger=logger,
+                    config=mcp_agent_app.context.config,
+                    plan_cache=PlanCache(plan_cache_dir, max_age=plan_cache_max_age) if plan_cache_dir else None,
+                    snapshot_store=SnapshotStore(snapshot_dir, ttl=snapshot_ttl) if snapshot_dir else None,
+                    run_history=RunHistory(history_db, max_age_days=history_max_age_days) if history_db else None,
+                    output_max_age_days=history_max_age_days,
+                    provider_health=ProviderHealth(hedge_after=llm_hedge_after),
+                    agent_ready=asyncio.Event()
+                )
+                
+                # Start the job right away, the page is fetched while the agent starts
+                job_task = asyncio.create_task(run_test_job(
+                    run_context,
+                    url,
+                    test_description,
+                    playwright_url,
+                    output_dir,
+                    timeout,
+                    max_retries,
+                    llm_provider,
+                    inventory_max_bytes,
+                    inventory_max_tokens,
+                    playwright_workers,
+                    max_repairs,
+                    selector_check,
+                    stream_results,
+                    fail_fast,
+                    retry_budget,
+                    metrics_format,
+                    plan_optimizations,
+                    reset_texts
+                ))
+                try:
+                    # Start the test agent
+                    async with test_agent:
+                        run_context.agent_ready.set()
+                        
+                        # List available tools while the job runs
+                        tools = await test_agent.list_tools()
+                        logger.info("Tools available:", data=tools)
+                        
+                        return await job_task
+                finally:
+                    # Stop the job if the agent failed to start, and retrieve its outcome
+                    # so it is neither left running nor reported as never retrieved
+                    job_task.cancel()
+                    with contextlib.suppress(asyncio.CancelledError, Exception):
+                        await job_task
+        except ExecutionError as e:
+            # Handle test execution errors
+            logger.error(f"Test execution error: {e}")
+            return {"error": str(e)}
+        except Exception as e:
+            # Handle unexpected errors
+            logger.error(f"Unexpected error: {e}", exc_info=True)
+            return {"error": f"Unexpected error: {str(e)}"}
+
+async def run_suite_job(run_context: RunContext, job: Dict[str, Any], output_dir: str, job_options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one job of a test suite and write its artifacts to a job subdirectory.
+    
+    Args:
+        run_context: Resources shared by all jobs of the suite
+        job: Normalized manifest job with id, url, description and optional overrides
+        output_dir: Root output directory of the suite
+        job_options: Suite-wide job settings, overridden by the job's own settings
+        
+    Returns:
+        The job id, output directory and test data (or error)
+    """
+    logger = run_context.logger
+    options = {**job_options, **{key: job[key] for key in JOB_OPTION_KEYS if key in job}}
+    job_dir = job_output_dir(output_dir, job["id"])
+    
+    logger.info(f"Starting suite job {job['id']}")
+    try:
+        result = await run_test_job(
+            run_context, job["url"], job["description"], output_dir=job_dir, **options
         )
+    except ExecutionError as e:
+        # Handle test execution errors
+        logger.error(f"Test execution error in job {job['id']}: {e}")
+        result = {"error": str(e)}
+    except Exception as e:
+        # Handle unexpected errors
+        logger.error(f"Unexpected error in job {job['id']}: {e}", exc_info=True)
+        result = {"error": f"Unexpected error: {str(e)}"}
+    
+    # Keep the full test data next to the plan of the run, jobs that failed early have no run directory
+    job_dir = result.get("output_dir", job_dir)
+    os.makedirs(job_dir, exist_ok=True)
+    write_text_atomic(os.path.join(job_dir, "result.json"), json.dumps(result, indent=2, default=str))
+    
+    return {"id": job["id"], "output_dir": job_dir, "result": result}
+
+async def run_test_suite(
+    jobs: List[Dict[str, Any]],
+    output_dir: str = DEFAULT_OUTPUT_DIR,
+    concurrency: int = DEFAULT_SUITE_CONCURRENCY,
+    llm_concurrency: int = DEFAULT_LLM_CONCURRENCY,
+    playwright_concurrency: int = DEFAULT_PLAYWRIGHT_CONCURRENCY,
+    plan_cache_dir: Optional[str] = None,
+    plan_cache_max_age: float = DEFAULT_PLAN_CACHE_MAX_AGE,
+    snapshot_dir: Optional[str] = None,
+    snapshot_ttl: float = DEFAULT_SNAPSHOT_TTL,
+    history_db: Optional[str] = None,
+    history_max_age_days: float = DEFAULT_HISTORY_MAX_AGE_DAYS,
+    llm_hedge_after: float = DEFAULT_HEDGE_AFTER,
+    **job_options: Any
+) -> Dict[str, Any]:
+    """Run many test jobs concurrently under a single MCP application.
+    
+    The MCP servers, agent, HTTP connection pool and plan cache are started once and
+    shared by every job, with separate limits for LLM and Playwright service calls.
+    
+    Args:
+        jobs: Normalized manifest jobs
+        output_dir: Root directory for the per-job output subdirectories
+        concurrency: Maximum number of jobs running at the same time
+        llm_concurrency: Maximum number of concurrent LLM calls
+        playwright_concurrency: Maximum number of concurrent Playwright service calls
+        plan_cache_dir: Directory of the test plan cache (None disables caching)
+        plan_cache_max_age: Maximum age of a cached test plan in seconds
+        snapshot_dir: Directory of the page snapshot store (None disables snapshots)
+        snapshot_ttl: Seconds a stored page snapshot is used instead of fetching the page
+        history_db: SQLite database of the run history (None disables the history)
+        history_max_age_days: Days a run is kept in the run history
+        llm_hedge_after: Seconds before a pending call to a routed LLM provider is also sent to the next one (0 disables)
+        **job_options: Default settings for every job (playwright_url, timeout, ...)
+        
+    Returns:
+        A suite summary with the status and output directory of every job
+    """
+    # Start the MCP application
+    async with app.run() as mcp_agent_app:
+        logger = mcp_agent_app.logger
+        test_agent = create_test_agent()
 
         try:
-            # Start the test agent
             async with test_agent:
-                # List available tools
+                # List the tools once for the whole suite
                 tools = await test_agent.list_tools()
                 logger.info("Tools available:", data=tools)
 
-                # Create HTTP client for API calls
-                async with httpx.AsyncClient() as client:
-                    # Fetch page source
-                    page_source = await fetch_page_source(client, playwright_url, url, logger)
-                    
-                    # Connect to the specified LLM
-                    llm = await get_llm_instance(test_agent, llm_provider)
-                    
-                    # Generate test plan
-                    plan_json = await generate_test_plan(llm, url, page_source, test_description, logger)
-                    
-                    # Save the test plan
-                    save_test_plan(plan_json, output_dir, logger)
-                    
-                    # Validate the test plan
-                    validate_test_plan(plan_json, logger)
-                    
-                    # Execute the test plan
-                    results = await execute_test_plan(
-                        client, 
-                        playwright_url, 
-                        plan_json, 
-                        max_retries, 
+                # One pooled HTTP client sized for the Playwright concurrency
+                limits = httpx.Limits(
+                    max_connections=playwright_concurrency * 2,
+                    max_keepalive_connections=playwright_concurrency
+                )
+                async with httpx.AsyncClient(limits=limits) as client:
+                    run_context = RunContext(
+                        agent=test_agent,
+                        client=client,
+                        logger=logger,
+                        config=mcp_agent_app.context.config,
+                        plan_cache=PlanCache(plan_cache_dir, max_age=plan_cache_max_age) if plan_cache_dir else None,
+                        snapshot_store=SnapshotStore(snapshot_dir, ttl=snapshot_ttl) if snapshot_dir else None,
+                        run_history=RunHistory(history_db, max_age_days=history_max_age_days) if history_db else None,
+                        output_max_age_days=history_max_age_days,
+                        provider_health=ProviderHealth(hedge_after=llm_hedge_after),
+                        llm_limiter=asyncio.Semaphore(llm_concurrency),
+                        playwright_limiter=asyncio.Semaphore(playwright_concurrency)
+                    )
+                    job_limiter = asyncio.Semaphore(concurrency)
+
+                    async def run_bounded(job: Dict[str, Any]) -> Dict[str, Any]:
+                        async with job_limiter:
+                            return await run_suite_job(run_context, job, output_dir, job_options)
+
+                    job_results = await asyncio.gather(*(run_bounded(job) for job in jobs))
+
+        except Exception as e:
+            # Handle errors starting the shared resources
+            logger.error(f"Unexpected error: {e}", exc_info=True)
+            return {"error": f"Unexpected error: {str(e)}"}
+
+        # Write the suite summary next to the job subdirectories
+        summary = summarize_suite(job_results)
+        os.makedirs(output_dir, exist_ok=True)
+        write_text_atomic(os.path.join(output_dir, "suite_summary.json"), json.dumps(summary, indent=2))
+        logger.info(f"Suite finished: {summary['completed']}/{summary['total']} jobs completed")
+        return summary
+
+def load_test_plans(plan_path: str) -> List[tuple]:
+    """Load saved test plans for replay.
+    
+    Args:
+        plan_path: A plan JSON file, or a directory of plan files (`*.json` and `*/plan.json`); of run
+            directories (`<run id>/plan.json`) only the plan of the latest run is loaded
+        
+    Returns:
+        A list of (plan id, plan) tuples
+        
+    Raises:
+        ExecutionError: If no plan can be loaded
+    """
+    if os.path.isdir(plan_path):
+        candidates = sorted(glob.glob(os.path.join(plan_path, "*.json")))
+        # The latest run of the directory itself and of every job directory in it
+        directories = [plan_path] + sorted(
+            path for path in glob.glob(os.path.join(plan_path, "*"))
+            if os.path.isdir(path) and not is_run_id(os.path.basename(path))
+        )
+        for directory in directories:
+            path = latest_run_file(directory, "plan.json")
+            if path is None and directory != plan_path and os.path.isfile(os.path.join(directory, "plan.json")):
+                path = os.path.join(directory, "plan.json")
+            if path is not None:
+                candidates.append(path)
+    else:
+        candidates = [plan_path]
+    
+    plans = []
+    for index, path in enumerate(candidates, start=1):
+        try:
+            with open(path) as f:
+                plan_json = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise ExecutionError(f"Failed to load test plan {path}: {str(e)}")
+        
+        # Directories may hold results and summaries next to the plans
+        if os.path.isdir(plan_path) and not (isinstance(plan_json, dict) and "test_plan" in plan_json):
+            continue
+        
+        # Plans saved by suite jobs are named after their job directory, not their run directory
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name == "plan":
+            directory = os.path.dirname(os.path.abspath(path))
+            if is_run_id(os.path.basename(directory)):
+                directory = os.path.dirname(directory)
+            name = os.path.basename(directory)
+        plans.append((make_job_id(name, index), plan_json))
+    
+    if not plans:
+        raise ExecutionError(f"No test plans found in {plan_path}")
+    return plans
+
+async def replay_test_plan(
+    run_context: RunContext,
+    plan_json: Dict[str, Any],
+    playwright_url: str = DEFAULT_PLAYWRIGHT_URL,
+    timeout: float = DEFAULT_TIMEOUT,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    llm_provider: str = DEFAULT_LLM_PROVIDER,
+    skip_analysis: bool = False,
+    playwright_workers: Optional[List[str]] = None,
+    stream_results: bool = False,
+    fail_fast: bool = False,
+    retry_budget: int = DEFAULT_RETRY_BUDGET,
+    metrics_format: str = DEFAULT_METRICS_FORMAT,
+    output_dir: Optional[str] = None,
+    reset_texts: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """Execute a saved test plan without generating a new one.
+    
+    Args:
+        run_context: Shared HTTP client, logger and concurrency limits (agent only needed for analysis)
+        plan_json: Previously saved test plan
+        playwright_url: URL of the Playwright service
+        timeout: Request timeout in seconds
+        max_retries: Maximum retry attempts for API calls
+        llm_provider: LLM provider to use for the analysis, comma separated providers are routed by latency
+        skip_analysis: Skip the LLM explanation of failures, results are still reported locally
+        playwright_workers: Playwright services to shard plan execution across (default: playwright_url only)
+        stream_results: Use the streaming protocol of the Playwright service and report step results live
+        fail_fast: Stop a streamed execution at the first failed check step
+        retry_budget: Maximum number of retries across all calls of the replay
+        metrics_format: Export format of the run metrics (none, prometheus or otel)
+        output_dir: Output directory of the replay, each replay writes to its own run directory under it
+            and large payloads such as screenshots are stored there (default: payloads are dropped from the results)
+        reset_texts: Visible texts of the reset controls the plan is sharded at (default: DEFAULT_RESET_TEXTS)
+        
+    Returns:
+        A dictionary containing the test plan, results, and analysis, and the run ID and output directory
+        
+    Raises:
+        ExecutionError: If the plan is invalid or execution fails
+    """
+    logger = run_context.logger
+    retry_controller = run_context.create_retry_controller(retry_budget)
+    metrics = RunMetrics()
+    run_id = make_run_id()
+    description = plan_json.get("test_plan", {}).get("description", "")
+    # Concurrent and consecutive replays never overwrite each other's files
+    runs_dir = output_dir
+    output_dir = run_output_dir(runs_dir, run_id) if runs_dir else None
+    artifacts = ArtifactStore(output_dir) if output_dir else None
+    
+    try:
+        with activate_run_metrics(metrics), metrics.span("replay", url=plan_json.get("url", "")):
+            # Validate the saved test plan
+            validate_test_plan(plan_json, logger)
+        
+            # Execute the test plan
+            with metrics.span("execute", steps=len(plan_json["test_plan"]["steps"])):
+                async with run_context.playwright_limiter:
+                    results = await execute_sharded_test_plan(
+                        run_context.client,
+                        playwright_workers or [playwright_url],
+                        plan_json,
+                        max_retries,
                         timeout,
-                        logger
+                        logger,
+                        stream_results,
+                        fail_fast,
+                        retry_controller,
+                        artifacts,
+                        reset_texts
                     )
+        
+            # Analyze the results, only failures need the LLM
+            with metrics.span("analysis"):
+                if skip_analysis or run_context.agent is None or not has_failures(results):
+                    llm = None
+                    analysis = await analyze_results(None, results, logger, plan_json=plan_json)
+                else:
+                    llm = await get_job_llm(run_context, llm_provider)
+                    async with run_context.llm_limiter:
+                        analysis = await analyze_results(llm, results, logger, retry_controller, plan_json)
+            test_data = {"run_id": run_id, "test_plan": plan_json, "results": results, "analysis": analysis}
+            if output_dir:
+                test_data["output_dir"] = output_dir
+            if isinstance(llm, LLMRouter):
+                test_data["llm_routing"] = llm.stats()
+            if artifacts is not None and (artifacts.stored or artifacts.deduplicated):
+                test_data["artifacts"] = artifacts.stats()
+    
+    except Exception as e:
+        # Failed runs are part of the history too
+        metrics_data = metrics.to_dict(retry_controller.stats())
+        await record_run_history(run_context, run_id, plan_json.get("url", ""), description, {"metrics": metrics_data}, str(e), "replay")
+        if runs_dir:
+            await prune_run_outputs(run_context, runs_dir)
+        raise
+    
+    test_data["retries"] = retry_controller.stats()
+    test_data["metrics"] = metrics.to_dict(test_data["retries"])
+    if run_context.run_history is not None:
+        await record_run_history(run_context, run_id, plan_json.get("url", ""), description, test_data, mode="replay")
+    if runs_dir:
+        await prune_run_outputs(run_context, runs_dir)
+    export_run_metrics(test_data["metrics"], metrics_format, logger, {"url": plan_json.get("url", ""), "mode": "replay"})
+    return test_data
+
+async def replay_test_plans(
+    plan_path: str,
+    playwright_url: str = DEFAULT_PLAYWRIGHT_URL,
+    output_dir: str = DEFAULT_OUTPUT_DIR,
+    timeout: float = DEFAULT_TIMEOUT,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    llm_provider: str = DEFAULT_LLM_PROVIDER,
+    skip_analysis: bool = False,
+    playwright_concurrency: int = DEFAULT_PLAYWRIGHT_CONCURRENCY,
+    playwright_workers: Optional[List[str]] = None,
+    stream_results: bool = False,
+    fail_fast: bool = False,
+    retry_budget: int = DEFAULT_RETRY_BUDGET,
+    metrics_format: str = DEFAULT_METRICS_FORMAT,
+    history_db: Optional[str] = None,
+    history_max_age_days: float = DEFAULT_HISTORY_MAX_AGE_DAYS,
+    llm_hedge_after: float = DEFAULT_HEDGE_AFTER,
+    reset_texts: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """Replay saved test plans against the Playwright service.
+    
+    Page fetching and plan generation are skipped entirely; with skip_analysis no
+    agent, MCP server or LLM is started and the replay uses no tokens.
+    
+    Args:
+        plan_path: A plan JSON file, or a directory of plan files
+        playwright_url: URL of the Playwright service
+        output_dir: Root directory for the per-plan output subdirectories
+        timeout: Request timeout in seconds
+        max_retries: Maximum retry attempts for API calls
+        llm_provider: LLM provider to use for the analysis, comma separated providers are routed by latency
+        skip_analysis: Skip the LLM analysis of the results
+        playwright_concurrency: Maximum number of plans executing at the same time
+        playwright_workers: Playwright services to shard plan execution across (default: playwright_url only)
+        stream_results: Use the streaming protocol of the Playwright service and report step results live
+        fail_fast: Stop a streamed execution at the first failed check step
+        retry_budget: Maximum number of retries across all calls of each replayed plan
+        metrics_format: Export format of the run metrics (none, prometheus or otel)
+        history_db: SQLite database of the run history (None disables the history)
+        history_max_age_days: Days a run is kept in the run history
+        llm_hedge_after: Seconds before a pending call to a routed LLM provider is also sent to the next one (0 disables)
+        reset_texts: Visible texts of the reset controls plans are sharded at (default: DEFAULT_RESET_TEXTS)
+        
+    Returns:
+        The test data of a single plan, or a summary when replaying a directory
+    """
+    # Start the MCP application
+    async with app.run() as mcp_agent_app:
+        logger = mcp_agent_app.logger
+        
+        try:
+            plans = load_test_plans(plan_path)
+            logger.info(f"Replaying {len(plans)} test plan(s) from {plan_path}")
+            
+            # Only start the agent (and its MCP servers) when the LLM is needed
+            test_agent = None if skip_analysis else create_test_agent()
+            async with contextlib.AsyncExitStack() as stack:
+                if test_agent is not None:
+                    await stack.enter_async_context(test_agent)
+                client = await stack.enter_async_context(httpx.AsyncClient())
+                run_context = RunContext(
+                    agent=test_agent,
+                    client=client,
+                    logger=logger,
+                    config=mcp_agent_app.context.config,
+                    run_history=RunHistory(history_db, max_age_days=history_max_age_days) if history_db else None,
+                    output_max_age_days=history_max_age_days,
+                    provider_health=ProviderHealth(hedge_after=llm_hedge_after),
+                    playwright_limiter=asyncio.Semaphore(playwright_concurrency)
+                )
+                
+                async def replay(plan_id: str, plan_json: Dict[str, Any]) -> Dict[str, Any]:
+                    plan_dir = job_output_dir(output_dir, plan_id)
+                    try:
+                        result = await replay_test_plan(
+                            run_context, plan_json, playwright_url, timeout, max_retries, llm_provider, skip_analysis,
+                            playwright_workers, stream_results, fail_fast, retry_budget, metrics_format, plan_dir,
+                            reset_texts
+                        )
+                    except ExecutionError as e:
+                        # Handle test execution errors
+                        logger.error(f"Test execution error in plan {plan_id}: {e}")
+                        result = {"error": str(e)}
+                    except Exception as e:
+                        # Handle unexpected errors
+                        logger.error(f"Unexpected error in plan {plan_id}: {e}", exc_info=True)
+                        result = {"error": f"Unexpected error: {str(e)}"}
                     
-                    # Analyze the results
-                    analysis = await analyze_results(llm, results, logger)
-                    
-                    # Return the complete test data
-                    return {
-                        "test_plan": plan_json,
-                        "results": results,
-                        "analysis": analysis
-                    }
-                    
+                    plan_dir = result.get("output_dir", plan_dir)
+                    os.makedirs(plan_dir, exist_ok=True)
+                    write_text_atomic(os.path.join(plan_dir, "result.json"), json.dumps(result, indent=2, default=str))
+                    if "analysis" in result:
+                        save_analysis(result["analysis"], plan_dir, logger)
+                    return {"id": plan_id, "output_dir": plan_dir, "result": result}
+                
+                plan_results = await asyncio.gather(*(replay(plan_id, plan_json) for plan_id, plan_json in plans))
+                
         except ExecutionError as e:
             # Handle test execution errors
             logger.error(f"Test execution error: {e}")
@@ -417,13 +2281,102 @@ async def run_test_on_website(
             # Handle unexpected errors
             logger.error(f"Unexpected error: {e}", exc_info=True)
             return {"error": f"Unexpected error: {str(e)}"}
+        
+        if not os.path.isdir(plan_path):
+            return plan_results[0]["result"]
+        
+        summary = summarize_suite(plan_results)
+        write_text_atomic(os.path.join(output_dir, "replay_summary.json"), json.dumps(summary, indent=2))
+        logger.info(f"Replay finished: {summary['completed']}/{summary['total']} plans completed")
+        return summary
+
+async def serve_test_jobs(
+    host: str = DEFAULT_SERVICE_HOST,
+    port: int = DEFAULT_SERVICE_PORT,
+    socket_path: Optional[str] = None,
+    workers: int = DEFAULT_SERVICE_WORKERS,
+    output_dir: str = DEFAULT_OUTPUT_DIR,
+    llm_concurrency: int = DEFAULT_LLM_CONCURRENCY,
+    playwright_concurrency: int = DEFAULT_PLAYWRIGHT_CONCURRENCY,
+    plan_cache_dir: Optional[str] = None,
+    plan_cache_max_age: float = DEFAULT_PLAN_CACHE_MAX_AGE,
+    snapshot_dir: Optional[str] = None,
+    snapshot_ttl: float = DEFAULT_SNAPSHOT_TTL,
+    history_db: Optional[str] = None,
+    history_max_age_days: float = DEFAULT_HISTORY_MAX_AGE_DAYS,
+    llm_hedge_after: float = DEFAULT_HEDGE_AFTER,
+    **job_options: Any
+) -> None:
+    """Run a resident service that accepts test jobs over a local HTTP API.
+    
+    The MCP application, MCP servers, agent and HTTP connection pool are started once
+    and kept warm, so queued jobs start without any cold start cost.
+    
+    Args:
+        host: Host to listen on
+        port: Port to listen on
+        socket_path: Unix socket to listen on instead of host/port
+        workers: Maximum number of jobs running at the same time
+        output_dir: Root directory for the per-job output subdirectories
+        llm_concurrency: Maximum number of concurrent LLM calls
+        playwright_concurrency: Maximum number of concurrent Playwright service calls
+        plan_cache_dir: Directory of the test plan cache (None disables caching)
+        plan_cache_max_age: Maximum age of a cached test plan in seconds
+        snapshot_dir: Directory of the page snapshot store (None disables snapshots)
+        snapshot_ttl: Seconds a stored page snapshot is used instead of fetching the page
+        history_db: SQLite database of the run history (None disables the history)
+        history_max_age_days: Days a run is kept in the run history
+        llm_hedge_after: Seconds before a pending call to a routed LLM provider is also sent to the next one (0 disables)
+        **job_options: Default settings for every job (playwright_url, timeout, ...)
+    """
+    # Start the MCP application
+    async with app.run() as mcp_agent_app:
+        logger = mcp_agent_app.logger
+        test_agent = create_test_agent()
+
+        async with test_agent:
+            # List the tools once for the lifetime of the service
+            tools = await test_agent.list_tools()
+            logger.info("Tools available:", data=tools)
+
+            limits = httpx.Limits(
+                max_connections=playwright_concurrency * 2,
+                max_keepalive_connections=playwright_concurrency
+            )
+            async with httpx.AsyncClient(limits=limits) as client:
+                run_context = RunContext(
+                    agent=test_agent,
+                    client=client,
+                    logger=logger,
+                    config=mcp_agent_app.context.config,
+                    plan_cache=PlanCache(plan_cache_dir, max_age=plan_cache_max_age) if plan_cache_dir else None,
+                    snapshot_store=SnapshotStore(snapshot_dir, ttl=snapshot_ttl) if snapshot_dir else None,
+                    run_history=RunHistory(history_db, max_age_days=history_max_age_days) if history_db else None,
+                    output_max_age_days=history_max_age_days,
+                    provider_health=ProviderHealth(hedge_after=llm_hedge_after),
+                    llm_limiter=asyncio.Semaphore(llm_concurrency),
+                    playwright_limiter=asyncio.Semaphore(playwright_concurrency)
+                )
+
+                async def run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+                    job_result = await run_suite_job(run_context, job, output_dir, job_options)
+                    return job_result["result"]
+
+                service = TestJobService(run_job, workers=workers, logger=logger)
+                server = await service.serve(host, port, socket_path)
+                logger.info(f"200 :: Test job service listening on {socket_path or f'http://{host}:{port}'}")
+                try:
+                    async with server:
+                        await server.serve_forever()
+                finally:
+                    await service.stop()
 
 # Script entry point
 if __name__ == "__main__":
     # Set up command line argument parsing
     parser = argparse.ArgumentParser(description="Run website tests with Playwright")
-    parser.add_argument("url", type=str, help="The URL to test")
-    parser.add_argument("description", type=str, help="Description of what to test")
+    parser.add_argument("url", type=str, nargs="?", help="The URL to test")
+    parser.add_argument("description", type=str, nargs="?", help="Description of what to test")
     parser.add_argument("--playwright-url", type=str, default=DEFAULT_PLAYWRIGHT_URL, 
                         help=f"Playwright service URL (default: {DEFAULT_PLAYWRIGHT_URL})")
     parser.add_argument("--output-dir", type=str, default=DEFAULT_OUTPUT_DIR,
@@ -432,19 +2385,194 @@ if __name__ == "__main__":
                         help=f"Request timeout in seconds (default: {DEFAULT_TIMEOUT})")
     parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES,
                         help=f"Maximum number of retry attempts (default: {DEFAULT_MAX_RETRIES})")
-    parser.add_argument("--llm-provider", type=str, default=DEFAULT_LLM_PROVIDER, choices=["anthropic", "openai"],
-                        help=f"LLM provider to use (default: {DEFAULT_LLM_PROVIDER})")
+    parser.add_argument("--llm-provider", type=str, default=DEFAULT_LLM_PROVIDER,
+                        help=f"LLM provider to use: anthropic or openai, or comma separated providers with optional "
+                             f"cost per million prompt tokens routed by latency, e.g. anthropic=3,openai=0 "
+                             f"(default: {DEFAULT_LLM_PROVIDER})")
+    parser.add_argument("--llm-hedge-after", type=float, default=DEFAULT_HEDGE_AFTER,
+                        help="Seconds before a pending call to a routed LLM provider is also sent to the next one "
+                             "(default: 0, disabled)")
+    parser.add_argument("--inventory-max-bytes", type=int, default=DEFAULT_INVENTORY_MAX_BYTES,
+                        help=f"Byte budget for the element inventory sent to the LLM, 0 sends the raw page source (default: {DEFAULT_INVENTORY_MAX_BYTES})")
+    parser.add_argument("--inventory-max-tokens", type=int, default=None,
+                        help="Optional token budget for the element inventory sent to the LLM")
+    parser.add_argument("--plan-cache-dir", type=str, default=None,
+                        help="Directory for cached test plans, enables reuse of plans for unchanged pages (default: disabled)")
+    parser.add_argument("--plan-cache-max-age", type=float, default=DEFAULT_PLAN_CACHE_MAX_AGE,
+                        help=f"Maximum age of a cached test plan in seconds (default: {DEFAULT_PLAN_CACHE_MAX_AGE:.0f})")
+    parser.add_argument("--snapshot-dir", type=str, default=None,
+                        help="Directory of the page snapshot store, recently fetched pages are reused (default: disabled)")
+    parser.add_argument("--snapshot-ttl", type=float, default=DEFAULT_SNAPSHOT_TTL,
+                        help=f"Seconds a stored page snapshot is used instead of fetching the page (default: {DEFAULT_SNAPSHOT_TTL:.0f})")
+    parser.add_argument("--history-db", type=str, default=None,
+                        help="SQLite database recording every run for flaky test and latency queries (default: disabled)")
+    parser.add_argument("--history-max-age-days", type=float, default=DEFAULT_HISTORY_MAX_AGE_DAYS,
+                        help=f"Days a run is kept in the run history (default: {DEFAULT_HISTORY_MAX_AGE_DAYS:.0f})")
+    parser.add_argument("--suite", type=str, default=None,
+                        help="YAML or JSONL manifest of url/description jobs to run instead of a single test")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_SUITE_CONCURRENCY,
+                        help=f"Jobs running at the same time in suite mode (default: {DEFAULT_SUITE_CONCURRENCY})")
+    parser.add_argument("--llm-concurrency", type=int, default=DEFAULT_LLM_CONCURRENCY,
+                        help=f"Concurrent LLM calls in suite mode (default: {DEFAULT_LLM_CONCURRENCY})")
+    parser.add_argument("--playwright-concurrency", type=int, default=DEFAULT_PLAYWRIGHT_CONCURRENCY,
+                        help=f"Concurrent Playwright service calls in suite mode (default: {DEFAULT_PLAYWRIGHT_CONCURRENCY})")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run as a resident service accepting test jobs over a local HTTP API")
+    parser.add_argument("--host", type=str, default=DEFAULT_SERVICE_HOST,
+                        help=f"Host the service listens on (default: {DEFAULT_SERVICE_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_SERVICE_PORT,
+                        help=f"Port the service listens on (default: {DEFAULT_SERVICE_PORT})")
+    parser.add_argument("--socket", type=str, default=None,
+                        help="Unix socket the service listens on instead of host/port")
+    parser.add_argument("--workers", type=int, default=DEFAULT_SERVICE_WORKERS,
+                        help=f"Jobs the service runs at the same time (default: {DEFAULT_SERVICE_WORKERS})")
+    parser.add_argument("--replay", type=str, default=None,
+                        help="Execute a saved plan.json (or a directory of plans) without generating a new plan")
+    parser.add_argument("--skip-analysis", action="store_true",
+                        help="Skip the LLM analysis of replayed results, replays then use no LLM at all")
+    parser.add_argument("--playwright-workers", type=str, nargs="+", default=None,
+                        help="Playwright service URLs to shard plan execution across (default: --playwright-url only)")
+    parser.add_argument("--reset-texts", type=str, nargs="+", default=None,
+                        help=f"Visible texts of the reset controls plans are sharded and repaired at (default: {' '.join(DEFAULT_RESET_TEXTS)})")
+    parser.add_argument("--max-repairs", type=int, default=DEFAULT_MAX_REPAIRS,
+                        help=f"Re-planning attempts for failed steps, resuming from the last good checkpoint (default: {DEFAULT_MAX_REPAIRS})")
+    parser.add_argument("--selector-check", type=str, default=DEFAULT_SELECTOR_CHECK, choices=SELECTOR_CHECK_MODES,
+                        help=f"Resolve plan selectors against the page source before execution: warn, fix them, fail (strict) or off (default: {DEFAULT_SELECTOR_CHECK})")
+    parser.add_argument("--stream-results", action="store_true",
+                        help="Use the streaming protocol of the Playwright service and report step results live")
+    parser.add_argument("--fail-fast", action="store_true",
+                        help="Stop a streamed execution at the first failed check step")
+    parser.add_argument("--retry-budget", type=int, default=DEFAULT_RETRY_BUDGET,
+                        help=f"Maximum number of retries across all calls of one test (default: {DEFAULT_RETRY_BUDGET})")
+    parser.add_argument("--metrics-format", type=str, default=DEFAULT_METRICS_FORMAT, choices=METRICS_FORMATS,
+                        help=f"Export run metrics through the logger as Prometheus text or OpenTelemetry spans (default: {DEFAULT_METRICS_FORMAT})")
+    parser.add_argument("--plan-optimizations", type=str, default=DEFAULT_PLAN_OPTIMIZATIONS,
+                        help=f"Comma separated plan optimizer rules applied before execution, max_screenshots=N caps screenshots, none disables (default: {DEFAULT_PLAN_OPTIMIZATIONS})")
     
     # Parse command line arguments
     args = parser.parse_args()
 
-    # Run the test and get the results
-    result = asyncio.run(run_test_on_website(
-        args.url, 
-        args.description,
-        args.playwright_url,
-        args.output_dir,
-        args.timeout,
-        args.max_retries,
-        args.llm_provider
-    ))
+    if args.serve:
+        # Keep the application warm and accept jobs until interrupted
+        try:
+            asyncio.run(serve_test_jobs(
+                args.host,
+                args.port,
+                args.socket,
+                args.workers,
+                args.output_dir,
+                args.llm_concurrency,
+                args.playwright_concurrency,
+                args.plan_cache_dir,
+                args.plan_cache_max_age,
+                args.snapshot_dir,
+                args.snapshot_ttl,
+                args.history_db,
+                args.history_max_age_days,
+                args.llm_hedge_after,
+                playwright_url=args.playwright_url,
+                timeout=args.timeout,
+                max_retries=args.max_retries,
+                llm_provider=args.llm_provider,
+                inventory_max_bytes=args.inventory_max_bytes,
+                inventory_max_tokens=args.inventory_max_tokens,
+                playwright_workers=args.playwright_workers,
+                max_repairs=args.max_repairs,
+                selector_check=args.selector_check,
+                stream_results=args.stream_results,
+                fail_fast=args.fail_fast,
+                retry_budget=args.retry_budget,
+                metrics_format=args.metrics_format,
+                plan_optimizations=args.plan_optimizations,
+                reset_texts=args.reset_texts
+            ))
+        except KeyboardInterrupt:
+            pass
+    elif args.replay:
+        # Execute saved plans without page fetching or plan generation
+        result = asyncio.run(replay_test_plans(
+            args.replay,
+            args.playwright_url,
+            args.output_dir,
+            args.timeout,
+            args.max_retries,
+            args.llm_provider,
+            args.skip_analysis,
+            args.playwright_concurrency,
+            args.playwright_workers,
+            args.stream_results,
+            args.fail_fast,
+            args.retry_budget,
+            args.metrics_format,
+            args.history_db,
+            args.history_max_age_days,
+            args.llm_hedge_after,
+            args.reset_texts
+        ))
+    elif args.suite:
+        # Run every job of the manifest under one MCP application
+        try:
+            suite_jobs = load_suite_manifest(args.suite)
+        except (OSError, ValueError) as e:
+            parser.error(f"Invalid suite manifest: {e}")
+        result = asyncio.run(run_test_suite(
+            suite_jobs,
+            args.output_dir,
+            args.concurrency,
+            args.llm_concurrency,
+            args.playwright_concurrency,
+            args.plan_cache_dir,
+            args.plan_cache_max_age,
+            args.snapshot_dir,
+            args.snapshot_ttl,
+            args.history_db,
+            args.history_max_age_days,
+            args.llm_hedge_after,
+            playwright_url=args.playwright_url,
+            timeout=args.timeout,
+            max_retries=args.max_retries,
+            llm_provider=args.llm_provider,
+            inventory_max_bytes=args.inventory_max_bytes,
+            inventory_max_tokens=args.inventory_max_tokens,
+            playwright_workers=args.playwright_workers,
+            max_repairs=args.max_repairs,
+            selector_check=args.selector_check,
+            stream_results=args.stream_results,
+            fail_fast=args.fail_fast,
+            retry_budget=args.retry_budget,
+            metrics_format=args.metrics_format,
+            plan_optimizations=args.plan_optimizations,
+            reset_texts=args.reset_texts
+        ))
+    else:
+        if not args.url or not args.description:
+            parser.error("url and description are required unless --suite, --serve or --replay is given")
+
+        # Run the test and get the results
+        result = asyncio.run(run_test_on_website(
+            args.url, 
+            args.description,
+            args.playwright_url,
+            args.output_dir,
+            args.timeout,
+            args.max_retries,
+            args.llm_provider,
+            args.inventory_max_bytes,
+            args.inventory_max_tokens,
+            args.plan_cache_dir,
+            args.plan_cache_max_age,
+            args.snapshot_dir,
+            args.snapshot_ttl,
+            args.history_db,
+            args.history_max_age_days,
+            args.llm_hedge_after,
+            args.playwright_workers,
+            args.max_repairs,
+            args.selector_check,
+            args.stream_results,
+            args.fail_fast,
+            args.retry_budget,
+            args.metrics_format,
+            args.plan_optimizations,
+            args.reset_texts
+        ))
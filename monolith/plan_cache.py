@@ -0,0 +1,190 @@
+"""
+Content-addressed on-disk cache for LLM generated test plans.
+
+Plans are keyed by a hash of everything that influences the LLM output: the
+target URL, the normalized element inventory, the test description and the
+LLM provider/model. Every entry records when its plan was generated and expires
+that long after, however often it is hit; hits only refresh the modification time
+that orders the least recently used entries for eviction by count and total size.
+The cache keeps hit/miss counters for reporting.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+# Cache defaults
+DEFAULT_PLAN_CACHE_MAX_ENTRIES = 500                # Maximum number of cached plans
+DEFAULT_PLAN_CACHE_MAX_BYTES = 50 * 1024 * 1024     # Maximum total size of the cache directory
+DEFAULT_PLAN_CACHE_MAX_AGE = 7 * 24 * 3600.0        # Maximum age of a cached plan in seconds
+
+PLAN_CACHE_SUFFIX = ".plan.json"
+
+_WHITESPACE = re.compile(r"[ \t]+")
+
+
+def normalize_inventory(page_elements: str) -> str:
+    """Normalize an element inventory so cosmetic changes don't bust the cache.
+
+    Args:
+        page_elements: Rendered element inventory (or raw page source)
+
+    Returns:
+        The inventory with whitespace collapsed and blank lines removed
+    """
+    lines = (_WHITESPACE.sub(" ", line).strip() for line in page_elements.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def make_plan_cache_key(url: str, page_elements: str, test_description: str, llm_provider: str, model: Optional[str]) -> str:
+    """Compute the content address of a test plan.
+
+    Args:
+        url: Target website URL
+        page_elements: Element inventory used as planning context
+        test_description: Description of the test requirements
+        llm_provider: LLM provider used for planning
+        model: Model name used for planning, if known
+
+    Returns:
+        A hex SHA-256 digest identifying the plan
+    """
+    payload = json.dumps(
+        {
+            "url": url.strip(),
+            "elements": normalize_inventory(page_elements),
+            "description": " ".join(test_description.split()),
+            "provider": llm_provider.lower(),
+            "model": model or "",
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """Directory backed cache of test plans with age and size based eviction."""
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_entries: int = DEFAULT_PLAN_CACHE_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_PLAN_CACHE_MAX_BYTES,
+        max_age: float = DEFAULT_PLAN_CACHE_MAX_AGE,
+    ):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{PLAN_CACHE_SUFFIX}")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached plan.
+
+        Args:
+            key: Cache key from make_plan_cache_key
+
+        Returns:
+            The cached plan, or None on a miss or when the plan is older than max_age
+        """
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            if isinstance(entry, dict) and "created_at" in entry and "plan" in entry:
+                created_at, plan_json = entry["created_at"], entry["plan"]
+            else:
+                # Entries written before creation times were recorded
+                created_at, plan_json = os.path.getmtime(path), entry
+            if time.time() - created_at > self.max_age:
+                self._remove(path)
+                self.misses += 1
+                return None
+        except (OSError, ValueError, TypeError):
+            self.misses += 1
+            return None
+
+        # Touch the entry so eviction removes the least recently used plans first
+        os.utime(path)
+        self.hits += 1
+        return plan_json
+
+    def put(self, key: str, plan_json: Dict[str, Any]) -> None:
+        """Store a plan and evict old entries if the cache is over its limits.
+
+        Args:
+            key: Cache key from make_plan_cache_key
+            plan_json: The validated test plan
+        """
+        # Write atomically so concurrent readers never see a partial plan
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"created_at": time.time(), "plan": plan_json}, f)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self) -> int:
+        """Remove expired entries, then the least recently used ones over the limits.
+
+        An entry not used for max_age is also older than max_age, so the modification
+        time is enough to find those. Entries that keep being used expire on lookup.
+
+        Returns:
+            The number of evicted entries
+        """
+        entries: List[tuple] = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(PLAN_CACHE_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        now = time.time()
+        total_bytes = sum(size for _, size, _ in entries)
+        evicted = 0
+        for mtime, size, path in entries:
+            remaining = len(entries) - evicted
+            expired = now - mtime > self.max_age
+            if not expired and remaining <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            self._remove(path)
+            total_bytes -= size
+            evicted += 1
+
+        self.evictions += evicted
+        return evicted
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for reporting."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,234 @@
+"""
+Rule based rewrites that remove wasted work from test plans before execution.
+
+LLM plans often settle the page several times in a row, sleep for fixed
+durations, navigate to the page they are already on, and take identical
+screenshots. Each rule below rewrites one of those patterns without changing
+what the plan tests; rules are enabled per run with an optimization spec:
+
+    collapse_waits,replace_sleeps,drop_noop_navigations,dedupe_screenshots,max_screenshots=3
+
+The report of a pass lists the steps every rule removed or rewrote and the
+execution time they are estimated to save.
+"""
+
+import copy
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+OPTIMIZER_RULES = ("replace_sleeps", "collapse_waits", "drop_noop_navigations", "dedupe_screenshots", "max_screenshots")
+DEFAULT_PLAN_OPTIMIZATIONS = "collapse_waits,drop_noop_navigations,dedupe_screenshots"
+
+# Estimated execution time of a step in milliseconds
+STEP_COST_MS = {
+    "navigate": 1500.0,
+    "screenshot": 300.0,
+    "waitForLoadState": 100.0,
+    "wait": 1000.0,
+}
+
+# Load states by strength, waiting for a later one implies the earlier ones
+LOAD_STATES = ("domcontentloaded", "load", "networkidle")
+CONDITION_WAIT = {"action": "waitForLoadState", "value": "networkidle"}
+
+# Steps that change the page, and so the outcome of a later navigation or screenshot
+MUTATING_ACTIONS = ("navigate", "click", "type", "scroll")
+
+
+class PlanOptimizerError(ValueError):
+    """Raised for an invalid optimization spec."""
+    pass
+
+
+def parse_optimizations(spec: Optional[str]) -> Dict[str, Optional[int]]:
+    """Parse an optimization spec into the enabled rules and their settings.
+
+    Args:
+        spec: Comma separated rule names, "max_screenshots=N" caps screenshots,
+            "none" or an empty spec disables the optimizer
+
+    Returns:
+        The setting of every enabled rule by name (None for rules without one)
+
+    Raises:
+        PlanOptimizerError: If the spec names an unknown rule or has an invalid setting
+    """
+    rules: Dict[str, Optional[int]] = {}
+    for item in (spec or "").split(","):
+        name, _, value = item.strip().partition("=")
+        if not name or name == "none":
+            continue
+        if name not in OPTIMIZER_RULES:
+            raise PlanOptimizerError(f"Unknown plan optimization: {name} (available: {', '.join(OPTIMIZER_RULES)})")
+        if name == "max_screenshots":
+            if not value.isdigit():
+                raise PlanOptimizerError("max_screenshots needs a screenshot count, e.g. max_screenshots=3")
+            rules[name] = int(value)
+        else:
+            rules[name] = None
+    return rules
+
+
+def _is_sleep(step: Dict[str, Any]) -> bool:
+    """Check whether a step is a fixed sleep rather than a wait for a condition."""
+    return step.get("action") == "wait" and not step.get("selector")
+
+
+def _sleep_ms(step: Dict[str, Any]) -> float:
+    try:
+        return max(float(step.get("value")), 0.0)
+    except (TypeError, ValueError):
+        return STEP_COST_MS["wait"]
+
+
+def _load_state(step: Dict[str, Any]) -> int:
+    value = step.get("value")
+    return LOAD_STATES.index(value) if value in LOAD_STATES else LOAD_STATES.index("load")
+
+
+def _step_cost(step: Dict[str, Any]) -> float:
+    if _is_sleep(step):
+        return _sleep_ms(step)
+    return STEP_COST_MS.get(step.get("action"), 0.0)
+
+
+def _same_url(first: Any, second: Any) -> bool:
+    if not isinstance(first, str) or not isinstance(second, str):
+        return False
+    return first.split("#")[0].rstrip("/") == second.split("#")[0].rstrip("/")
+
+
+@dataclass
+class OptimizationReport:
+    """Outcome of an optimizer pass."""
+
+    steps_before: int
+    steps_after: int = 0
+    rules: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def record(self, rule: str, step: int, change: str, saved_ms: float) -> None:
+        entry = self.rules.setdefault(rule, {"removed": 0, "rewritten": 0, "estimated_ms_saved": 0.0, "steps": []})
+        entry[change] += 1
+        entry["estimated_ms_saved"] = round(entry["estimated_ms_saved"] + saved_ms, 1)
+        entry["steps"].append(step)
+
+    @property
+    def estimated_ms_saved(self) -> float:
+        return round(sum(entry["estimated_ms_saved"] for entry in self.rules.values()), 1)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.rules)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "steps_before": self.steps_before,
+            "steps_after": self.steps_after,
+            "estimated_ms_saved": self.estimated_ms_saved,
+            "rules": self.rules,
+        }
+
+
+def optimize_test_plan(
+    plan_json: Dict[str, Any],
+    rules: Dict[str, Optional[int]]
+) -> Tuple[Dict[str, Any], OptimizationReport]:
+    """Apply the enabled rewrite rules to a validated test plan.
+
+    Steps are tracked by their 1-based position in the original plan, so the
+    report refers to the plan as generated.
+
+    Args:
+        plan_json: Validated test plan, left unchanged
+        rules: Enabled rules and their settings (see parse_optimizations)
+
+    Returns:
+        A (plan, report) tuple with the optimized copy of the plan and the report of the pass
+    """
+    steps = plan_json["test_plan"]["steps"]
+    report = OptimizationReport(steps_before=len(steps))
+    numbered: List[Tuple[int, Dict[str, Any]]] = [(number, step) for number, step in enumerate(steps, start=1)]
+
+    if "replace_sleeps" in rules:
+        # Wait for the page to settle after a navigation instead of sleeping for a fixed
+        # time; other sleeps may wait for animations or debounced updates and are kept
+        rewritten = []
+        after_navigation = False
+        for number, step in numbered:
+            if _is_sleep(step) and after_navigation:
+                saved = max(_sleep_ms(step) - STEP_COST_MS["waitForLoadState"], 0.0)
+                report.record("replace_sleeps", number, "rewritten", saved)
+                step = dict(CONDITION_WAIT)
+            elif step.get("action") == "navigate":
+                after_navigation = True
+            elif step.get("action") not in ("wait", "waitForLoadState"):
+                after_navigation = False
+            rewritten.append((number, step))
+        numbered = rewritten
+
+    if "collapse_waits" in rules:
+        # Keep the strongest of consecutive load state waits, fixed sleeps keep their duration
+        collapsed: List[Tuple[int, Dict[str, Any]]] = []
+        for number, step in numbered:
+            if collapsed and step.get("action") == "waitForLoadState" and collapsed[-1][1].get("action") == "waitForLoadState":
+                kept_number, kept = collapsed[-1]
+                if _load_state(step) > _load_state(kept):
+                    collapsed[-1] = (number, step)
+                    report.record("collapse_waits", kept_number, "removed", _step_cost(kept))
+                else:
+                    report.record("collapse_waits", number, "removed", _step_cost(step))
+                continue
+            collapsed.append((number, step))
+        numbered = collapsed
+
+    if "drop_noop_navigations" in rules:
+        # A navigation to the current URL is a no-op while nothing changed the page
+        kept_steps: List[Tuple[int, Dict[str, Any]]] = []
+        current_url = None
+        page_changed = True
+        for number, step in numbered:
+            action = step.get("action")
+            if action == "navigate":
+                if not page_changed and _same_url(step.get("value"), current_url):
+                    report.record("drop_noop_navigations", number, "removed", _step_cost(step))
+                    continue
+                current_url = step.get("value")
+                page_changed = False
+            elif action in MUTATING_ACTIONS:
+                page_changed = True
+            kept_steps.append((number, step))
+        numbered = kept_steps
+
+    if "dedupe_screenshots" in rules:
+        # A screenshot of an unchanged page repeats the previous one
+        kept_steps = []
+        previous = None
+        for number, step in numbered:
+            action = step.get("action")
+            if action == "screenshot":
+                target = (step.get("selector"), step.get("value"))
+                if previous == target:
+                    report.record("dedupe_screenshots", number, "removed", _step_cost(step))
+                    continue
+                previous = target
+            elif action in MUTATING_ACTIONS:
+                previous = None
+            kept_steps.append((number, step))
+        numbered = kept_steps
+
+    if rules.get("max_screenshots") is not None:
+        # Keep the first screenshots up to the cap
+        kept_steps = []
+        taken = 0
+        for number, step in numbered:
+            if step.get("action") == "screenshot":
+                if taken >= rules["max_screenshots"]:
+                    report.record("max_screenshots", number, "removed", _step_cost(step))
+                    continue
+                taken += 1
+            kept_steps.append((number, step))
+        numbered = kept_steps
+
+    optimized = {**plan_json, "test_plan": {**plan_json["test_plan"], "steps": [copy.deepcopy(step) for _, step in numbered]}}
+    report.steps_after = len(numbered)
+    return optimized, report
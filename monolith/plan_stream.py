@@ -0,0 +1,189 @@
+"""
+Incremental parsing of streamed LLM test plans.
+
+The LLM response is fed to a PlanStreamParser chunk by chunk as it arrives.
+Prose and code fences around the JSON object are skipped, every step is
+parsed and validated as soon as its closing brace arrives, and responses
+that leave the plan schema raise PlanStreamError right away, so the caller
+can stop the generation instead of paying for the rest of it.
+"""
+
+import bisect
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PLAN_ACTIONS = ("navigate", "click", "type", "wait", "waitForLoadState", "scroll", "check", "screenshot")
+PLAN_STEPS_PATH = ("test_plan", "steps")
+DEFAULT_MAX_PREFIX_CHARS = 2000        # Prose allowed before the JSON object starts
+
+_CLOSING = {"}": "{", "]": "["}
+
+
+class PlanStreamError(ValueError):
+    """Raised when a streamed response is not a valid test plan."""
+    pass
+
+
+def validate_plan_step(step: Any) -> Dict[str, Any]:
+    """Check that a parsed step is an object with a known action.
+
+    Raises:
+        PlanStreamError: If the step is off-schema
+    """
+    if not isinstance(step, dict):
+        raise PlanStreamError(f"Step is not an object: {json.dumps(step)[:80]}")
+    if step.get("action") not in PLAN_ACTIONS:
+        raise PlanStreamError(f"Step has an unknown action: {step.get('action')!r}")
+    return step
+
+
+class PlanStreamParser:
+    """Incremental parser of a JSON test plan streamed by an LLM.
+
+    Args:
+        on_step: Called with every validated step as soon as it is complete
+        steps_path: Keys leading to the steps array in the JSON object
+        max_prefix_chars: Characters of prose or fences skipped before giving up on finding the object
+    """
+
+    def __init__(
+        self,
+        on_step: Optional[Callable[[Dict[str, Any]], None]] = None,
+        steps_path: Tuple[str, ...] = PLAN_STEPS_PATH,
+        max_prefix_chars: int = DEFAULT_MAX_PREFIX_CHARS,
+    ):
+        self.on_step = on_step
+        self.steps_path = steps_path
+        self.max_prefix_chars = max_prefix_chars
+        self.steps: List[Dict[str, Any]] = []
+        self.done = False
+        # Chunks as received and their offsets in the response, scanned once from _pos
+        self._chunks: List[str] = []
+        self._offsets: List[int] = []
+        self._length = 0
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        # Open containers: [bracket, path, current key, expecting a key, start of a step object]
+        self._stack: List[list] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._expect_steps = False
+
+    def feed(self, chunk: str) -> bool:
+        """Parse the next chunk of the response.
+
+        Returns:
+            True once the JSON object is complete, the rest of the response can be dropped
+
+        Raises:
+            PlanStreamError: If the response leaves the plan schema
+        """
+        if self.done:
+            return True
+        if not chunk:
+            return False
+        chunk_start = self._length
+        self._chunks.append(chunk)
+        self._offsets.append(chunk_start)
+        self._length += len(chunk)
+        while self._pos < self._length and not self.done:
+            char = chunk[self._pos - chunk_start]
+            if self._start is None:
+                self._skip_prefix(char)
+            elif self._in_string:
+                self._scan_string(char)
+            else:
+                self._scan_structure(char)
+            self._pos += 1
+        return self.done
+
+    def close(self) -> Dict[str, Any]:
+        """Finish parsing and return the test plan.
+
+        Raises:
+            PlanStreamError: If the response holds no complete, valid plan
+        """
+        if self._start is None:
+            raise PlanStreamError("No JSON object found in the response")
+        if not self.done:
+            raise PlanStreamError("The JSON object in the response is incomplete")
+        try:
+            plan = json.loads(self._slice(self._start, self._end))
+        except json.JSONDecodeError as e:
+            raise PlanStreamError(str(e))
+        steps: Any = plan
+        for key in self.steps_path:
+            steps = steps.get(key) if isinstance(steps, dict) else None
+        if not isinstance(steps, list):
+            raise PlanStreamError(f"The JSON object has no {'.'.join(self.steps_path)} array")
+        return plan
+
+    def _slice(self, start: int, end: int) -> str:
+        """Return the text of the response between two offsets, joining only the chunks it spans."""
+        first = bisect.bisect_right(self._offsets, start) - 1
+        last = bisect.bisect_left(self._offsets, end)
+        text = "".join(self._chunks[first:last])
+        base = self._offsets[first]
+        return text[start - base:end - base]
+
+    def _skip_prefix(self, char: str) -> None:
+        if char == "{":
+            self._start = self._pos
+            self._stack.append(["{", (), None, True, None])
+        elif self._pos >= self.max_prefix_chars:
+            raise PlanStreamError(f"No JSON object in the first {self.max_prefix_chars} characters of the response")
+
+    def _scan_string(self, char: str) -> None:
+        if self._escaped:
+            self._escaped = False
+        elif char == "\\":
+            self._escaped = True
+        elif char == '"':
+            self._in_string = False
+            container = self._stack[-1]
+            if container[0] == "{" and container[3]:
+                container[2] = json.loads(self._slice(self._string_start, self._pos + 1))
+
+    def _scan_structure(self, char: str) -> None:
+        container = self._stack[-1]
+        if char in " \t\r\n":
+            return
+        if self._expect_steps and char != "[":
+            raise PlanStreamError(f"{'.'.join(self.steps_path)} is not an array")
+        self._expect_steps = False
+        in_steps = container[0] == "[" and container[1] == self.steps_path
+        if in_steps and char not in "{],":
+            raise PlanStreamError("Step is not an object")
+
+        if char == '"':
+            self._in_string = True
+            self._string_start = self._pos
+        elif char == ":":
+            container[3] = False
+            path = container[1] + (container[2],)
+            self._expect_steps = path == self.steps_path
+        elif char == ",":
+            container[3] = container[0] == "{"
+        elif char in "{[":
+            path = container[1] + ((container[2],) if container[0] == "{" else ("*",))
+            self._stack.append([char, path, None, char == "{", self._pos if in_steps else None])
+        elif char in "}]":
+            opened = self._stack.pop()
+            if opened[0] != _CLOSING[char]:
+                raise PlanStreamError(f"Unbalanced {char!r} in the response")
+            if opened[4] is not None:
+                self._add_step(self._slice(opened[4], self._pos + 1))
+            if not self._stack:
+                self.done = True
+                self._end = self._pos + 1
+
+    def _add_step(self, text: str) -> None:
+        try:
+            step = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise PlanStreamError(f"Invalid step: {e}")
+        self.steps.append(validate_plan_step(step))
+        if self.on_step is not None:
+            self.on_step(step)
@@ -0,0 +1,189 @@
+"""
+Deterministic markdown reports of test results.
+
+Builds the summary, the per-step pass/fail table, the expected/actual values
+of check steps and the error listing straight from the results returned by
+the Playwright service, without an LLM. For failed runs, failure_context()
+trims the results to the failing steps and the steps leading up to them, as
+a compact payload for an LLM explanation.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from step_results import compact_step_record, get_step_results, step_status
+
+STATUS_ICONS = {"passed": "✅", "failed": "❌", "unknown": "➖"}
+
+# Keys under which step records may report the observed value of a check
+ACTUAL_VALUE_KEYS = ("actual", "actual_value", "text", "value_found")
+
+
+def _plan_steps(plan_json: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if not isinstance(plan_json, dict):
+        return []
+    steps = plan_json.get("test_plan", {}).get("steps", [])
+    return steps if isinstance(steps, list) else []
+
+
+def _cell(value: Any, max_length: int = 60) -> str:
+    """Format a value for a markdown table cell."""
+    if value is None:
+        return ""
+    text = str(value).replace("|", "\\|").replace("\n", "\\n")
+    return text if len(text) <= max_length else text[:max_length - 1] + "…"
+
+
+def _actual_value(record: Dict[str, Any]) -> Any:
+    for key in ACTUAL_VALUE_KEYS:
+        if key in record:
+            return record[key]
+    return None
+
+
+def _step_error(record: Dict[str, Any]) -> str:
+    return str(record.get("error") or record.get("message") or record.get("status") or "failed")
+
+
+def collect_steps(plan_json: Optional[Dict[str, Any]], results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Pair the plan steps with their step records.
+
+    Args:
+        plan_json: Executed test plan, if available
+        results: Results returned by the Playwright service
+
+    Returns:
+        One entry per step with its number, step definition, record and status
+    """
+    steps = _plan_steps(plan_json)
+    records = get_step_results(results)
+    collected = []
+    for index in range(max(len(steps), len(records))):
+        step = steps[index] if index < len(steps) else {}
+        record = records[index] if index < len(records) else None
+        status = step_status(record) if record is not None else "unknown"
+        collected.append({"number": index + 1, "step": step, "record": record or {}, "status": status})
+    return collected
+
+
+def has_failures(results: Dict[str, Any]) -> bool:
+    """Check whether the results report any failure."""
+    if not isinstance(results, dict):
+        return True
+    if results.get("success") is False or results.get("error"):
+        return True
+    return any(step_status(record) == "failed" for record in get_step_results(results))
+
+
+def build_results_report(plan_json: Optional[Dict[str, Any]], results: Dict[str, Any]) -> str:
+    """Build a markdown report of test results.
+
+    Args:
+        plan_json: Executed test plan, if available
+        results: Results returned by the Playwright service
+
+    Returns:
+        The report in markdown
+    """
+    plan = plan_json if isinstance(plan_json, dict) else {}
+    steps = collect_steps(plan, results)
+    counts = {status: sum(1 for step in steps if step["status"] == status) for status in STATUS_ICONS}
+    executed = counts["passed"] + counts["failed"]
+    success_rate = f"{counts['passed'] / executed:.0%}" if executed else "n/a"
+    outcome = "Failed" if has_failures(results) else "Passed"
+    screenshots = sum(1 for step in steps if (step["record"].get("action") or step["step"].get("action")) == "screenshot")
+
+    description = plan.get("test_plan", {}).get("description")
+    lines = ["# Test Results Report", ""]
+    if description:
+        lines += [description, ""]
+    lines += [
+        "## Summary",
+        f"- **Outcome:** {outcome}",
+        f"- **URL:** {plan.get('url', 'n/a')}",
+        f"- **Total Steps:** {len(steps)}",
+        f"- **Passed:** {counts['passed']}",
+        f"- **Failed:** {counts['failed']}",
+        f"- **Not Reported:** {counts['unknown']}",
+        f"- **Success Rate:** {success_rate}",
+        f"- **Screenshots:** {screenshots}",
+    ]
+    if results.get("aborted"):
+        lines.append("- **Aborted:** execution stopped at the first failed check")
+    if results.get("shards"):
+        lines.append(f"- **Shards:** {len(results['shards'])}")
+
+    if steps:
+        lines += ["", "## Steps", "", "| # | Action | Selector | Value | Result |", "|---|---|---|---|---|"]
+        for step in steps:
+            definition = step["step"] or step["record"]
+            lines.append(
+                f"| {step['number']} | {_cell(definition.get('action'))} | {_cell(definition.get('selector'))} "
+                f"| {_cell(definition.get('value'))} | {STATUS_ICONS[step['status']]} {step['status']} |"
+            )
+
+    checks = [step for step in steps if (step["step"].get("action") or step["record"].get("action")) == "check"]
+    if checks:
+        lines += ["", "## Checks", "", "| # | Selector | Expected | Actual | Match |", "|---|---|---|---|---|"]
+        for step in checks:
+            expected = step["step"].get("value", step["record"].get("expected"))
+            actual = _actual_value(step["record"])
+            match = STATUS_ICONS[step["status"]]
+            lines.append(
+                f"| {step['number']} | {_cell(step['step'].get('selector') or step['record'].get('selector'))} "
+                f"| {_cell(expected)} | {_cell(actual)} | {match} |"
+            )
+
+    errors = [step for step in steps if step["status"] == "failed"]
+    if errors or results.get("error"):
+        lines += ["", "## Errors", ""]
+        if results.get("error"):
+            lines.append(f"- Execution: {results['error']}")
+        for step in errors:
+            definition = step["step"] or step["record"]
+            lines.append(f"- Step {step['number']} ({definition.get('action', 'unknown')}): {_step_error(step['record'])}")
+
+    return "\n".join(lines) + "\n"
+
+
+def failure_context(
+    plan_json: Optional[Dict[str, Any]],
+    results: Dict[str, Any],
+    context_steps: int = 2,
+    max_value_bytes: int = 512
+) -> Dict[str, Any]:
+    """Trim results to the failing steps and the steps leading up to them.
+
+    Args:
+        plan_json: Executed test plan, if available
+        results: Results returned by the Playwright service
+        context_steps: Number of preceding steps included with every failure
+        max_value_bytes: Largest string value kept as is in step records
+
+    Returns:
+        A compact payload describing the failures
+    """
+    steps = collect_steps(plan_json, results)
+    failed_indexes = [index for index, step in enumerate(steps) if step["status"] == "failed"]
+    included = sorted({
+        index
+        for failed_index in failed_indexes
+        for index in range(max(failed_index - context_steps, 0), failed_index + 1)
+    })
+    context = {
+        "url": plan_json.get("url") if isinstance(plan_json, dict) else None,
+        "total_steps": len(steps),
+        "failed_steps": [steps[index]["number"] for index in failed_indexes],
+        "steps": [
+            {
+                "number": steps[index]["number"],
+                "step": steps[index]["step"],
+                "status": steps[index]["status"],
+                "record": compact_step_record(steps[index]["record"], max_value_bytes),
+            }
+            for index in included
+        ],
+    }
+    if isinstance(results, dict) and not failed_indexes:
+        # No failed step records, keep the scalar fields describing the outcome
+        context["results"] = {key: value for key, value in results.items() if not isinstance(value, (dict, list))}
+    return context
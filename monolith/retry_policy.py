@@ -0,0 +1,317 @@
+"""
+Shared retry policy for calls to the Playwright service and the LLM.
+
+Combines exponential backoff with full jitter, support for Retry-After
+headers, a retry budget per test run, and a circuit breaker per endpoint that
+fails fast while a service is down. Counters for retries, waits and breaker
+transitions are kept for reporting.
+"""
+
+import asyncio
+import email.utils
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Retry defaults
+DEFAULT_BASE_DELAY = 0.5             # First backoff delay in seconds
+DEFAULT_MAX_DELAY = 30.0             # Largest backoff delay in seconds
+DEFAULT_MAX_RETRY_AFTER = 60.0       # Largest Retry-After delay that is honoured
+DEFAULT_RETRY_BUDGET = 10            # Retries allowed per test run across all calls
+DEFAULT_FAILURE_THRESHOLD = 5        # Consecutive failures that open a circuit
+DEFAULT_RESET_TIMEOUT = 30.0         # Seconds before an open circuit lets a trial call through
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the endpoint's circuit is open."""
+    pass
+
+
+def parse_retry_after(value: Any) -> Optional[float]:
+    """Parse a Retry-After header value.
+
+    Args:
+        value: Header value, either delay seconds or an HTTP date
+
+    Returns:
+        The delay in seconds, or None if the value is missing or invalid
+    """
+    if not isinstance(value, str) or not value.strip():
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+@dataclass
+class RetryPolicy:
+    """Backoff settings shared by all retried calls."""
+
+    base_delay: float = DEFAULT_BASE_DELAY
+    max_delay: float = DEFAULT_MAX_DELAY
+    multiplier: float = 2.0
+    jitter: bool = True
+    max_retry_after: float = DEFAULT_MAX_RETRY_AFTER
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Compute the delay before a retry.
+
+        Args:
+            attempt: Number of retries already made for this call (0 for the first retry)
+            retry_after: Delay requested by the server, if any
+
+        Returns:
+            The delay in seconds
+        """
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** attempt)
+        # Full jitter spreads retries of concurrent clients apart
+        return random.uniform(0, delay) if self.jitter else delay
+
+
+class RetryBudget:
+    """Limit on the number of retries of a single test run."""
+
+    def __init__(self, max_retries: int = DEFAULT_RETRY_BUDGET):
+        self.max_retries = max_retries
+        self.used = 0
+
+    def try_acquire(self) -> bool:
+        """Take one retry from the budget, returning False if it is spent."""
+        if self.used >= self.max_retries:
+            return False
+        self.used += 1
+        return True
+
+
+class CircuitBreaker:
+    """Circuit breaker of a single endpoint.
+
+    The circuit opens after a number of consecutive failures, rejects calls
+    while open, and lets one trial call through once the reset timeout passed.
+    Other calls are rejected until the trial call resolves; a trial call that
+    never reports back frees its slot after another reset timeout.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started: Optional[float] = None
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Check whether a call may be made, admitting a single trial call while half open."""
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+        elif self.state == HALF_OPEN and self.probe_started is not None and now - self.probe_started < self.reset_timeout:
+            # A trial call is in flight, the endpoint may still be failing
+            self.rejected += 1
+            return False
+        if self.state == HALF_OPEN:
+            self.probe_started = now
+        return True
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self.probe_started = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probe_started = None
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "failures": self.failures, "opened": self.times_opened, "rejected": self.rejected}
+
+
+class CircuitBreakerRegistry:
+    """Circuit breakers by endpoint, shared by all runs of a process."""
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        if endpoint not in self.breakers:
+            self.breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self.breakers[endpoint]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {endpoint: breaker.stats() for endpoint, breaker in self.breakers.items()}
+
+
+class RetryController:
+    """Retry decisions of one test run: policy, run budget and endpoint breakers."""
+
+    def __init__(
+        self,
+        policy: Optional[RetryPolicy] = None,
+        budget: Optional[RetryBudget] = None,
+        breakers: Optional[CircuitBreakerRegistry] = None,
+    ):
+        self.policy = policy or RetryPolicy()
+        self.budget = budget or RetryBudget()
+        self.breakers = breakers or CircuitBreakerRegistry()
+        self.metrics = {
+            "attempts": 0,
+            "failures": 0,
+            "retries": 0,
+            "retry_after_waits": 0,
+            "backoff_seconds": 0.0,
+            "budget_exhausted": 0,
+            "circuit_rejections": 0,
+        }
+
+    def allow(self, endpoint: str) -> bool:
+        """Check the endpoint's circuit before making a call."""
+        if not self.breakers.get(endpoint).allow():
+            self.metrics["circuit_rejections"] += 1
+            return False
+        self.metrics["attempts"] += 1
+        return True
+
+    def record_success(self, endpoint: str) -> None:
+        self.breakers.get(endpoint).record_success()
+
+    def record_failure(self, endpoint: str) -> None:
+        self.metrics["failures"] += 1
+        self.breakers.get(endpoint).record_failure()
+
+    def record_response(self, endpoint: str, status_code: int) -> None:
+        """Record a completed HTTP call, only server errors count as endpoint failures."""
+        if status_code >= 500:
+            self.record_failure(endpoint)
+        else:
+            self.record_success(endpoint)
+
+    async def backoff(self, endpoint: str, attempt: int, retry_after: Optional[float] = None) -> bool:
+        """Wait before retrying a failed call.
+
+        Args:
+            endpoint: Endpoint of the failed call
+            attempt: Number of retries already made for this call
+            retry_after: Delay requested by the server, if any
+
+        Returns:
+            False (without waiting) if the run's retry budget is spent or the
+            endpoint's circuit is open, True after waiting otherwise
+        """
+        if self.breakers.get(endpoint).state == OPEN:
+            self.metrics["circuit_rejections"] += 1
+            return False
+        if not self.budget.try_acquire():
+            self.metrics["budget_exhausted"] += 1
+            return False
+
+        delay = self.policy.delay(attempt, retry_after)
+        self.metrics["retries"] += 1
+        self.metrics["backoff_seconds"] = round(self.metrics["backoff_seconds"] + delay, 3)
+        if retry_after is not None:
+            self.metrics["retry_after_waits"] += 1
+        await asyncio.sleep(delay)
+        return True
+
+    async def call(
+        self,
+        endpoint: str,
+        operation: Callable[[], Awaitable[Any]],
+        max_retries: int,
+        is_retryable: Callable[[Exception], bool],
+        get_retry_after: Callable[[Exception], Optional[float]] = lambda e: None,
+        is_failure: Optional[Callable[[Exception], bool]] = None,
+    ) -> Any:
+        """Call an operation, retrying retryable errors with backoff.
+
+        Every call reports back to the endpoint's circuit, so a half open circuit's
+        trial call is always released. Errors that aren't endpoint failures, such as
+        a rejected request, count as successful calls for the circuit.
+
+        Args:
+            endpoint: Endpoint key for the circuit breaker
+            operation: Coroutine factory performing the call
+            max_retries: Maximum number of retries of this call
+            is_retryable: Decides whether an error is worth retrying
+            get_retry_after: Extracts a server requested delay from an error
+            is_failure: Decides whether an error counts against the endpoint's
+                circuit, defaults to is_retryable
+
+        Returns:
+            The result of the operation
+
+        Raises:
+            CircuitOpenError: If the endpoint's circuit is open
+            Exception: The last error of the operation if retries are exhausted
+        """
+        attempt = 0
+        while True:
+            if not self.allow(endpoint):
+                raise CircuitOpenError(f"Circuit open for {endpoint}")
+            try:
+                result = await operation()
+            except Exception as e:
+                if (is_failure or is_retryable)(e):
+                    self.record_failure(endpoint)
+                else:
+                    self.record_success(endpoint)
+                if not is_retryable(e) or attempt >= max_retries or not await self.backoff(endpoint, attempt, get_retry_after(e)):
+                    raise
+                attempt += 1
+                continue
+            self.record_success(endpoint)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the retry metrics of the run and the state of every circuit."""
+        return {**self.metrics, "budget_remaining": self.budget.max_retries - self.budget.used, "circuits": self.breakers.stats()}
+
+
+# Error class name fragments of transient LLM provider errors
+TRANSIENT_LLM_ERRORS = ("RateLimit", "Timeout", "Connection", "Overloaded", "InternalServer", "ServiceUnavailable")
+
+
+def is_retryable_llm_error(error: Exception) -> bool:
+    """Check whether an LLM provider error is transient."""
+    status_code = getattr(error, "status_code", None)
+    if isinstance(status_code, int) and (status_code == 429 or status_code >= 500):
+        return True
+    return any(fragment in type(error).__name__ for fragment in TRANSIENT_LLM_ERRORS)
+
+
+def get_llm_retry_after(error: Exception) -> Optional[float]:
+    """Extract the Retry-After delay from an LLM provider error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is None:
+        return None
+    try:
+        return parse_retry_after(headers.get("retry-after"))
+    except Exception:
+        return None
@@ -0,0 +1,333 @@
+"""
+SQLite store of test run history.
+
+Every run gets a time ordered run ID and one row holding its outcome, timing
+and a compressed record of its plan, results, analysis and metrics; stage
+durations are kept in their own table for trend queries. Writes are single
+transactions in WAL mode, so concurrent runs and CI jobs sharing a database
+never see each other's partial runs.
+
+Queries cover recent runs, flaky tests (tests whose outcome flips between
+passed and failed) and latency trends per stage. Retention removes runs over
+a maximum count or age, and compaction returns their space to the disk.
+
+The history can also be queried from the command line:
+
+    python run_history.py output/history.sqlite3 flaky --days 7
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional
+
+from run_metrics import percentile
+from step_results import compact_results, get_step_results, step_status
+
+# History defaults
+DEFAULT_HISTORY_MAX_RUNS = 5000            # Runs kept in the history
+DEFAULT_HISTORY_MAX_AGE_DAYS = 30.0        # Age in days after which runs are removed
+DEFAULT_COMPACT_RATIO = 0.25               # Share of free pages that triggers compaction
+
+RUN_STATUSES = ("passed", "failed", "error")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    test_key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    description TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    duration_ms REAL,
+    steps INTEGER NOT NULL DEFAULT 0,
+    failed_steps INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    data BLOB
+);
+CREATE INDEX IF NOT EXISTS runs_by_test ON runs (test_key, started_at);
+CREATE INDEX IF NOT EXISTS runs_by_time ON runs (started_at);
+CREATE TABLE IF NOT EXISTS stage_timings (
+    run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    duration_ms REAL NOT NULL,
+    PRIMARY KEY (run_id, stage)
+);
+"""
+
+
+def make_test_key(url: str, description: str) -> str:
+    """Identify a test by its URL and normalized description."""
+    payload = json.dumps({"url": url.strip(), "description": " ".join(description.split())}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class RunHistory:
+    """SQLite backed history of test runs."""
+
+    def __init__(
+        self,
+        db_path: str,
+        max_runs: Optional[int] = DEFAULT_HISTORY_MAX_RUNS,
+        max_age_days: Optional[float] = DEFAULT_HISTORY_MAX_AGE_DAYS,
+    ):
+        self.db_path = db_path
+        self.max_runs = max_runs
+        self.max_age_days = max_age_days
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._transaction() as connection:
+            connection.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # A connection per operation, so the store can be used from worker threads
+        connection = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def record_run(
+        self,
+        run_id: str,
+        url: str,
+        description: str,
+        test_data: Dict[str, Any],
+        status: str,
+        error: Optional[str] = None,
+        mode: str = "run",
+    ) -> None:
+        """Record a finished run and apply the retention limits.
+
+        Args:
+            run_id: ID of the run (see run_output.make_run_id)
+            url: Target website URL
+            description: Test description
+            test_data: Test data of the run (plan, results, analysis, metrics, ...)
+            status: Outcome of the run: passed, failed or error
+            error: Error message of a run that did not finish
+            mode: How the run was started, e.g. run or replay
+        """
+        if status not in RUN_STATUSES:
+            raise ValueError(f"Unknown run status: {status}")
+        metrics = test_data.get("metrics") or {}
+        plan_steps = ((test_data.get("test_plan") or {}).get("test_plan") or {}).get("steps") or []
+        records = get_step_results(test_data.get("results"))
+        data = {**test_data, "results": compact_results(test_data.get("results"))}
+        stages = metrics.get("stages", {})
+
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_id,
+                    make_test_key(url, description),
+                    url.strip(),
+                    description,
+                    mode,
+                    status,
+                    metrics.get("started_at", time.time()),
+                    stages.get("job", stages.get(mode)),
+                    len(plan_steps),
+                    sum(1 for record in records if step_status(record) == "failed"),
+                    error,
+                    zlib.compress(json.dumps(data, default=str).encode("utf-8")),
+                ),
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO stage_timings VALUES (?, ?, ?)",
+                [(run_id, stage, duration) for stage, duration in stages.items()],
+            )
+        self.apply_retention()
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Return a run with its full test data, or None if it is not recorded."""
+        with self._transaction() as connection:
+            row = connection.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        run = dict(row)
+        run["data"] = json.loads(zlib.decompress(run["data"])) if run["data"] else None
+        return run
+
+    def list_runs(self, url: Optional[str] = None, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Return the most recent runs without their test data.
+
+        Args:
+            url: Only runs against this URL
+            status: Only runs with this outcome
+            limit: Maximum number of runs
+        """
+        query = "SELECT run_id, url, description, mode, status, started_at, duration_ms, steps, failed_steps, error FROM runs"
+        conditions, parameters = [], []
+        if url is not None:
+            conditions.append("url = ?")
+            parameters.append(url.strip())
+        if status is not None:
+            conditions.append("status = ?")
+            parameters.append(status)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY started_at DESC LIMIT ?"
+        with self._transaction() as connection:
+            rows = connection.execute(query, (*parameters, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def flaky_tests(self, days: float = 7.0, min_runs: int = 3) -> List[Dict[str, Any]]:
+        """Find tests whose outcome flips between passed and failed.
+
+        Runs that ended in an error are left out, they say nothing about the test.
+
+        Args:
+            days: Only consider runs of the last number of days
+            min_runs: Minimum number of finished runs of a test
+
+        Returns:
+            Tests with both outcomes, most flips per run first
+        """
+        with self._transaction() as connection:
+            rows = connection.execute(
+                "SELECT test_key, url, description, status FROM runs "
+                "WHERE started_at >= ? AND status != 'error' ORDER BY test_key, started_at",
+                (time.time() - days * 86400,),
+            ).fetchall()
+
+        tests: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            test = tests.setdefault(row["test_key"], {
+                "url": row["url"], "description": row["description"], "runs": 0, "passed": 0, "failed": 0, "flips": 0, "last": None,
+            })
+            test["runs"] += 1
+            test[row["status"]] += 1
+            if test["last"] is not None and test["last"] != row["status"]:
+                test["flips"] += 1
+            test["last"] = row["status"]
+
+        flaky = []
+        for test in tests.values():
+            if test["runs"] >= min_runs and test["passed"] and test["failed"]:
+                test["flip_rate"] = round(test["flips"] / (test["runs"] - 1), 3)
+                test["pass_rate"] = round(test["passed"] / test["runs"], 3)
+                test.pop("last")
+                flaky.append(test)
+        return sorted(flaky, key=lambda test: (-test["flip_rate"], -test["runs"]))
+
+    def latency_trend(self, url: Optional[str] = None, days: float = 30.0, stage: str = "job") -> List[Dict[str, Any]]:
+        """Summarize the duration of a stage per day.
+
+        Args:
+            url: Only runs against this URL
+            days: Number of days to cover
+            stage: Stage to summarize, e.g. job, plan or execute
+
+        Returns:
+            One entry per day with the run count and the mean, p50 and p95 duration in milliseconds
+        """
+        query = (
+            "SELECT date(runs.started_at, 'unixepoch') AS day, stage_timings.duration_ms FROM stage_timings "
+            "JOIN runs ON runs.run_id = stage_timings.run_id WHERE stage_timings.stage = ? AND runs.started_at >= ?"
+        )
+        parameters: List[Any] = [stage, time.time() - days * 86400]
+        if url is not None:
+            query += " AND runs.url = ?"
+            parameters.append(url.strip())
+        with self._transaction() as connection:
+            rows = connection.execute(query + " ORDER BY day", parameters).fetchall()
+
+        days_durations: Dict[str, List[float]] = {}
+        for row in rows:
+            days_durations.setdefault(row["day"], []).append(row["duration_ms"])
+        return [
+            {
+                "day": day,
+                "runs": len(durations),
+                "mean_ms": round(sum(durations) / len(durations), 3),
+                "p50_ms": round(percentile(durations, 50), 3),
+                "p95_ms": round(percentile(durations, 95), 3),
+            }
+            for day, durations in days_durations.items()
+        ]
+
+    def apply_retention(self) -> int:
+        """Remove runs over the maximum count or age.
+
+        Returns:
+            The number of removed runs
+        """
+        removed = 0
+        with self._transaction() as connection:
+            if self.max_age_days is not None:
+                cursor = connection.execute("DELETE FROM runs WHERE started_at < ?", (time.time() - self.max_age_days * 86400,))
+                removed += cursor.rowcount
+            if self.max_runs is not None:
+                cursor = connection.execute(
+                    "DELETE FROM runs WHERE run_id NOT IN (SELECT run_id FROM runs ORDER BY started_at DESC LIMIT ?)",
+                    (self.max_runs,),
+                )
+                removed += cursor.rowcount
+        if removed:
+            self.compact()
+        return removed
+
+    def compact(self, min_free_ratio: float = DEFAULT_COMPACT_RATIO) -> bool:
+        """Return the space of removed runs to the disk once enough of the database is free.
+
+        Returns:
+            True if the database was compacted
+        """
+        with self._transaction() as connection:
+            pages = connection.execute("PRAGMA page_count").fetchone()[0]
+            free = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        if not pages or free / pages < min_free_ratio:
+            return False
+        # VACUUM can't run inside a transaction
+        connection = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        try:
+            connection.execute("VACUUM")
+        finally:
+            connection.close()
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of runs by status and the database size."""
+        with self._transaction() as connection:
+            rows = connection.execute("SELECT status, COUNT(*) AS runs FROM runs GROUP BY status").fetchall()
+        counts = {row["status"]: row["runs"] for row in rows}
+        return {"runs": sum(counts.values()), **counts, "db_bytes": os.path.getsize(self.db_path)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the test run history")
+    parser.add_argument("db", type=str, help="Path of the run history database")
+    parser.add_argument("command", choices=("runs", "flaky", "latency", "compact", "stats"), help="Query to run")
+    parser.add_argument("--url", type=str, default=None, help="Only runs against this URL")
+    parser.add_argument("--status", type=str, default=None, choices=RUN_STATUSES, help="Only runs with this outcome")
+    parser.add_argument("--days", type=float, default=7.0, help="Number of days to cover (default: 7)")
+    parser.add_argument("--stage", type=str, default="job", help="Stage of the latency trend (default: job)")
+    parser.add_argument("--limit", type=int, default=50, help="Maximum number of runs listed (default: 50)")
+    args = parser.parse_args()
+
+    history = RunHistory(args.db, max_runs=None, max_age_days=None)
+    if args.command == "runs":
+        output: Any = history.list_runs(args.url, args.status, args.limit)
+    elif args.command == "flaky":
+        output = history.flaky_tests(args.days)
+    elif args.command == "latency":
+        output = history.latency_trend(args.url, args.days, args.stage)
+    elif args.command == "compact":
+        output = {"compacted": history.compact(min_free_ratio=0.0)}
+    else:
+        output = history.stats()
+    print(json.dumps(output, indent=2))
@@ -0,0 +1,242 @@
+"""
+Per-run instrumentation: timing spans, LLM call sizes and transfer counters.
+
+A RunMetrics collector is activated for the duration of a test job. Stages are
+timed with spans, and LLM calls and HTTP responses anywhere in the job record
+into the active collector through current_run_metrics(), so no collector needs
+to be passed through every call.
+
+Collected metrics are attached to the job's test data and can be exported as
+Prometheus text exposition or as OpenTelemetry compatible JSON spans.
+"""
+
+import contextlib
+import contextvars
+import secrets
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from dom_extract import BYTES_PER_TOKEN
+
+METRICS_FORMATS = ("none", "prometheus", "otel")
+METRIC_PREFIX = "qe_agent"
+
+_active_metrics: contextvars.ContextVar = contextvars.ContextVar("run_metrics", default=None)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text from its UTF-8 size."""
+    return (len(text.encode("utf-8")) + BYTES_PER_TOKEN - 1) // BYTES_PER_TOKEN
+
+
+class RunMetrics:
+    """Metrics of a single test job."""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.llm_calls: List[Dict[str, Any]] = []
+        self.counters: Dict[str, int] = {"http_requests": 0, "bytes_sent": 0, "bytes_received": 0}
+        self._open_spans: List[Dict[str, Any]] = []
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+        """Time a stage of the job.
+
+        Args:
+            name: Stage name, e.g. "fetch" or "plan"
+            **attributes: Attributes recorded with the span
+
+        Yields:
+            The span record, attributes may be added while the stage runs
+        """
+        record = {
+            "name": name,
+            "span_id": secrets.token_hex(8),
+            "parent_span_id": self._open_spans[-1]["span_id"] if self._open_spans else None,
+            "start_ms": round((time.perf_counter() - self._started) * 1000, 3),
+            "duration_ms": None,
+            "status": "ok",
+            "attributes": dict(attributes),
+        }
+        self.spans.append(record)
+        self._open_spans.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["status"] = "error"
+            record["attributes"]["error"] = str(e)
+            raise
+        finally:
+            record["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            self._open_spans.remove(record)
+
+    def record_llm_call(self, prompt: str, response: str, duration: float) -> None:
+        """Record the sizes of an LLM call made during the current stage."""
+        self.llm_calls.append({
+            "stage": self._open_spans[-1]["name"] if self._open_spans else None,
+            "duration_ms": round(duration * 1000, 3),
+            "prompt_bytes": len(prompt.encode("utf-8")),
+            "response_bytes": len(response.encode("utf-8")),
+            "prompt_tokens": estimate_tokens(prompt),
+            "response_tokens": estimate_tokens(response),
+        })
+
+    def record_transfer(self, sent: int, received: int) -> None:
+        """Record the bytes of an HTTP exchange."""
+        self.counters["http_requests"] += 1
+        self.counters["bytes_sent"] += sent
+        self.counters["bytes_received"] += received
+
+    def stage_durations(self) -> Dict[str, float]:
+        """Return the total duration in milliseconds of every stage."""
+        durations: Dict[str, float] = {}
+        for span in self.spans:
+            if span["duration_ms"] is not None:
+                durations[span["name"]] = round(durations.get(span["name"], 0.0) + span["duration_ms"], 3)
+        return durations
+
+    def to_dict(self, retries: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Return the metrics as a JSON serializable dictionary.
+
+        Args:
+            retries: Retry counters of the job (see RetryController.stats)
+        """
+        return {
+            "trace_id": self.trace_id,
+            "started_at": self.started_at,
+            "stages": self.stage_durations(),
+            "spans": self.spans,
+            "llm": {
+                "calls": len(self.llm_calls),
+                "prompt_tokens": sum(call["prompt_tokens"] for call in self.llm_calls),
+                "response_tokens": sum(call["response_tokens"] for call in self.llm_calls),
+                "details": self.llm_calls,
+            },
+            "retries": (retries or {}).get("retries", 0),
+            **self.counters,
+        }
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Return the pct-th percentile of values, interpolating between ranks."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def current_run_metrics() -> Optional[RunMetrics]:
+    """Return the metrics collector of the running job, if any."""
+    return _active_metrics.get()
+
+
+@contextlib.contextmanager
+def activate_run_metrics(metrics: RunMetrics) -> Iterator[RunMetrics]:
+    """Make a collector the active one for the current task."""
+    token = _active_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _active_metrics.reset(token)
+
+
+def record_http_response(response: Any) -> None:
+    """Record the request and response bytes of an HTTP response in the active collector."""
+    metrics = current_run_metrics()
+    if metrics is None:
+        return
+    try:
+        sent = len(response.request.content)
+    except Exception:
+        # Streamed requests have no readable content
+        sent = 0
+    # Bytes read from the wire so far, this also covers streamed responses
+    received = getattr(response, "num_bytes_downloaded", 0)
+    metrics.record_transfer(sent, received if isinstance(received, int) else 0)
+
+
+def _label_string(labels: Dict[str, Any]) -> str:
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def to_prometheus(metrics: Dict[str, Any], labels: Optional[Dict[str, Any]] = None) -> str:
+    """Format run metrics (see RunMetrics.to_dict) as Prometheus text exposition.
+
+    Args:
+        metrics: Metrics of a run
+        labels: Labels added to every sample, e.g. the job id
+
+    Returns:
+        The metrics in the Prometheus text format
+    """
+    labels = dict(labels or {})
+    lines = [
+        f"# HELP {METRIC_PREFIX}_stage_duration_seconds Duration of a pipeline stage",
+        f"# TYPE {METRIC_PREFIX}_stage_duration_seconds gauge",
+    ]
+    for stage, duration_ms in metrics["stages"].items():
+        lines.append(f"{METRIC_PREFIX}_stage_duration_seconds{_label_string({**labels, 'stage': stage})} {duration_ms / 1000:.6f}")
+
+    counters = {
+        "llm_calls_total": metrics["llm"]["calls"],
+        "llm_prompt_tokens_total": metrics["llm"]["prompt_tokens"],
+        "llm_response_tokens_total": metrics["llm"]["response_tokens"],
+        "retries_total": metrics["retries"],
+        "http_requests_total": metrics["http_requests"],
+        "bytes_sent_total": metrics["bytes_sent"],
+        "bytes_received_total": metrics["bytes_received"],
+    }
+    for name, value in counters.items():
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} counter")
+        lines.append(f"{METRIC_PREFIX}_{name}{_label_string(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def _otel_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otel_spans(metrics: Dict[str, Any], attributes: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Format the spans of run metrics as OpenTelemetry (OTLP JSON) spans.
+
+    Args:
+        metrics: Metrics of a run
+        attributes: Attributes added to every span, e.g. the job id
+
+    Returns:
+        One OTLP JSON span per stage, ready to be written as JSONL
+    """
+    spans = []
+    for span in metrics["spans"]:
+        start_ns = int((metrics["started_at"] + span["start_ms"] / 1000) * 1e9)
+        end_ns = start_ns + int((span["duration_ms"] or 0) * 1e6)
+        span_attributes = {**(attributes or {}), **span["attributes"]}
+        spans.append({
+            "traceId": metrics["trace_id"],
+            "spanId": span["span_id"],
+            "parentSpanId": span["parent_span_id"] or "",
+            "name": span["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(end_ns),
+            "attributes": [{"key": key, "value": _otel_value(value)} for key, value in span_attributes.items()],
+            "status": {"code": 2 if span["status"] == "error" else 1},
+        })
+    return spans
@@ -0,0 +1,110 @@
+"""
+Output files of test runs.
+
+Every run gets a time ordered run ID and writes its plan, analysis and
+artifacts to its own directory under the output directory, so concurrent and
+consecutive runs never overwrite each other:
+
+    output/20250101T120000-1a2b3c4d/plan.json
+
+Run directories over a maximum count or age are removed after every run, so the
+output directory stays bounded on busy machines. Files are written atomically,
+readers see either the old or the new content.
+"""
+
+import calendar
+import os
+import re
+import secrets
+import shutil
+import tempfile
+import time
+from typing import List, Optional
+
+_RUN_ID = re.compile(r"\d{8}T\d{6}-[0-9a-f]{8}")
+_RUN_ID_TIME = "%Y%m%dT%H%M%S"
+
+
+def make_run_id() -> str:
+    """Create a unique run ID that sorts by start time."""
+    return f"{time.strftime(_RUN_ID_TIME, time.gmtime())}-{secrets.token_hex(4)}"
+
+
+def is_run_id(name: str) -> bool:
+    return _RUN_ID.fullmatch(name) is not None
+
+
+def run_started_at(run_id: str) -> float:
+    """Return the start time of a run as a Unix timestamp."""
+    return float(calendar.timegm(time.strptime(run_id.partition("-")[0], _RUN_ID_TIME)))
+
+
+def run_output_dir(output_dir: str, run_id: str) -> str:
+    """Return the output directory of one run."""
+    return os.path.join(output_dir, run_id)
+
+
+def list_run_dirs(output_dir: str) -> List[str]:
+    """Return the run directories under an output directory, oldest first."""
+    try:
+        names = os.listdir(output_dir)
+    except OSError:
+        return []
+    run_dirs = []
+    for name in names:
+        path = os.path.join(output_dir, name)
+        try:
+            if is_run_id(name) and os.path.isdir(path):
+                # Runs started in the same second are ordered by their last write
+                run_dirs.append((name.partition("-")[0], os.path.getmtime(path), path))
+        except OSError:
+            continue
+    return [path for _, _, path in sorted(run_dirs)]
+
+
+def prune_run_dirs(output_dir: str, max_runs: Optional[int] = None, max_age_days: Optional[float] = None) -> List[str]:
+    """Remove the run directories over a maximum count or age.
+
+    Args:
+        output_dir: Output directory holding the run directories
+        max_runs: Newest runs kept (default: no limit)
+        max_age_days: Age in days after which runs are removed (default: no limit)
+
+    Returns:
+        The removed run directories
+    """
+    run_dirs = list_run_dirs(output_dir)
+    cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+    removed = []
+    for index, run_dir in enumerate(run_dirs):
+        over_count = max_runs is not None and index < len(run_dirs) - max_runs
+        expired = cutoff is not None and run_started_at(os.path.basename(run_dir)) < cutoff
+        if over_count or expired:
+            shutil.rmtree(run_dir, ignore_errors=True)
+            removed.append(run_dir)
+    return removed
+
+
+def latest_run_file(output_dir: str, filename: str) -> Optional[str]:
+    """Return a file of the most recent run under an output directory that wrote it, if any."""
+    for run_dir in reversed(list_run_dirs(output_dir)):
+        path = os.path.join(run_dir, filename)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def write_text_atomic(path: str, text: str) -> None:
+    """Write a file atomically, concurrent readers see either the old or the new content."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,445 @@
+"""
+Local resolution of test plan selectors against the fetched page source.
+
+The page source is parsed once into an index of its elements by id, tag,
+class and visible text, usually from the same parse that extracts the element
+inventory (see PageIndexBuilder). Each step's selector is then resolved against
+the index, so selectors the LLM invented are caught (and optionally corrected)
+before the plan is sent to the Playwright service.
+
+Supported selector syntax is the subset LLM plans use in practice: CSS
+compounds (`button#id.class[name="q"]`), descendant/child combinators (only
+the last compound is resolved), Playwright's `:has-text()`, `:text()` and
+`:text-is()` pseudo classes, and the `text=`, `id=`, `data-testid=` and
+`css=` engines. Anything else (XPath, `>>` chains, role selectors) is
+reported as unsupported and never flagged.
+"""
+
+import difflib
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+
+from dom_extract import INTERACTIVE_TAGS, SKIPPED_TAGS, VOID_TAGS, candidate_selectors, normalize_text
+
+# Index defaults
+MAX_NODE_TEXT_LENGTH = 300                       # Visible text kept per element for text matching
+PAGE_INDEX_CACHE_SIZE = 32                       # Page indexes kept in memory, keyed by page source hash
+PAGE_INDEX_CACHE_MAX_BYTES = 4 * 1024 * 1024     # Total page source size of the cached indexes (an index is ~30x larger)
+PARSE_CHUNK_SIZE = 64 * 1024                     # Characters fed to the parser at a time
+
+RESOLVED = "resolved"
+UNRESOLVED = "unresolved"
+UNSUPPORTED = "unsupported"
+
+_COMPOUND = re.compile(r"^(?P<tag>[a-zA-Z][\w-]*|\*)?(?P<rest>.*)$", re.S)
+_SIMPLE = re.compile(
+    r"""\#(?P<id>[\w-]+)"""
+    r"""|\.(?P<cls>[\w-]+)"""
+    r"""|\[\s*(?P<attr>[\w:-]+)\s*(?:(?P<op>[~|^$*]?=)\s*(?P<value>"[^"]*"|'[^']*'|[^\]\s]*)\s*)?\]"""
+    r"""|:(?P<pseudo>[\w-]+)(?:\((?P<arg>"[^"]*"|'[^']*'|[^)]*)\))?""",
+    re.S,
+)
+_TEXT_PSEUDOS = ("has-text", "text", "text-is")
+
+
+def _unquote(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+def _last_compound(selector: str) -> str:
+    """Return the last compound of a selector, ignoring combinators inside quotes and brackets."""
+    depth = 0
+    quote = None
+    start = 0
+    for index, char in enumerate(selector):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char in "[(":
+            depth += 1
+        elif char in "])":
+            depth -= 1
+        elif depth == 0 and char in " >+~":
+            start = index + 1
+    return selector[start:].strip()
+
+
+def parse_selector(selector: str) -> Optional[Dict[str, Any]]:
+    """Parse a selector into the parts the index can resolve.
+
+    Args:
+        selector: Playwright selector from a test plan step
+
+    Returns:
+        A dict with tag, ids, classes, attrs and texts, or None if the syntax is unsupported
+    """
+    selector = selector.strip()
+    if not selector or ">>" in selector or selector.startswith(("//", "(", "xpath=", "role=", "internal:")):
+        return None
+
+    # Playwright selector engines
+    engine, _, engine_value = selector.partition("=")
+    if engine in ("text", "id", "data-testid") and engine_value:
+        if engine == "text":
+            exact = engine_value.strip()[:1] in "\"'"
+            return {"tag": None, "ids": [], "classes": [], "attrs": [], "texts": [(_unquote(engine_value), exact)]}
+        if engine == "id":
+            return {"tag": None, "ids": [_unquote(engine_value)], "classes": [], "attrs": [], "texts": []}
+        return {"tag": None, "ids": [], "classes": [], "attrs": [("data-testid", "=", _unquote(engine_value))], "texts": []}
+    if engine == "css" and engine_value:
+        selector = engine_value.strip()
+
+    compound = _last_compound(selector)
+    match = _COMPOUND.match(compound)
+    if not compound or not match:
+        return None
+
+    parsed: Dict[str, Any] = {"tag": match.group("tag"), "ids": [], "classes": [], "attrs": [], "texts": []}
+    rest = match.group("rest")
+    position = 0
+    for part in _SIMPLE.finditer(rest):
+        if part.start() != position:
+            return None
+        position = part.end()
+        if part.group("id"):
+            parsed["ids"].append(part.group("id"))
+        elif part.group("cls"):
+            parsed["classes"].append(part.group("cls"))
+        elif part.group("attr"):
+            value = part.group("value")
+            parsed["attrs"].append((part.group("attr").lower(), part.group("op"), _unquote(value) if value is not None else None))
+        elif part.group("pseudo") in _TEXT_PSEUDOS and part.group("arg") is not None:
+            parsed["texts"].append((_unquote(part.group("arg")), part.group("pseudo") == "text-is"))
+        # Other pseudo classes (:visible, :nth-child(2), ...) only narrow the match and are ignored
+    if position != len(rest):
+        return None
+    return parsed
+
+
+def _attr_matches(actual: Optional[str], op: Optional[str], expected: Optional[str]) -> bool:
+    if actual is None:
+        return False
+    if op is None:
+        return True
+    if op == "=":
+        return actual == expected
+    if op == "*=":
+        return expected in actual
+    if op == "^=":
+        return actual.startswith(expected)
+    if op == "$=":
+        return actual.endswith(expected)
+    if op == "~=":
+        return expected in actual.split()
+    if op == "|=":
+        return actual == expected or actual.startswith(f"{expected}-")
+    return False
+
+
+class PageIndexBuilder:
+    """Collect every rendered element with its attributes and visible text.
+
+    Receives the events of an HTML parser, pass it as listener to
+    extract_element_inventory to index the page from the inventory's parse.
+    """
+
+    def __init__(self):
+        self.nodes: List[Dict[str, Any]] = []
+        self._open: List[tuple] = []  # (tag, node, text parts)
+        self._skip_tag: Optional[str] = None
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag: str, attrs_list: List[tuple]) -> None:
+        if self._skip_depth:
+            self._skip_depth += tag == self._skip_tag
+            return
+        if tag in SKIPPED_TAGS:
+            self._skip_tag, self._skip_depth = tag, 1
+            return
+        attrs = {key: (value or "") for key, value in attrs_list}
+        node = {"tag": tag, "attrs": attrs, "classes": set(attrs.get("class", "").split()), "text": ""}
+        self.nodes.append(node)
+        if tag not in VOID_TAGS:
+            self._open.append((tag, node, []))
+
+    def handle_startendtag(self, tag: str, attrs_list: List[tuple]) -> None:
+        if self._skip_depth or tag in SKIPPED_TAGS:
+            return
+        self.handle_starttag(tag, attrs_list)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._skip_depth:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+            return
+        if not any(entry[0] == tag for entry in self._open):
+            return
+        while self._open:
+            open_tag, node, parts = self._open.pop()
+            node["text"] = normalize_text("".join(parts), MAX_NODE_TEXT_LENGTH)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data: str) -> None:
+        if self._skip_depth or not data.strip():
+            return
+        for _, _, parts in self._open:
+            # Stop collecting once an element has enough text for matching
+            if sum(len(part) for part in parts) < MAX_NODE_TEXT_LENGTH * 2:
+                parts.append(data)
+
+    def close(self) -> None:
+        while self._open:
+            _, node, parts = self._open.pop()
+            node["text"] = normalize_text("".join(parts), MAX_NODE_TEXT_LENGTH)
+
+    def build(self) -> "PageIndex":
+        """Return the index of the collected elements, call after the parser was closed."""
+        return PageIndex(self.nodes)
+
+
+class _IndexParser(HTMLParser):
+    """Parse a page source on its own, for pages without an extracted inventory."""
+
+    def __init__(self, builder: PageIndexBuilder):
+        super().__init__(convert_charrefs=True)
+        self.builder = builder
+
+    def handle_starttag(self, tag: str, attrs_list: List[tuple]) -> None:
+        self.builder.handle_starttag(tag, attrs_list)
+
+    def handle_startendtag(self, tag: str, attrs_list: List[tuple]) -> None:
+        self.builder.handle_startendtag(tag, attrs_list)
+
+    def handle_endtag(self, tag: str) -> None:
+        self.builder.handle_endtag(tag)
+
+    def handle_data(self, data: str) -> None:
+        self.builder.handle_data(data)
+
+    def close(self) -> None:
+        super().close()
+        self.builder.close()
+
+
+def parse_page_index(page_source: str) -> "PageIndex":
+    """Parse a page source into its index.
+
+    Args:
+        page_source: Raw HTML returned by the Playwright service
+
+    Returns:
+        The page index
+    """
+    builder = PageIndexBuilder()
+    parser = _IndexParser(builder)
+    for start in range(0, len(page_source), PARSE_CHUNK_SIZE):
+        parser.feed(page_source[start:start + PARSE_CHUNK_SIZE])
+    parser.close()
+    return builder.build()
+
+
+class PageIndex:
+    """Index of a page's elements by id, tag, class and visible text.
+
+    Args:
+        nodes: Elements of the page in document order (see PageIndexBuilder)
+    """
+
+    def __init__(self, nodes: List[Dict[str, Any]]):
+        self.nodes = nodes
+        self.by_id: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_tag: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_class: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_text: Dict[str, List[Dict[str, Any]]] = {}
+        for node in self.nodes:
+            if node["attrs"].get("id"):
+                self.by_id.setdefault(node["attrs"]["id"], []).append(node)
+            self.by_tag.setdefault(node["tag"], []).append(node)
+            for class_name in node["classes"]:
+                self.by_class.setdefault(class_name, []).append(node)
+            if node["text"]:
+                self.by_text.setdefault(node["text"].lower(), []).append(node)
+        self._resolved: Dict[str, Dict[str, Any]] = {}
+
+    def _candidates(self, parsed: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Pick the smallest index bucket that can contain the matches."""
+        if parsed["ids"]:
+            return self.by_id.get(parsed["ids"][0], [])
+        if parsed["classes"]:
+            return self.by_class.get(parsed["classes"][0], [])
+        if parsed["tag"] and parsed["tag"] != "*":
+            return self.by_tag.get(parsed["tag"], [])
+        if parsed["texts"] and parsed["texts"][0][1]:
+            return self.by_text.get(parsed["texts"][0][0].lower(), [])
+        return self.nodes
+
+    def _matches(self, node: Dict[str, Any], parsed: Dict[str, Any]) -> bool:
+        attrs = node["attrs"]
+        if parsed["tag"] not in (None, "*") and node["tag"] != parsed["tag"].lower():
+            return False
+        if any(attrs.get("id") != element_id for element_id in parsed["ids"]):
+            return False
+        if not node["classes"].issuperset(parsed["classes"]):
+            return False
+        if not all(_attr_matches(attrs.get(name), op, value) for name, op, value in parsed["attrs"]):
+            return False
+        for text, exact in parsed["texts"]:
+            expected = normalize_text(text, MAX_NODE_TEXT_LENGTH).lower()
+            actual = node["text"].lower()
+            if (exact and actual != expected) or (not exact and expected not in actual):
+                return False
+        return True
+
+    def find(self, selector: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the elements matching a selector, or None if its syntax is unsupported."""
+        parsed = parse_selector(selector)
+        if parsed is None:
+            return None
+        return [node for node in self._candidates(parsed) if self._matches(node, parsed)]
+
+    def resolve(self, selector: str) -> Dict[str, Any]:
+        """Resolve a selector, memoizing the result for this page.
+
+        Args:
+            selector: Playwright selector from a test plan step
+
+        Returns:
+            A dict with the resolution status and the number of matching elements
+        """
+        if selector not in self._resolved:
+            matches = self.find(selector)
+            if matches is None:
+                self._resolved[selector] = {"status": UNSUPPORTED, "matches": 0}
+            else:
+                self._resolved[selector] = {"status": RESOLVED if matches else UNRESOLVED, "matches": len(matches)}
+        return self._resolved[selector]
+
+    def suggest(self, selector: str) -> Optional[str]:
+        """Suggest a resolvable replacement for an unresolved selector.
+
+        Args:
+            selector: Unresolved selector
+
+        Returns:
+            A selector matching the most likely intended element, or None
+        """
+        parsed = parse_selector(selector)
+        if parsed is None:
+            return None
+
+        candidates: List[Dict[str, Any]] = []
+        if parsed["texts"]:
+            # The text is usually right when the tag or id is invented
+            text = normalize_text(parsed["texts"][0][0], MAX_NODE_TEXT_LENGTH).lower()
+            candidates = self.by_text.get(text, []) or [node for node in self.nodes if text and text in node["text"].lower()]
+        elif parsed["ids"]:
+            close = difflib.get_close_matches(parsed["ids"][0], list(self.by_id), n=1, cutoff=0.6)
+            candidates = self.by_id.get(close[0], []) if close else []
+        elif parsed["classes"]:
+            close = difflib.get_close_matches(parsed["classes"][0], list(self.by_class), n=1, cutoff=0.6)
+            candidates = self.by_class.get(close[0], []) if close else []
+
+        # Prefer the innermost interactive element carrying the text
+        candidates = sorted(candidates, key=lambda node: (node["tag"] not in INTERACTIVE_TAGS, len(node["text"])))
+        for node in candidates[:10]:
+            for suggestion in candidate_selectors({**node, "text": normalize_text(node["text"])}):
+                matches = self.find(suggestion)
+                if matches is not None and len(matches) == 1:
+                    return suggestion
+        return None
+
+
+# Cached indexes by page source hash, with the page source size of each
+_PAGE_INDEX_CACHE: "OrderedDict[str, Tuple[PageIndex, int]]" = OrderedDict()
+_page_index_cache_bytes = 0
+_page_index_cache_lock = threading.Lock()
+
+
+def get_page_index(page_source: str) -> PageIndex:
+    """Return the index of a page source, reusing indexes of identical pages.
+
+    The cache is bounded by the number of pages and their total source size;
+    pages over the size limit are indexed without caching.
+
+    Args:
+        page_source: Raw HTML returned by the Playwright service
+
+    Returns:
+        The page index, including its memoized selector resolutions
+    """
+    global _page_index_cache_bytes
+    source = page_source.encode("utf-8")
+    key = hashlib.sha256(source).hexdigest()
+    with _page_index_cache_lock:
+        entry = _PAGE_INDEX_CACHE.get(key)
+        if entry is not None:
+            _PAGE_INDEX_CACHE.move_to_end(key)
+            return entry[0]
+
+    page_index = parse_page_index(page_source)
+    if len(source) > PAGE_INDEX_CACHE_MAX_BYTES:
+        return page_index
+    with _page_index_cache_lock:
+        if key not in _PAGE_INDEX_CACHE:
+            _PAGE_INDEX_CACHE[key] = (page_index, len(source))
+            _page_index_cache_bytes += len(source)
+        while len(_PAGE_INDEX_CACHE) > PAGE_INDEX_CACHE_SIZE or _page_index_cache_bytes > PAGE_INDEX_CACHE_MAX_BYTES:
+            _, (_, size) = _PAGE_INDEX_CACHE.popitem(last=False)
+            _page_index_cache_bytes -= size
+    return page_index
+
+
+def check_plan_selectors(
+    plan_json: Dict[str, Any],
+    page_source: str,
+    auto_correct: bool = False,
+    page_index: Optional[PageIndex] = None
+) -> Dict[str, Any]:
+    """Resolve every step selector of a test plan against the page source.
+
+    Args:
+        plan_json: Test plan with a test_plan.steps list
+        page_source: Raw HTML of the page the plan was generated for
+        auto_correct: Replace unresolved selectors that have a unique suggestion
+        page_index: Index of the page source built during extraction (default: see get_page_index)
+
+    Returns:
+        A report with the (possibly corrected) plan, every unresolved selector and
+        its suggestion, and counts per resolution status
+    """
+    if page_index is None:
+        page_index = get_page_index(page_source)
+    steps = []
+    issues = []
+    counts = {RESOLVED: 0, UNRESOLVED: 0, UNSUPPORTED: 0, "corrected": 0}
+
+    for number, step in enumerate(plan_json["test_plan"]["steps"], start=1):
+        selector = step.get("selector") if isinstance(step, dict) else None
+        if not isinstance(selector, str) or not selector.strip():
+            steps.append(step)
+            continue
+
+        resolution = page_index.resolve(selector)
+        counts[resolution["status"]] += 1
+        if resolution["status"] == UNRESOLVED:
+            suggestion = page_index.suggest(selector)
+            issues.append({"step": number, "action": step.get("action"), "selector": selector, "suggestion": suggestion})
+            if auto_correct and suggestion:
+                step = {**step, "selector": suggestion}
+                counts["corrected"] += 1
+        steps.append(step)
+
+    plan = {**plan_json, "test_plan": {**plan_json["test_plan"], "steps": steps}}
+    return {"plan": plan, "issues": issues, "counts": counts}
@@ -0,0 +1,248 @@
+"""
+Resident test job service.
+
+Keeps a queue of test jobs that are executed by a fixed pool of workers inside
+an already running process, and exposes it over a local HTTP API (TCP port or
+Unix socket):
+
+    POST /jobs              Queue a job: {"url": ..., "description": ..., <job settings>}
+    GET  /jobs              Status of all known jobs
+    GET  /jobs/<id>         Status and, once finished, the result of a job
+    GET  /jobs/<id>/events  NDJSON stream of status changes until the job finishes
+    GET  /health            Queue and worker status
+
+The service is agnostic of how jobs run: it is given a runner coroutine that
+executes one normalized job and returns its result.
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from http_server import (
+    HttpError,
+    HttpRequest,
+    end_chunked,
+    send_json,
+    send_json_line,
+    start_chunked,
+    start_http_server,
+)
+from suite import make_job_id, normalize_jobs
+
+# Service defaults
+DEFAULT_SERVICE_HOST = "127.0.0.1"     # Host the service listens on
+DEFAULT_SERVICE_PORT = 8100            # Port the service listens on
+DEFAULT_SERVICE_WORKERS = 4            # Jobs running at the same time
+DEFAULT_MAX_QUEUED_JOBS = 1000         # Jobs waiting before new submissions are rejected
+DEFAULT_MAX_FINISHED_JOBS = 1000       # Finished jobs kept for status queries
+
+FINISHED_STATUSES = ("completed", "error")
+
+JobRunner = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class TestJob:
+    """A queued test job and its status history."""
+
+    # Not a pytest test class
+    __test__ = False
+
+    def __init__(self, job: Dict[str, Any]):
+        self.id = job["id"]
+        self.job = job
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.events: List[Dict[str, Any]] = []
+        self.changed = asyncio.Event()
+        self.set_status("queued")
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def set_status(self, status: str, **details: Any) -> None:
+        """Record a status change and wake up event streams."""
+        self.status = status
+        self.events.append({"id": self.id, "status": status, "time": time.time(), **details})
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def to_dict(self, include_result: bool = False) -> Dict[str, Any]:
+        data = {
+            "id": self.id,
+            "status": self.status,
+            "url": self.job["url"],
+            "description": self.job["description"],
+            "events": self.events,
+        }
+        if include_result and self.result is not None:
+            data["result"] = self.result
+        return data
+
+
+class TestJobService:
+    """Queue of test jobs executed by a pool of workers in a warm process."""
+
+    __test__ = False
+
+    def __init__(
+        self,
+        runner: JobRunner,
+        workers: int = DEFAULT_SERVICE_WORKERS,
+        max_queued_jobs: int = DEFAULT_MAX_QUEUED_JOBS,
+        max_finished_jobs: int = DEFAULT_MAX_FINISHED_JOBS,
+        logger: Any = None,
+    ):
+        self.runner = runner
+        self.workers = workers
+        self.max_finished_jobs = max_finished_jobs
+        self.logger = logger
+        self.jobs: "OrderedDict[str, TestJob]" = OrderedDict()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued_jobs)
+        self._worker_tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the worker tasks."""
+        for _ in range(self.workers):
+            self._worker_tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks."""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def submit(self, payload: Any) -> TestJob:
+        """Validate and queue a job.
+
+        Args:
+            payload: Job settings with at least url and description
+
+        Returns:
+            The queued job
+
+        Raises:
+            HttpError: If the job is invalid or the queue is full
+        """
+        if not isinstance(payload, dict):
+            raise HttpError(400, "Job must be a JSON object")
+
+        # Service generated ids keep jobs unique, a client id is kept as prefix
+        payload = {**payload, "id": make_job_id(f"{payload.get('id') or 'job'}-{uuid.uuid4().hex[:8]}", 0)}
+        try:
+            job = normalize_jobs([payload], {})[0]
+        except ValueError as e:
+            raise HttpError(422, str(e))
+
+        test_job = TestJob(job)
+        try:
+            self.queue.put_nowait(test_job)
+        except asyncio.QueueFull:
+            raise HttpError(503, "Job queue is full")
+        self.jobs[test_job.id] = test_job
+        return test_job
+
+    async def _worker(self) -> None:
+        """Run queued jobs one at a time."""
+        while True:
+            test_job = await self.queue.get()
+            try:
+                test_job.set_status("running")
+                test_job.result = await self.runner(test_job.job)
+                error = test_job.result.get("error")
+                if error:
+                    test_job.set_status("error", error=error)
+                else:
+                    test_job.set_status("completed")
+            except asyncio.CancelledError:
+                test_job.set_status("error", error="Service stopped")
+                raise
+            except Exception as e:
+                test_job.result = {"error": f"Unexpected error: {str(e)}"}
+                test_job.set_status("error", error=test_job.result["error"])
+            finally:
+                self.queue.task_done()
+                self._forget_finished_jobs()
+
+    def _forget_finished_jobs(self) -> None:
+        """Drop the oldest finished jobs beyond the retention limit."""
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self.max_finished_jobs, 0)]:
+            del self.jobs[job_id]
+
+    def health(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for test_job in self.jobs.values():
+            statuses[test_job.status] = statuses.get(test_job.status, 0) + 1
+        return {"status": "ok", "workers": self.workers, "queued": self.queue.qsize(), "jobs": statuses}
+
+    async def handle_request(self, request: HttpRequest, writer: asyncio.StreamWriter) -> None:
+        """Route one HTTP request of the job API."""
+        parts = [part for part in request.path.split("/") if part]
+
+        if parts == ["health"]:
+            await send_json(writer, 200, self.health())
+            return
+
+        if parts == ["jobs"]:
+            if request.method == "POST":
+                test_job = self.submit(request.json())
+                if self.logger:
+                    self.logger.info(f"Queued job {test_job.id} for {test_job.job['url']}")
+                await send_json(writer, 202, test_job.to_dict())
+            elif request.method == "GET":
+                await send_json(writer, 200, {"jobs": [job.to_dict() for job in self.jobs.values()]})
+            else:
+                raise HttpError(405, f"Method {request.method} not allowed")
+            return
+
+        if len(parts) in (2, 3) and parts[0] == "jobs" and request.method == "GET":
+            test_job = self.jobs.get(parts[1])
+            if test_job is None:
+                raise HttpError(404, f"Unknown job {parts[1]}")
+            if len(parts) == 2:
+                await send_json(writer, 200, test_job.to_dict(include_result=True))
+                return
+            if parts[2] == "events":
+                await self._stream_events(test_job, writer)
+                return
+
+        raise HttpError(404, f"Unknown path {request.path}")
+
+    async def _stream_events(self, test_job: TestJob, writer: asyncio.StreamWriter) -> None:
+        """Stream the status changes of a job as NDJSON until it finishes."""
+        await start_chunked(writer)
+        sent = 0
+        while True:
+            changed = test_job.changed
+            for event in test_job.events[sent:]:
+                await send_json_line(writer, event)
+            sent = len(test_job.events)
+            if test_job.finished:
+                break
+            await changed.wait()
+        await send_json_line(writer, test_job.to_dict(include_result=True))
+        await end_chunked(writer)
+
+    async def serve(
+        self,
+        host: str = DEFAULT_SERVICE_HOST,
+        port: int = DEFAULT_SERVICE_PORT,
+        socket_path: Optional[str] = None,
+    ) -> asyncio.AbstractServer:
+        """Start the workers and the HTTP API.
+
+        Args:
+            host: Host to bind when listening on TCP
+            port: Port to bind when listening on TCP
+            socket_path: Unix socket path, takes precedence over host/port
+
+        Returns:
+            The started asyncio server
+        """
+        self.start()
+        return await start_http_server(self.handle_request, host, port, socket_path)
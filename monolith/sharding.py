@@ -0,0 +1,185 @@
+"""
+Sharded execution of a single test plan across several Playwright services.
+
+LLM plans are often a series of independent scenarios separated by clicks on
+an explicit reset control (for example `click Clear` on a calculator). The
+plan is split into segments at those boundaries only; a `navigate` in the
+middle of a plan usually depends on the state built so far (a login, a cart)
+and never starts a segment. Each segment becomes a standalone plan with a
+navigate prefix, is dispatched to the least loaded Playwright endpoint, and
+the segment results are merged back in the original step order.
+"""
+
+import asyncio
+import contextlib
+import re
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from step_results import get_step_results, step_passed, with_step_results
+
+# Visible texts of controls that reset the page state between scenarios, single
+# characters only count on a button selected by exactly that text (see is_reset_step)
+DEFAULT_RESET_TEXTS = ("AC", "C", "CE", "Clear", "Reset")
+
+# Steps that settle the page after a navigation and belong to the navigate prefix
+SETTLE_ACTIONS = ("waitForLoadState", "wait")
+
+_HAS_TEXT = re.compile(r""":has-text\(\s*(['"])(.*?)\1\s*\)""")
+_BUTTON_TEXT = re.compile(r"""\s*(?:button|\[role=(['"]?)button\1\]):(?:has-text|text-is)\(\s*(['"])(.*?)\2\s*\)\s*""")
+
+
+def is_reset_step(step: Dict[str, Any], reset_texts: Sequence[str] = DEFAULT_RESET_TEXTS) -> bool:
+    """Check whether a step resets the page state.
+
+    Args:
+        step: Test plan step
+        reset_texts: Visible texts of controls that reset the page
+
+    Returns:
+        True for clicks on reset controls. A single character such as "C" is too
+        ambiguous anywhere else, so it only counts when the whole selector is a
+        button with exactly that text, e.g. button:has-text('C')
+    """
+    if step.get("action") != "click":
+        return False
+    selector = step.get("selector") or ""
+    button = _BUTTON_TEXT.fullmatch(selector)
+    if button:
+        # Single characters must match exactly, "c" is no reset
+        text = button.group(3).strip()
+        return text in reset_texts if len(text) == 1 else text.lower() in {t.lower() for t in reset_texts}
+    match = _HAS_TEXT.search(selector)
+    if not match:
+        return False
+    text = match.group(2).strip()
+    return len(text) > 1 and text.lower() in {t.lower() for t in reset_texts}
+
+
+@dataclass
+class PlanSegment:
+    """An independent run of consecutive steps of a test plan."""
+
+    index: int
+    start: int
+    steps: List[Dict[str, Any]]
+    prefix: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_plan(self, plan_json: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a standalone plan executing the prefix and the segment steps."""
+        test_plan = {**plan_json["test_plan"], "steps": self.prefix + self.steps}
+        return {**plan_json, "test_plan": test_plan}
+
+
+def split_test_plan(plan_json: Dict[str, Any], reset_texts: Sequence[str] = DEFAULT_RESET_TEXTS) -> List[PlanSegment]:
+    """Split a test plan into independent segments at reset steps.
+
+    The first segment starts with the plan, every later one at a click on a reset
+    control; navigations within the plan stay in the segment they belong to.
+
+    Args:
+        plan_json: Validated test plan
+        reset_texts: Visible texts of controls that reset the page
+
+    Returns:
+        The segments in plan order; segments after the first get the preceding
+        navigation (and its settle steps) as prefix
+    """
+    steps = plan_json["test_plan"]["steps"]
+    segments: List[PlanSegment] = []
+    navigate_prefix: List[Dict[str, Any]] = []
+    if plan_json.get("url"):
+        navigate_prefix = [{"action": "navigate", "value": plan_json["url"]}]
+
+    current: Optional[PlanSegment] = None
+    settling = False
+    for index, step in enumerate(steps):
+        if current is None or is_reset_step(step, reset_texts):
+            prefix = [] if step.get("action") == "navigate" else list(navigate_prefix)
+            current = PlanSegment(index=len(segments), start=index, steps=[], prefix=prefix)
+            segments.append(current)
+        current.steps.append(step)
+
+        # Track the latest navigation and its settle steps for later segments
+        if step.get("action") == "navigate":
+            navigate_prefix = [step]
+            settling = True
+        elif settling and step.get("action") in SETTLE_ACTIONS:
+            navigate_prefix = navigate_prefix + [step]
+        else:
+            settling = False
+
+    return segments
+
+
+class LeastLoadedScheduler:
+    """Assign work to the endpoint with the fewest requests in flight."""
+
+    def __init__(self, endpoints: Sequence[str], max_in_flight: int = 1):
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+        self.endpoints = list(endpoints)
+        self.max_in_flight = max_in_flight
+        self.in_flight = {endpoint: 0 for endpoint in self.endpoints}
+        self.assigned = {endpoint: 0 for endpoint in self.endpoints}
+        self._available = asyncio.Condition()
+
+    def _pick(self) -> Optional[str]:
+        candidates = [e for e in self.endpoints if self.in_flight[e] < self.max_in_flight]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda e: (self.in_flight[e], self.assigned[e]))
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[str]:
+        """Reserve the least loaded endpoint for the duration of the block."""
+        async with self._available:
+            endpoint = self._pick()
+            while endpoint is None:
+                await self._available.wait()
+                endpoint = self._pick()
+            self.in_flight[endpoint] += 1
+            self.assigned[endpoint] += 1
+        try:
+            yield endpoint
+        finally:
+            async with self._available:
+                self.in_flight[endpoint] -= 1
+                self._available.notify()
+
+
+def merge_segment_results(segments: List[PlanSegment], segment_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge the results of executed segments into one report in plan order.
+
+    Args:
+        segments: Segments in plan order
+        segment_results: For each segment, a dict with `endpoint` and either
+            `results` (service results) or `error` (execution error message)
+
+    Returns:
+        A results object with the step records of all segments, without the
+        records of injected navigate prefixes, and a `shards` overview
+    """
+    merged_steps: List[Dict[str, Any]] = []
+    shards: List[Dict[str, Any]] = []
+    base: Dict[str, Any] = {}
+
+    for segment, outcome in zip(segments, segment_results):
+        shard = {"segment": segment.index, "start": segment.start, "steps": len(segment.steps), "endpoint": outcome.get("endpoint")}
+        if "error" in outcome:
+            # Report every step of a failed shard so the step order stays intact
+            shard["error"] = outcome["error"]
+            for offset, step in enumerate(segment.steps):
+                merged_steps.append({**step, "step": segment.start + offset + 1, "status": "error", "error": outcome["error"]})
+        else:
+            results = outcome["results"]
+            if not base and isinstance(results, dict):
+                base = results
+            merged_steps.extend(get_step_results(results)[len(segment.prefix):])
+        shards.append(shard)
+
+    merged = with_step_results(base, merged_steps)
+    if "success" in base or any("error" in shard for shard in shards):
+        merged["success"] = all(step_passed(record) for record in merged_steps)
+    merged["shards"] = shards
+    return merged
@@ -0,0 +1,248 @@
+"""
+On-disk store of fetched page sources with reuse within a TTL and inventory diffs.
+
+Every fetched page is kept gzip compressed under a hash of its URL, next to
+metadata holding the content hash, the fetch time and the element inventory
+of the page. A snapshot younger than the TTL is used instead of fetching the
+page again. When a refetched page changed, the element inventories of the
+old and new snapshot are diffed, showing which element changes may have
+caused a new plan.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from dom_extract import ElementInventory, extract_element_inventory, format_element
+
+# Snapshot defaults
+DEFAULT_SNAPSHOT_TTL = 300.0               # Seconds a snapshot is used instead of fetching the page
+DEFAULT_SNAPSHOT_MAX_ENTRIES = 1000        # Maximum number of stored pages
+
+SNAPSHOT_SUFFIX = ".html.gz"
+METADATA_SUFFIX = ".meta.json"
+
+
+def snapshot_key(url: str) -> str:
+    """Compute the storage key of a page URL."""
+    return hashlib.sha256(url.strip().encode("utf-8")).hexdigest()
+
+
+def content_hash(page_source: str) -> str:
+    return hashlib.sha256(page_source.encode("utf-8")).hexdigest()
+
+
+def inventory_signature(inventory: ElementInventory) -> Dict[str, str]:
+    """Map every targetable element of a page inventory to its inventory line.
+
+    Elements are keyed by tag and primary selector, so an element whose text or
+    attributes changed is reported as changed rather than removed and added.
+    """
+    return {f"{element['tag']} {element['selectors'][0]}": format_element(element) for element in inventory.elements}
+
+
+def diff_inventories(before: Dict[str, str], after: Dict[str, str]) -> Dict[str, Any]:
+    """Diff the element inventories of two snapshots of a page.
+
+    Args:
+        before: Inventory signature of the older snapshot
+        after: Inventory signature of the newer snapshot
+
+    Returns:
+        The added, removed and changed inventory lines and the number of unchanged elements
+    """
+    changed = [
+        {"before": before[key], "after": after[key]}
+        for key in after
+        if key in before and before[key] != after[key]
+    ]
+    return {
+        "added": [line for key, line in after.items() if key not in before],
+        "removed": [line for key, line in before.items() if key not in after],
+        "changed": changed,
+        "unchanged": sum(1 for key in after if before.get(key) == after[key]),
+    }
+
+
+def has_changes(diff: Optional[Dict[str, Any]]) -> bool:
+    return bool(diff and (diff["added"] or diff["removed"] or diff["changed"]))
+
+
+@dataclass
+class PageSnapshot:
+    """A stored page source and its metadata."""
+
+    url: str
+    page_source: str
+    sha256: str
+    fetched_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+@dataclass
+class SnapshotUpdate:
+    """Outcome of storing a freshly fetched page."""
+
+    url: str
+    sha256: str
+    changed: bool
+    previous_sha256: Optional[str] = None
+    diff: Optional[Dict[str, Any]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "sha256": self.sha256,
+            "changed": self.changed,
+            "previous_sha256": self.previous_sha256,
+            "diff": self.diff,
+        }
+
+
+class SnapshotStore:
+    """Directory backed store of compressed page sources."""
+
+    def __init__(self, snapshot_dir: str, ttl: float = DEFAULT_SNAPSHOT_TTL, max_entries: int = DEFAULT_SNAPSHOT_MAX_ENTRIES):
+        self.snapshot_dir = snapshot_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.changes = 0
+        self.evictions = 0
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+    def _path(self, url: str, suffix: str) -> str:
+        return os.path.join(self.snapshot_dir, f"{snapshot_key(url)}{suffix}")
+
+    def _read_metadata(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(url, METADATA_SUFFIX)) as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return metadata if metadata.get("url") == url.strip() else None
+
+    def _write(self, path: str, data: bytes) -> None:
+        # Write atomically so concurrent readers never see a partial snapshot
+        fd, tmp_path = tempfile.mkstemp(dir=self.snapshot_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+
+    def get(self, url: str) -> Optional[PageSnapshot]:
+        """Look up a snapshot of a page that is younger than the TTL.
+
+        Args:
+            url: Page URL
+
+        Returns:
+            The snapshot, or None if there is none or it expired
+        """
+        metadata = self._read_metadata(url)
+        if metadata is None or time.time() - metadata["fetched_at"] > self.ttl:
+            self.misses += 1
+            return None
+        try:
+            with gzip.open(self._path(url, SNAPSHOT_SUFFIX), "rt", encoding="utf-8") as f:
+                page_source = f.read()
+        except (OSError, EOFError):
+            self.misses += 1
+            return None
+        if content_hash(page_source) != metadata["sha256"]:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return PageSnapshot(url=metadata["url"], page_source=page_source, sha256=metadata["sha256"], fetched_at=metadata["fetched_at"])
+
+    def put(self, url: str, page_source: str, inventory: Optional[ElementInventory] = None) -> SnapshotUpdate:
+        """Store a freshly fetched page, diffing its inventory against the previous snapshot.
+
+        Args:
+            url: Page URL
+            page_source: Fetched HTML source
+            inventory: Element inventory of the page if already extracted, otherwise it is extracted here
+
+        Returns:
+            Whether the page changed since the previous snapshot, with the inventory diff
+        """
+        previous = self._read_metadata(url)
+        sha256 = content_hash(page_source)
+        metadata = {"url": url.strip(), "sha256": sha256, "fetched_at": time.time(), "source_bytes": len(page_source.encode("utf-8"))}
+
+        if previous is not None and previous["sha256"] == sha256:
+            # Unchanged page, only the fetch time moves
+            self._write(self._path(url, METADATA_SUFFIX), json.dumps({**previous, **metadata}).encode("utf-8"))
+            return SnapshotUpdate(url=url, sha256=sha256, changed=False, previous_sha256=sha256)
+
+        if inventory is None:
+            # A zero budget skips rendering, only the element records are needed
+            inventory = extract_element_inventory(page_source, max_bytes=0)
+        elements = inventory_signature(inventory)
+        diff = diff_inventories(previous.get("elements", {}), elements) if previous is not None else None
+        self._write(self._path(url, SNAPSHOT_SUFFIX), gzip.compress(page_source.encode("utf-8")))
+        self._write(self._path(url, METADATA_SUFFIX), json.dumps({**metadata, "elements": elements}).encode("utf-8"))
+        if previous is not None:
+            self.changes += 1
+        self.evict()
+        return SnapshotUpdate(
+            url=url,
+            sha256=sha256,
+            changed=previous is not None,
+            previous_sha256=previous["sha256"] if previous is not None else None,
+            diff=diff,
+        )
+
+    def evict(self) -> int:
+        """Remove the least recently fetched pages over the entry limit.
+
+        Returns:
+            The number of evicted pages
+        """
+        entries: List[tuple] = []
+        for name in os.listdir(self.snapshot_dir):
+            if not name.endswith(METADATA_SUFFIX):
+                continue
+            path = os.path.join(self.snapshot_dir, name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+
+        entries.sort()
+        evicted = 0
+        for _, path in entries[:max(len(entries) - self.max_entries, 0)]:
+            self._remove(path)
+            self._remove(path[:-len(METADATA_SUFFIX)] + SNAPSHOT_SUFFIX)
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for reporting."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "changes": self.changes,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
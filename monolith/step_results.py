@@ -0,0 +1,109 @@
+"""
+Helpers for reading the per-step records in Playwright service results.
+
+The service reports one record per executed step, in plan order, under a
+list valued key of the results object. These helpers locate that list and
+interpret the status of individual records without assuming more of the
+result format than necessary.
+"""
+
+from typing import Any, Dict, List, Optional
+
+# Keys under which the service may report the per-step records
+STEP_RESULT_KEYS = ("results", "steps", "step_results")
+
+# Keys of step records holding diagnostic text, which is truncated rather than dropped
+TEXT_KEYS = ("error", "message", "actual", "expected")
+
+PASSED_STATUSES = {"success", "passed", "pass", "ok"}
+FAILED_STATUSES = {"error", "failed", "fail", "failure"}
+
+
+def get_step_results_key(results: Any) -> Optional[str]:
+    """Return the key holding the per-step records, if any."""
+    if isinstance(results, dict):
+        for key in STEP_RESULT_KEYS:
+            if isinstance(results.get(key), list):
+                return key
+    return None
+
+
+def get_step_results(results: Any) -> List[Dict[str, Any]]:
+    """Return the per-step records of a results object.
+
+    Args:
+        results: Results returned by the Playwright service
+
+    Returns:
+        The step records, or an empty list if none are reported
+    """
+    key = get_step_results_key(results)
+    return [record for record in results[key] if isinstance(record, dict)] if key else []
+
+
+def with_step_results(results: Dict[str, Any], step_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Return a copy of a results object with its step records replaced."""
+    key = get_step_results_key(results) or STEP_RESULT_KEYS[0]
+    return {**results, key: step_results}
+
+
+def step_status(record: Dict[str, Any]) -> str:
+    """Classify a step record as "passed", "failed" or "unknown"."""
+    status = str(record.get("status", record.get("result", ""))).lower()
+    if status in FAILED_STATUSES or record.get("success") is False or record.get("error"):
+        return "failed"
+    if status in PASSED_STATUSES or record.get("success") is True:
+        return "passed"
+    return "unknown"
+
+
+def step_passed(record: Dict[str, Any]) -> bool:
+    """Return True unless a step record reports a failure."""
+    return step_status(record) != "failed"
+
+
+def first_failed_step(results: Any) -> Optional[int]:
+    """Return the index of the first failed step record, if any."""
+    for index, record in enumerate(get_step_results(results)):
+        if not step_passed(record):
+            return index
+    return None
+
+
+def truncate_text(text: str, max_length: int) -> str:
+    """Keep the start of a long text, marking how much of it was cut."""
+    if len(text) <= max_length:
+        return text
+    return f"{text[:max_length]}... [{len(text) - max_length} more characters]"
+
+
+def compact_step_record(record: Dict[str, Any], max_value_bytes: int = 1024) -> Dict[str, Any]:
+    """Drop large payloads (e.g. base64 screenshots) from a step record.
+
+    Args:
+        record: Step record as reported by the service
+        max_value_bytes: Largest string value kept as is
+
+    Returns:
+        A copy of the record where oversized diagnostic text (see TEXT_KEYS) is
+        truncated and other oversized strings are replaced by their size
+    """
+    compact = {}
+    for key, value in record.items():
+        if not isinstance(value, str) or len(value) <= max_value_bytes:
+            compact[key] = value
+        elif key in TEXT_KEYS:
+            compact[key] = truncate_text(value, max_value_bytes)
+        else:
+            compact[key] = {"omitted_bytes": len(value)}
+    return compact
+
+
+def compact_results(results: Any) -> Any:
+    """Drop large payloads such as screenshots from the step records of results."""
+    if not isinstance(results, dict):
+        return results
+    records = get_step_results(results)
+    if not records:
+        return results
+    return with_step_results(results, [compact_step_record(record) for record in records])
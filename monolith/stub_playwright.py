@@ -0,0 +1,130 @@
+"""
+Local stub of the Playwright service for tests and benchmarks.
+
+Serves the same API as the real service without a browser:
+
+    POST /navigate        Returns the configured page source
+    POST /execute         Returns {"success": ..., "results": [...]} for the whole plan
+    POST /execute/stream  Streams one NDJSON step record per step, then a summary record
+
+Step records echo the step, report `success` (or `error` for configured
+failing steps), carry the expected value as `actual` for `check` steps, and
+a base64 payload of configurable size for `screenshot` steps. Latency per
+request and per step is configurable.
+"""
+
+import asyncio
+import base64
+from typing import Any, Dict, Iterable, List, Optional
+
+from http_server import (
+    HttpError,
+    HttpRequest,
+    end_chunked,
+    send_json,
+    send_json_line,
+    send_response,
+    start_chunked,
+    start_http_server,
+)
+
+DEFAULT_STUB_PAGE_SOURCE = """<html><head><title>Stub</title></head><body>
+<div class="display">0</div>
+<button id="one">1</button><button id="plus">+</button><button id="equals">=</button><button id="clear">C</button>
+</body></html>"""
+
+
+class StubPlaywrightService:
+    """In-process HTTP server imitating the Playwright service."""
+
+    def __init__(
+        self,
+        page_source: str = DEFAULT_STUB_PAGE_SOURCE,
+        navigate_latency: float = 0.0,
+        step_latency: float = 0.0,
+        screenshot_bytes: int = 0,
+        failing_steps: Iterable[int] = (),
+    ):
+        self.page_source = page_source
+        self.navigate_latency = navigate_latency
+        self.step_latency = step_latency
+        self.screenshot_bytes = screenshot_bytes
+        # One shared payload, so the stub itself adds little to the memory measured by benchmarks
+        self.screenshot = base64.b64encode(b"\0" * screenshot_bytes).decode("ascii") if screenshot_bytes else ""
+        self.failing_steps = set(failing_steps)
+        self.requests: List[str] = []
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> "StubPlaywrightService":
+        self.server = await start_http_server(self.handle_request, host, port)
+        return self
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def __aenter__(self) -> "StubPlaywrightService":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.stop()
+
+    def step_record(self, number: int, step: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the result record of one executed step (numbered from 1)."""
+        record = {"type": "step", "step": number, "action": step.get("action"), "selector": step.get("selector")}
+        if number in self.failing_steps:
+            record.update(status="error", error=f"Timeout waiting for selector {step.get('selector')}")
+            return record
+        record["status"] = "success"
+        if step.get("action") == "check":
+            record["actual"] = step.get("value")
+        if step.get("action") == "screenshot" and self.screenshot:
+            record["screenshot"] = self.screenshot
+        return record
+
+    def _steps(self, request: HttpRequest) -> List[Dict[str, Any]]:
+        plan = request.json()
+        try:
+            return list(plan["test_plan"]["steps"])
+        except (KeyError, TypeError):
+            raise HttpError(422, "Request must contain test_plan.steps")
+
+    async def handle_request(self, request: HttpRequest, writer: asyncio.StreamWriter) -> None:
+        self.requests.append(request.path)
+        if request.method != "POST":
+            raise HttpError(405, f"Method {request.method} not allowed")
+
+        if request.path == "/navigate":
+            await asyncio.sleep(self.navigate_latency)
+            await send_response(writer, 200, self.page_source.encode("utf-8"), "text/html")
+            return
+
+        if request.path == "/execute":
+            records = []
+            for number, step in enumerate(self._steps(request), start=1):
+                await asyncio.sleep(self.step_latency)
+                records.append(self.step_record(number, step))
+            success = all(record["status"] == "success" for record in records)
+            await send_json(writer, 200, {"success": success, "results": records})
+            return
+
+        if request.path == "/execute/stream":
+            steps = self._steps(request)
+            await start_chunked(writer)
+            success = True
+            for number, step in enumerate(steps, start=1):
+                await asyncio.sleep(self.step_latency)
+                record = self.step_record(number, step)
+                success = success and record["status"] == "success"
+                await send_json_line(writer, record)
+            await send_json_line(writer, {"type": "summary", "success": success, "total_steps": len(steps)})
+            await end_chunked(writer)
+            return
+
+        raise HttpError(404, f"Unknown path {request.path}")
@@ -0,0 +1,154 @@
+"""
+Test suite manifests for running many URL/description jobs in one process.
+
+A manifest is either a YAML file containing a list of jobs (or a mapping with
+a `jobs` list and optional `defaults`), or a JSONL file with one job per line:
+
+    defaults:
+      timeout: 120
+    jobs:
+      - id: calculator-addition
+        url: https://ale-sanchez-g.github.io/featureflags/
+        description: Calculate 1+1 and check the result is 2
+
+Each job needs a `url` and a `description`; `id` defaults to its position in
+the manifest and names the job's output subdirectory.
+"""
+
+import json
+import os
+import re
+from typing import Any, Dict, List
+
+import yaml
+
+# Per-job settings that may override the suite-wide command line options
+JOB_OPTION_KEYS = (
+    "playwright_url",
+    "timeout",
+    "max_retries",
+    "llm_provider",
+    "inventory_max_bytes",
+    "inventory_max_tokens",
+    "playwright_workers",
+    "max_repairs",
+    "selector_check",
+    "stream_results",
+    "fail_fast",
+    "retry_budget",
+    "metrics_format",
+    "plan_optimizations",
+    "reset_texts",
+)
+
+_UNSAFE_ID_CHARACTERS = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def make_job_id(raw_id: Any, index: int) -> str:
+    """Build a filesystem safe job id.
+
+    Args:
+        raw_id: Job id from the manifest, if any
+        index: Position of the job in the manifest
+
+    Returns:
+        A job id usable as an output subdirectory name
+    """
+    job_id = _UNSAFE_ID_CHARACTERS.sub("-", str(raw_id)).strip(".-") if raw_id else ""
+    return job_id or f"job-{index:03d}"
+
+
+def normalize_jobs(raw_jobs: List[Any], defaults: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Validate manifest jobs and apply suite defaults.
+
+    Args:
+        raw_jobs: Job entries read from the manifest
+        defaults: Settings applied to every job unless overridden
+
+    Returns:
+        The normalized jobs
+
+    Raises:
+        ValueError: If a job is malformed or job ids are not unique
+    """
+    jobs: List[Dict[str, Any]] = []
+    seen_ids = set()
+    for index, raw_job in enumerate(raw_jobs, start=1):
+        if not isinstance(raw_job, dict):
+            raise ValueError(f"Job {index} must be a mapping")
+        job = {**defaults, **raw_job}
+        for key in ("url", "description"):
+            if not job.get(key):
+                raise ValueError(f"Job {index} is missing '{key}'")
+
+        job_id = make_job_id(job.get("id"), index)
+        if job_id in seen_ids:
+            raise ValueError(f"Duplicate job id '{job_id}'")
+        seen_ids.add(job_id)
+
+        unknown = set(job) - {"id", "url", "description", *JOB_OPTION_KEYS}
+        if unknown:
+            raise ValueError(f"Job '{job_id}' has unknown settings: {', '.join(sorted(unknown))}")
+
+        job["id"] = job_id
+        jobs.append(job)
+    return jobs
+
+
+def load_suite_manifest(path: str) -> List[Dict[str, Any]]:
+    """Load the jobs of a YAML or JSONL suite manifest.
+
+    Args:
+        path: Path of the manifest file
+
+    Returns:
+        The normalized jobs
+
+    Raises:
+        ValueError: If the manifest cannot be parsed or is malformed
+    """
+    with open(path) as f:
+        if path.endswith(".jsonl"):
+            try:
+                raw_jobs = [json.loads(line) for line in f if line.strip()]
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSONL manifest: {e}")
+            return normalize_jobs(raw_jobs, {})
+
+        try:
+            manifest = yaml.safe_load(f)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML manifest: {e}")
+
+    if isinstance(manifest, list):
+        return normalize_jobs(manifest, {})
+    if isinstance(manifest, dict) and isinstance(manifest.get("jobs"), list):
+        return normalize_jobs(manifest["jobs"], manifest.get("defaults") or {})
+    raise ValueError("Manifest must be a list of jobs or a mapping with a 'jobs' list")
+
+
+def summarize_suite(job_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Summarize the outcome of a suite run.
+
+    Args:
+        job_results: Per-job entries with `id`, `output_dir` and `result`
+
+    Returns:
+        A summary with counts and the status of every job
+    """
+    jobs = []
+    for job_result in job_results:
+        error = job_result["result"].get("error")
+        jobs.append({
+            "id": job_result["id"],
+            "status": "error" if error else "completed",
+            "output_dir": job_result["output_dir"],
+            "error": error,
+        })
+    failed = sum(1 for job in jobs if job["status"] == "error")
+    return {"total": len(jobs), "completed": len(jobs) - failed, "errors": failed, "jobs": jobs}
+
+
+def job_output_dir(output_dir: str, job_id: str) -> str:
+    """Return the output subdirectory of a suite job."""
+    return os.path.join(output_dir, job_id)
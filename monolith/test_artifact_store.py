@@ -0,0 +1,105 @@
+import base64
+import os
+from artifact_store import ARTIFACT_DIRNAME, CHUNK_CHARS, ArtifactStore
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 400
+
+def read(store, reference):
+    with open(store.path(reference), "rb") as f:
+        return f.read()
+
+def test_store_base64_payload(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    payload = base64.b64encode(PNG).decode("ascii")
+
+    # Call the function
+    reference = store.store("screenshot", payload)
+
+    # Assertions
+    assert reference["artifact"].startswith(os.path.join(ARTIFACT_DIRNAME, "screenshot-"))
+    assert reference["artifact"].endswith(".png")
+    assert reference["bytes"] == len(PNG)
+    assert read(store, reference) == PNG
+    assert [name for name in os.listdir(tmp_path / ARTIFACT_DIRNAME) if name.endswith(".tmp")] == []
+
+def test_store_payload_larger_than_a_chunk(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    data = os.urandom(CHUNK_CHARS * 2)
+
+    # Call the function
+    reference = store.store("trace", base64.b64encode(data).decode("ascii"))
+
+    # Assertions
+    assert reference["artifact"].endswith(".bin")
+    assert read(store, reference) == data
+
+def test_store_data_url_and_text(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+
+    # Call the function
+    image = store.store("screenshot", "data:image/jpeg;base64," + base64.b64encode(b"\xff\xd8\xff" + b"\0" * 2000).decode("ascii"))
+    text = store.store("html", "<div>Result</div>\n" * 100)
+
+    # Assertions
+    assert image["artifact"].endswith(".jpg")
+    assert image["bytes"] == 2003
+    assert text["artifact"].endswith(".txt")
+    assert read(store, text) == ("<div>Result</div>\n" * 100).encode("utf-8")
+
+def test_store_deduplicates(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    payload = base64.b64encode(PNG).decode("ascii")
+
+    # Call the function twice with the same payload
+    first = store.store("screenshot", payload)
+    second = store.store("screenshot", payload)
+
+    # Assertions
+    assert first == second
+    assert store.stats() == {"stored": 1, "deduplicated": 1, "bytes_stored": len(PNG)}
+    assert len(os.listdir(tmp_path / ARTIFACT_DIRNAME)) == 1
+
+def test_externalize_results(tmp_path):
+    store = ArtifactStore(str(tmp_path), min_bytes=100)
+    payload = base64.b64encode(PNG).decode("ascii")
+    results = {"success": True, "video": payload, "results": [
+        {"status": "success", "action": "click"},
+        {"status": "success", "action": "screenshot", "screenshot": payload},
+        "not a record",
+    ]}
+
+    # Call the function
+    externalized = store.externalize_results(results)
+
+    # Assertions
+    assert externalized["success"] is True
+    assert externalized["results"][0] == {"status": "success", "action": "click"}
+    assert externalized["results"][1]["screenshot"]["bytes"] == len(PNG)
+    assert externalized["video"]["sha256"] == externalized["results"][1]["screenshot"]["sha256"]
+    assert results["results"][1]["screenshot"] == payload
+    assert store.externalize_results(["not", "a", "dict"]) == ["not", "a", "dict"]
+    assert len(os.listdir(tmp_path / ARTIFACT_DIRNAME)) == 2
+
+def test_externalize_record_keeps_diagnostic_text(tmp_path):
+    store = ArtifactStore(str(tmp_path), min_bytes=100)
+    record = {"status": "error", "error": "Timeout" * 100, "message": "A" * 400, "description": "Click the button " * 20, "output": "QUJD" * 100}
+
+    # Call the function
+    externalized = store.externalize_record(record)
+
+    # Assertions
+    assert externalized["error"] == record["error"]
+    assert externalized["message"] == record["message"]
+    assert externalized["description"] == record["description"]
+    assert read(store, externalized["output"]) == b"ABC" * 100
+    assert store.stats()["stored"] == 1
+
+def test_store_plain_text_is_not_decoded(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+
+    # Call the function with diagnostic text that happens to be valid base64
+    reference = store.store("error", "ABCD" * 300)
+
+    # Assertions
+    assert reference["artifact"].endswith(".txt")
+    assert read(store, reference) == b"ABCD" * 300
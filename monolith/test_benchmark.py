@@ -0,0 +1,52 @@
+import pytest
+
+from benchmark import compare_benchmarks, make_page_source, make_test_plan, run_benchmark
+
+
+def test_make_page_source_size():
+    page_source = make_page_source(50000)
+
+    assert 50000 <= len(page_source) < 51000
+    assert '<button id="one">1</button>' in page_source
+
+def test_make_test_plan_length():
+    plan = make_test_plan("http://example.com", 12)
+
+    steps = plan["test_plan"]["steps"]
+    assert len(steps) == 12
+    assert steps[0] == {"action": "navigate", "value": "http://example.com"}
+
+def test_compare_benchmarks():
+    baseline = {
+        "scenarios": {"page=1000,steps=5": {"stages": {"total": {"count": 1, "p50_ms": 10.0, "p90_ms": 12.0}}, "peak_memory_bytes": 1000}},
+        "throughput": {"concurrency=4": {"jobs_per_second": 20.0}},
+    }
+    current = {
+        "scenarios": {"page=1000,steps=5": {"stages": {"total": {"count": 1, "p50_ms": 15.0, "p90_ms": 12.5}}, "peak_memory_bytes": 500}},
+        "throughput": {"concurrency=4": {"jobs_per_second": 10.0}},
+    }
+
+    # Call the function
+    comparison = {entry["metric"]: entry["status"] for entry in compare_benchmarks(baseline, current)}
+
+    # Assertions
+    assert comparison["page=1000,steps=5 total p50_ms"] == "regressed"
+    assert comparison["page=1000,steps=5 total p90_ms"] == "unchanged"
+    assert comparison["page=1000,steps=5 peak_memory_bytes"] == "improved"
+    assert comparison["concurrency=4 jobs_per_second"] == "regressed"
+
+@pytest.mark.asyncio
+async def test_run_benchmark():
+    # Call the function with a tiny grid
+    results = await run_benchmark(page_sizes=[2000], plan_lengths=[8], concurrency_levels=[2], iterations=2, failing_steps=[3])
+
+    # Assertions
+    scenario = results["scenarios"]["page=2000,steps=8"]
+    assert scenario["stages"]["total"]["count"] == 2
+    assert scenario["stages"]["execute"]["p50_ms"] > 0
+    assert scenario["stages"]["analysis"]["p50_ms"] > 0
+    failing = results["scenarios"]["page=2000,steps=8,failing=3"]
+    assert failing["failing_steps"] == [3]
+    assert failing["stages"]["analysis"]["p50_ms"] > 0
+    assert scenario["peak_memory_bytes"] > 0
+    assert results["throughput"]["concurrency=2"]["jobs"] == 4
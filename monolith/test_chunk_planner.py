@@ -0,0 +1,71 @@
+from chunk_planner import BM25, ChunkSelection, chunk_lines, merge_chunk_picks, select_chunks, tokenize
+
+# Inventory lines of a long page with the login form at the very end
+LINES = [f'- a:has-text("Article {i}") [href=/articles/{i}]' for i in range(300)] + [
+    '- input#username [type=text] [placeholder=Username]',
+    '- input#password [type=password] [placeholder=Password]',
+    '- button:has-text("Login")',
+]
+
+def test_tokenize():
+    # Call the function
+    tokens = tokenize("Click the Login button and check 1 + 2 = 3")
+
+    # Assertions
+    assert tokens == ["login", "button", "1", "+", "2", "=", "3"]
+
+def test_chunk_lines():
+    # Call the function
+    chunks = chunk_lines(["a" * 9, "b" * 9, "c" * 9, "d" * 30], max_chunk_bytes=20)
+
+    # Assertions
+    assert chunks == [["a" * 9, "b" * 9], ["c" * 9], ["d" * 30]]
+
+def test_bm25_ranks_matching_documents_first():
+    documents = [tokenize("article news"), tokenize("login username password"), tokenize("login footer")]
+
+    # Call the function
+    scores = BM25(documents).scores(tokenize("login with username"))
+
+    # Assertions
+    assert scores[1] > scores[2] > scores[0] == 0
+
+def test_select_chunks_within_budget():
+    # Call the function with a budget that fits everything
+    selection = select_chunks(LINES[-3:], "login", max_bytes=10000)
+
+    # Assertions
+    assert not selection.chunked
+    assert selection.text == "\n".join(LINES[-3:])
+
+def test_select_chunks_picks_relevant_chunks():
+    # Call the function
+    selection = select_chunks(LINES, "Log in with username and password", max_bytes=2000, chunk_tokens=100)
+
+    # Assertions
+    assert selection.chunked
+    assert selection.ranked[0] == len(selection.chunks) - 1
+    assert "input#username" in selection.text
+    assert 'button:has-text("Login")' in selection.text
+    assert "less relevant elements omitted" in selection.text
+    assert len(selection.text.encode("utf-8")) <= 2000 + 60
+    assert selection.selected == sorted(selection.selected)
+    assert selection.coverage == 1.0
+
+def test_select_chunks_coverage():
+    # Call the function with terms spread over more chunks than the budget holds
+    selection = select_chunks(LINES, "open article 7 and article 250 then login", max_bytes=400, chunk_tokens=100)
+
+    # Assertions
+    assert selection.chunked
+    assert selection.coverage < 1.0
+
+def test_merge_chunk_picks():
+    selection = ChunkSelection(text="fallback", chunks=[["a", "b"], ["c"]], selected=[0], ranked=[1, 0], budget=4)
+
+    # Call the function
+    merged = merge_chunk_picks(selection, {1: ["c"], 0: ["b", "a"]})
+
+    # Assertions
+    assert merged == "b\na"
+    assert merge_chunk_picks(selection, {0: [], 1: []}) == "fallback"
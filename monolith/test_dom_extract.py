@@ -0,0 +1,67 @@
+from dom_extract import ElementExtractor, extract_element_inventory, candidate_selectors
+
+PAGE_SOURCE = """<html><head><title>Calc</title><script>var tpl = '<button>hidden</button>';</script>
+<style>.display { color: red; }</style></head><body>
+<svg><path d="M0 0"/><text>icon</text></svg>
+<div class="calculator"><div class="display">0</div>
+<button>1</button><button>1</button><button onclick="add()">+</button>
+<input id="email" name="email" type="email" placeholder="Email">
+<a href="/services">Services</a><p>Plain paragraph</p></div></body></html>"""
+
+def test_extract_element_inventory():
+    # Call the function
+    inventory = extract_element_inventory(PAGE_SOURCE)
+
+    # Assertions
+    assert 'button:has-text("1")' in inventory.text
+    assert "#email" in inventory.text
+    assert "div.display" in inventory.text
+    assert 'a:has-text("Services")' in inventory.text
+    assert "hidden" not in inventory.text
+    assert "icon" not in inventory.text
+    assert "Plain paragraph" not in inventory.text
+
+def test_extract_element_inventory_deduplicates():
+    # Call the function
+    inventory = extract_element_inventory(PAGE_SOURCE)
+
+    # Assertions
+    buttons = [e for e in inventory.elements if e["selectors"] == ['button:has-text("1")']]
+    assert len(buttons) == 1
+    assert buttons[0]["count"] == 2
+    assert inventory.duplicates == 1
+
+def test_extract_element_inventory_budget():
+    # Build a large page with many distinct buttons
+    page_source = "<body>" + "".join(f"<button>Item {i}</button>" for i in range(1000)) + "</body>"
+
+    # Call the function with a small budget
+    inventory = extract_element_inventory(page_source, max_bytes=10000, max_tokens=500, chunk_size=97)
+
+    # Assertions
+    shown = inventory.text.count("button:has-text")
+    assert shown < 1000
+    assert inventory.omitted == 1000 - shown
+    assert len(inventory.text.rsplit("\n", 1)[0]) <= 500 * 4
+    assert "more elements omitted" in inventory.text
+    assert inventory.stats()["compression_ratio"] > 1
+
+def test_candidate_selectors():
+    # Call the function
+    selectors = candidate_selectors({"tag": "input", "attrs": {"id": "my id", "name": "q"}, "text": ""})
+
+    # Assertions
+    assert selectors == ['[id="my id"]', 'input[name="q"]']
+
+def test_extract_element_inventory_bounds_text():
+    # Build deeply nested collected elements around a long text
+    page_source = '<div id="a"><div id="b"><div id="c">' + "word " * 10000 + "</div></div></div>"
+    extractor = ElementExtractor(max_text_length=20)
+
+    # Call the function
+    extractor.feed(page_source)
+
+    # Assertions
+    assert all(len("".join(entry[2])) <= 40 for entry in extractor._open)
+    extractor.close()
+    assert [element["text"] for element in extractor.elements] == ["word word word word"] * 3
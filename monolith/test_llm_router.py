@@ -0,0 +1,150 @@
+import asyncio
+import pytest
+from llm_router import LLMRouter, LLMRouterError, ProviderHealth, parse_provider_spec
+
+class FakeLLM:
+    """Local stand-in for a provider LLM with a fixed delay and optional failures."""
+
+    def __init__(self, response, delay=0.0, fail=False):
+        self.response = response
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = False
+
+    async def generate_str(self, message, request_params=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.fail:
+            raise RuntimeError("Overloaded")
+        return self.response
+
+def test_parse_provider_spec():
+    # Assertions
+    assert parse_provider_spec("anthropic") == {"anthropic": 0.0}
+    assert parse_provider_spec("OpenAI=0.15, anthropic=3") == {"openai": 0.15, "anthropic": 3.0}
+    with pytest.raises(LLMRouterError):
+        parse_provider_spec("anthropic,gemini")
+    with pytest.raises(LLMRouterError):
+        parse_provider_spec("anthropic=cheap")
+    with pytest.raises(LLMRouterError):
+        parse_provider_spec(" , ")
+
+def test_rank_by_latency_and_cost():
+    health = ProviderHealth(cost_tolerance=0.25)
+    health.get("anthropic").record_success(1.0, 100)
+    health.get("openai").record_success(0.9, 100)
+
+    # Call the function with similar, then very different latencies
+    cheap_first = health.rank({"anthropic": 0.0, "openai": 3.0})
+    health.get("anthropic").record_success(3.0, 100)
+    fast_first = health.rank({"anthropic": 0.0, "openai": 3.0})
+
+    # Assertions
+    assert cheap_first == ["anthropic", "openai"]
+    assert fast_first == ["openai", "anthropic"]
+
+def test_rank_unhealthy_last():
+    health = ProviderHealth(max_error_rate=0.5, recovery_time=0.05)
+    health.get("anthropic").record_failure()
+    health.get("openai").record_success(5.0, 100)
+
+    # Assertions
+    assert health.rank({"anthropic": 0.0, "openai": 0.0}) == ["openai", "anthropic"]
+    assert health.rank({"anthropic": 0.0}) == ["anthropic"]
+
+@pytest.mark.asyncio
+async def test_rank_unhealthy_recovers():
+    health = ProviderHealth(max_error_rate=0.5, recovery_time=0.05)
+    health.get("anthropic").record_failure()
+
+    # Wait for the provider to recover
+    await asyncio.sleep(0.1)
+
+    # Assertions
+    assert health.is_healthy("anthropic")
+    assert health.rank({"openai": 0.0, "anthropic": 0.0}) == ["openai", "anthropic"]
+
+@pytest.mark.asyncio
+async def test_router_prefers_fastest_provider():
+    health = ProviderHealth()
+    slow, fast = FakeLLM("slow", delay=0.05), FakeLLM("fast")
+    router = LLMRouter({"anthropic": slow, "openai": fast}, {"anthropic": 0.0, "openai": 0.0}, health)
+    health.get("anthropic").record_success(0.05, 100)
+    health.get("openai").record_success(0.001, 100)
+
+    # Call the function
+    response = await router.generate_str("Plan the test")
+
+    # Assertions
+    assert response == "fast"
+    assert slow.calls == 0
+    assert router.last_provider == "openai"
+    assert router.stats()["served"] == {"openai": 1}
+
+@pytest.mark.asyncio
+async def test_router_fails_over():
+    health = ProviderHealth()
+    failing, backup = FakeLLM("first", fail=True), FakeLLM("backup")
+    router = LLMRouter({"anthropic": failing, "openai": backup}, {"anthropic": 3.0, "openai": 0.0}, health)
+
+    # Call the function
+    response = await router.generate_str("Plan the test")
+
+    # Assertions
+    assert response == "backup"
+    stats = router.stats()
+    assert stats["failovers"] == 1
+    assert stats["providers"]["anthropic"]["errors"] == 1
+    assert stats["providers"]["openai"]["calls"] == 1
+    assert stats["providers"]["openai"]["estimated_cost"] == 0.0
+    assert health.rank(router.costs) == ["openai", "anthropic"]
+
+@pytest.mark.asyncio
+async def test_router_raises_when_all_providers_fail():
+    router = LLMRouter(
+        {"anthropic": FakeLLM("a", fail=True), "openai": FakeLLM("b", fail=True)},
+        {"anthropic": 0.0, "openai": 0.0},
+        ProviderHealth()
+    )
+
+    # Call the function
+    with pytest.raises(RuntimeError, match="Overloaded"):
+        await router.generate_str("Plan the test")
+
+    # Assertions
+    assert router.failovers == 1
+
+@pytest.mark.asyncio
+async def test_router_hedges_slow_call():
+    health = ProviderHealth(hedge_after=0.05)
+    slow, fast = FakeLLM("slow", delay=5.0), FakeLLM("fast")
+    router = LLMRouter({"anthropic": slow, "openai": fast}, {"anthropic": 0.0, "openai": 0.0}, health)
+
+    # Call the function
+    response = await asyncio.wait_for(router.generate_str("Plan the test"), timeout=1.0)
+    await asyncio.sleep(0)
+
+    # Assertions
+    assert response == "fast"
+    assert router.hedges == 1
+    assert slow.cancelled
+    assert health.get("anthropic").cancelled == 1
+    assert health.get("anthropic").errors == 0
+
+@pytest.mark.asyncio
+async def test_router_without_hedging_waits():
+    slow, fast = FakeLLM("slow", delay=0.1), FakeLLM("fast")
+    router = LLMRouter({"anthropic": slow, "openai": fast}, {"anthropic": 0.0, "openai": 0.0}, ProviderHealth())
+
+    # Call the function
+    response = await router.generate_str("Plan the test")
+
+    # Assertions
+    assert response == "slow"
+    assert fast.calls == 0
+    assert router.hedges == 0
@@ -1,7 +1,27 @@
+import asyncio
+import base64
+import contextlib
+import json
+import os
 import pytest
+import threading
 import httpx
+from mcp_agent.workflows.llm.augmented_llm_anthropic import AnthropicAugmentedLLM
 from unittest.mock import AsyncMock, MagicMock
-from main import fetch_page_source, generate_test_plan, execute_test_plan, ExecutionError
+from artifact_store import ArtifactStore
+from dom_extract import extract_element_inventory
+from plan_cache import PlanCache
+from report import build_results_report, failure_context
+from snapshot_store import SnapshotStore
+from run_history import RunHistory
+from run_output import is_run_id
+from retry_policy import CircuitBreakerRegistry, RetryController, RetryPolicy
+from stub_playwright import StubPlaywrightService
+from main import (
+    check_test_plan_selectors, fetch_page_source, extract_page_elements, select_page_elements, generate_test_plan, generate_chunked_test_plan, get_cached_test_plan, execute_test_plan,
+    analyze_results, execute_sharded_test_plan, execute_test_plan_streaming, gather_or_cancel, get_llm_instance, get_llm_model_name, repair_failed_steps, repair_test_plan, run_test_job, run_test_on_website, replay_test_plan, load_test_plans, RunContext, ExecutionError
+)
+import main
 
 @pytest.mark.asyncio
 async def test_fetch_page_source():
@@ -52,6 +72,47 @@ async def test_generate_test_plan_invalid_json():
     with pytest.raises(ExecutionError, match="Failed to decode JSON from LLM response"):
         await generate_test_plan(mock_llm, "http://example.com", "<html>Mock Page Source</html>", "Test description", MagicMock())
 
+class StreamingLLM:
+    """LLM double streaming a response in fixed chunks."""
+
+    def __init__(self, response, chunk_size=8):
+        self.chunks = [response[start:start + chunk_size] for start in range(0, len(response), chunk_size)]
+        self.streamed = 0
+        self.closed = False
+
+    async def generate_stream(self, message):
+        try:
+            for chunk in self.chunks:
+                self.streamed += 1
+                yield chunk
+        finally:
+            self.closed = True
+
+@pytest.mark.asyncio
+async def test_generate_test_plan_streamed():
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": [{"action": "click", "selector": "#go"}]}}
+    llm = StreamingLLM("```json\n" + json.dumps(plan) + "\n```\nThis plan clicks the Go button." + " More prose." * 20)
+    steps = []
+
+    # Call the function
+    result = await generate_test_plan(llm, "http://example.com", "- #go", "Click Go", MagicMock(), on_step=steps.append)
+
+    # Assertions
+    assert result == plan
+    assert steps == plan["test_plan"]["steps"]
+    assert llm.closed
+    assert llm.streamed < len(llm.chunks)
+
+@pytest.mark.asyncio
+async def test_generate_test_plan_streamed_off_schema():
+    llm = StreamingLLM('{"url": "http://example.com", "test_plan": {"steps": [{"action": "hover", "selector": "#go"}, ' + "{}, " * 100 + "]}}")
+
+    # Call the function and expect an exception
+    with pytest.raises(ExecutionError, match="unknown action"):
+        await generate_test_plan(llm, "http://example.com", "- #go", "Hover Go", MagicMock())
+    assert llm.closed
+    assert llm.streamed < len(llm.chunks) // 2
+
 @pytest.mark.asyncio
 async def test_execute_test_plan():
     # Mock the HTTP client
@@ -96,4 +157,751 @@ async def test_execute_test_plan_failure():
 
     # Call the function and expect an exception
     with pytest.raises(ExecutionError, match="Failed after 1 retries: Error"):
-        await execute_test_plan(mock_client, "http://mock-playwright", {"test_plan": {}}, 1, 300, MagicMock())
\ No newline at end of file
+        await execute_test_plan(mock_client, "http://mock-playwright", {"test_plan": {}}, 1, 300, MagicMock())
+
+@pytest.mark.asyncio
+async def test_execute_test_plan_circuit_open():
+    # Mock the HTTP client, the service is down
+    mock_client = AsyncMock(httpx.AsyncClient)
+    mock_client.post.side_effect = httpx.ConnectError("Connection refused")
+    retry_controller = RetryController(RetryPolicy(base_delay=0), breakers=CircuitBreakerRegistry(failure_threshold=2))
+
+    # Call the function and expect an exception
+    with pytest.raises(ExecutionError, match="Connection refused"):
+        await execute_test_plan(mock_client, "http://mock-playwright", {"test_plan": {}}, 3, 300, MagicMock(), retry_controller)
+
+    # Later calls fail fast without contacting the service
+    with pytest.raises(ExecutionError, match="circuit open"):
+        await execute_test_plan(mock_client, "http://mock-playwright", {"test_plan": {}}, 3, 300, MagicMock(), retry_controller)
+    assert mock_client.post.call_count == 2
+
+def test_extract_page_elements():
+    page_source = "<html><body><script>var x = 1;</script><button id='go'>Go</button></body></html>"
+
+    # Call the function
+    result = extract_page_elements(page_source, 16000, None, MagicMock())
+
+    # Assertions
+    assert "#go" in result
+    assert "var x" not in result
+
+def test_extract_page_elements_disabled():
+    page_source = "<html><body><button id='go'>Go</button></body></html>"
+
+    # Call the function with extraction disabled
+    result = extract_page_elements(page_source, 0, None, MagicMock())
+
+    # Assertions
+    assert result == page_source
+
+def test_select_page_elements_ranks_chunks():
+    page_source = "<body>" + "".join(f"<a href='/news/{i}'>News {i}</a>" for i in range(400)) + "<input id='search' placeholder='Search'></body>"
+
+    # Call the function with a budget far below the inventory size
+    selection = select_page_elements(page_source, 2000, None, MagicMock(), query="Search for shoes")
+
+    # Assertions
+    assert selection.chunked
+    assert "#search" in selection.text
+    assert "News 0" not in selection.text
+
+@pytest.mark.asyncio
+async def test_generate_chunked_test_plan_map_reduce():
+    page_source = "<body>" + "".join(f"<a href='/news/{i}'>News {i}</a>" for i in range(400)) + "<input id='search' placeholder='Search'></body>"
+    selection = select_page_elements(page_source, 1000, None, MagicMock(), query="Search for News 3")
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": []}}
+    mock_llm = MagicMock()
+    mock_llm.generate_str = AsyncMock(side_effect=lambda message, **kwargs: (
+        '{"elements": [0]}' if "request_params" in kwargs else json.dumps(plan)
+    ))
+
+    # Call the function
+    result = await generate_chunked_test_plan(mock_llm, "http://example.com", selection, "Search for News 3", MagicMock())
+
+    # Assertions
+    assert result == plan
+    assert selection.coverage < 1.0
+    map_calls = [call for call in mock_llm.generate_str.call_args_list if "request_params" in call.kwargs]
+    assert len(map_calls) == min(len(selection.chunks), 4)
+    assert all(call.kwargs["request_params"].use_history is False for call in map_calls)
+    plan_message = mock_llm.generate_str.call_args_list[-1].kwargs["message"]
+    assert selection.chunks[selection.ranked[0]][0] in plan_message
+    assert "less relevant elements omitted" not in plan_message
+
+@pytest.mark.asyncio
+async def test_get_cached_test_plan_hit(tmp_path):
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": []}}
+    plan_cache = PlanCache(str(tmp_path))
+    plan_cache.put("key", plan)
+    mock_llm = MagicMock()
+    mock_llm.generate_str = AsyncMock()
+
+    # Call the function
+    result = await get_cached_test_plan(mock_llm, plan_cache, "key", "http://example.com", "", "Test description", MagicMock())
+
+    # Assertions
+    assert result == plan
+    mock_llm.generate_str.assert_not_called()
+    assert plan_cache.hits == 1
+
+@pytest.mark.asyncio
+async def test_run_test_job(tmp_path):
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": []}}
+
+    # Mock the HTTP client, agent and LLM
+    mock_client = AsyncMock(httpx.AsyncClient)
+    navigate_response = MagicMock(status_code=200, text="<button id='go'>Go</button>")
+    execute_response = MagicMock(status_code=200)
+    execute_response.json.return_value = {"result": "success"}
+    mock_client.post.side_effect = [navigate_response, execute_response]
+    mock_llm = MagicMock()
+    mock_llm.generate_str = AsyncMock(side_effect=[json.dumps(plan), "Analysis"])
+    mock_agent = MagicMock()
+    mock_agent.attach_llm = AsyncMock(return_value=mock_llm)
+    run_context = RunContext(agent=mock_agent, client=mock_client, logger=MagicMock())
+
+    # Call the function
+    result = await run_test_job(run_context, "http://example.com", "Click go", output_dir=str(tmp_path))
+
+    # Assertions
+    retries = result.pop("retries")
+    metrics = result.pop("metrics")
+    analysis = result.pop("analysis")
+    run_id = result.pop("run_id")
+    assert result == {"output_dir": str(tmp_path / run_id), "test_plan": plan, "results": {"result": "success"}}
+    assert retries["retries"] == 0
+    assert {"job", "fetch", "plan", "execute", "analysis"} <= set(metrics["stages"])
+    assert "- **Outcome:** Passed" in analysis
+    assert metrics["llm"]["calls"] == 1
+    assert (tmp_path / run_id / "plan.json").exists()
+    assert (tmp_path / run_id / "test_analysis.md").read_text() == analysis
+    assert "#go" in mock_llm.generate_str.call_args_list[0].kwargs["message"]
+
+@pytest.mark.asyncio
+async def test_run_test_job_prunes_run_directories(tmp_path):
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": []}}
+    (tmp_path / "20200101T120000-00000001").mkdir()
+
+    # Mock the HTTP client, agent and LLM, no run history is configured
+    async def post(url, **kwargs):
+        response = MagicMock(status_code=200, text="<button id='go'>Go</button>")
+        response.json.return_value = {"result": "success"}
+        return response
+    mock_client = AsyncMock(httpx.AsyncClient)
+    mock_client.post.side_effect = post
+    mock_llm = MagicMock()
+    mock_llm.generate_str = AsyncMock(return_value=json.dumps(plan))
+    mock_agent = MagicMock()
+    mock_agent.attach_llm = AsyncMock(return_value=mock_llm)
+    run_context = RunContext(agent=mock_agent, client=mock_client, logger=MagicMock(), output_max_runs=2)
+
+    # Call the function three times
+    results = [await run_test_job(run_context, "http://example.com", "Click go", output_dir=str(tmp_path)) for _ in range(3)]
+
+    # Assertions, the expired and the oldest run are removed
+    assert sorted(os.listdir(tmp_path)) == sorted(result["run_id"] for result in results[1:])
+
+@pytest.mark.asyncio
+async def test_run_test_job_checks_selectors_with_extracted_index(tmp_path, monkeypatch):
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": [{"action": "click", "selector": "#go-button"}]}}
+
+    # Mock the HTTP client, agent and LLM
+    async def post(url, **kwargs):
+        response = MagicMock(status_code=200, text="<button id='go-btn'>Go</button>")
+        response.json.return_value = {"results": [{"status": "success"}]}
+        return response
+    mock_client = AsyncMock(httpx.AsyncClient)
+    mock_client.post.side_effect = post
+    mock_llm = MagicMock()
+    mock_llm.generate_str = AsyncMock(return_value=json.dumps(plan))
+    mock_agent = MagicMock()
+    mock_agent.attach_llm = AsyncMock(return_value=mock_llm)
+    run_context = RunContext(agent=mock_agent, client=mock_client, logger=MagicMock())
+
+    # Call the function, the page is not parsed again for the selector check
+    monkeypatch.setattr("selector_index.parse_page_index", None)
+    result = await run_test_job(run_context, "http://example.com", "Click go", output_dir=str(tmp_path), selector_check="fix")
+
+    # Assertions
+    assert result["test_plan"]["test_plan"]["steps"] == [{"action": "click", "selector": "#go-btn"}]
+
+@pytest.mark.asyncio
+async def test_run_test_job_extracts_off_the_event_loop(tmp_path, monkeypatch):
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": []}}
+
+    # Mock the HTTP client, agent and LLM
+    async def post(url, **kwargs):
+        response = MagicMock(status_code=200, text="<button id='go'>Go</button>")
+        response.json.return_value = {"result": "success"}
+        return response
+    mock_client = AsyncMock(httpx.AsyncClient)
+    mock_client.post.side_effect = post
+    mock_llm = MagicMock()
+    mock_llm.generate_str = AsyncMock(return_value=json.dumps(plan))
+    mock_agent = MagicMock()
+    mock_agent.attach_llm = AsyncMock(return_value=mock_llm)
+    run_context = RunContext(agent=mock_agent, client=mock_client, logger=MagicMock())
+
+    # Record the thread the page is parsed on
+    threads = []
+    def extract(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return extract_element_inventory(*args, **kwargs)
+    monkeypatch.setattr(main, "extract_element_inventory", extract)
+
+    # Call the function
+    await run_test_job(run_context, "http://example.com", "Click go", output_dir=str(tmp_path))
+
+    # Assertions
+    assert threads and threading.main_thread() not in threads
+
+@pytest.mark.asyncio
+async def test_run_test_job_optimizes_plan(tmp_path):
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": [
+        {"action": "navigate", "value": "http://example.com"},
+        {"action": "wait", "value": "2000"},
+        {"action": "waitForLoadState"},
+        {"action": "click", "selector": "#go"},
+        {"action": "screenshot"},
+        {"action": "screenshot"},
+    ]}}
+
+    # Mock the HTTP client, agent and LLM
+    mock_client = AsyncMock(httpx.AsyncClient)
+    navigate_response = MagicMock(status_code=200, text="<button id='go'>Go</button>")
+    execute_response = MagicMock(status_code=200)
+    execute_response.json.return_value = {"success": True, "results": [{"status": "success"}] * 4}
+    mock_client.post.side_effect = [navigate_response, execute_response]
+    mock_llm = MagicMock()
+    mock_llm.generate_str = AsyncMock(return_value=json.dumps(plan))
+    mock_agent = MagicMock()
+    mock_agent.attach_llm = AsyncMock(return_value=mock_llm)
+    run_context = RunContext(agent=mock_agent, client=mock_client, logger=MagicMock())
+
+    # Call the function
+    result = await run_test_job(run_context, "http://example.com", "Click go", output_dir=str(tmp_path))
+
+    # Assertions
+    executed_steps = mock_client.post.call_args_list[1].kwargs["json"]["test_plan"]["steps"]
+    assert [step["action"] for step in executed_steps] == ["navigate", "wait", "waitForLoadState", "click", "screenshot"]
+    assert result["test_plan"]["test_plan"]["steps"] == executed_steps
+    assert result["optimizations"]["steps_before"] == 6
+    assert result["optimizations"]["estimated_ms_saved"] > 0
+    assert json.loads((tmp_path / result["run_id"] / "plan.json").read_text())["test_plan"]["steps"] == executed_steps
+
+@pytest.mark.asyncio
+async def test_run_test_job_reuses_page_snapshot(tmp_path):
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": [{"action": "click", "selector": "#go"}]}}
+
+    # Mock the HTTP client, agent and LLM
+    mock_client = AsyncMock(httpx.AsyncClient)
+    navigate_response = MagicMock(status_code=200, text="<button id='go'>Go</button>")
+    execute_response = MagicMock(status_code=200)
+    execute_response.json.return_value = {"success": True, "results": [{"status": "success"}]}
+    mock_client.post.side_effect = [navigate_response, execute_response, execute_response]
+    mock_llm = MagicMock()
+    mock_llm.generate_str = AsyncMock(return_value=json.dumps(plan))
+    mock_agent = MagicMock()
+    mock_agent.attach_llm = AsyncMock(return_value=mock_llm)
+    snapshot_store = SnapshotStore(str(tmp_path / "snapshots"))
+    run_context = RunContext(agent=mock_agent, client=mock_client, logger=MagicMock(), snapshot_store=snapshot_store)
+
+    # Call the function twice within the snapshot TTL
+    first = await run_test_job(run_context, "http://example.com", "Click go", output_dir=str(tmp_path / "first"))
+    second = await run_test_job(run_context, "http://example.com", "Click go", output_dir=str(tmp_path / "second"))
+
+    # Assertions
+    paths = [call.args[0].rsplit("/", 1)[-1] for call in mock_client.post.call_args_list]
+    assert paths == ["navigate", "execute", "execute"]
+    assert first["snapshot"]["reused"] is False
+    assert second["snapshot"] == {"reused": True, "sha256": first["snapshot"]["sha256"], "age": second["snapshot"]["age"]}
+    assert "#go" in mock_llm.generate_str.call_args_list[-1].kwargs["message"]
+
+@pytest.mark.asyncio
+async def test_run_test_job_records_run_history(tmp_path):
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": [{"action": "click", "selector": "#go"}]}}
+
+    # Mock the HTTP client, agent and LLM
+    mock_client = AsyncMock(httpx.AsyncClient)
+    navigate_response = MagicMock(status_code=200, text="<button id='go'>Go</button>")
+    execute_response = MagicMock(status_code=200)
+    execute_response.json.return_value = {"success": True, "results": [{"status": "success"}]}
+    mock_client.post.side_effect = [navigate_response, execute_response, navigate_response]
+    mock_llm = MagicMock()
+    mock_llm.generate_str = AsyncMock(side_effect=[json.dumps(plan)] + ["No plan"] * 3)
+    mock_agent = MagicMock()
+    mock_agent.attach_llm = AsyncMock(return_value=mock_llm)
+    history = RunHistory(str(tmp_path / "history.db"))
+    run_context = RunContext(agent=mock_agent, client=mock_client, logger=MagicMock(), run_history=history)
+
+    # Call the function with a passing run, then a run without a valid plan
+    result = await run_test_job(run_context, "http://example.com", "Click go", output_dir=str(tmp_path), max_retries=1)
+    with pytest.raises(ExecutionError):
+        await run_test_job(run_context, "http://example.com", "Click go", output_dir=str(tmp_path), max_retries=1)
+
+    # Assertions
+    runs = history.list_runs()
+    assert sorted(run["status"] for run in runs) == ["error", "passed"]
+    passed = history.get_run(result["run_id"])
+    assert passed["steps"] == 1
+    assert passed["data"]["test_plan"] == plan
+    assert passed["duration_ms"] == result["metrics"]["stages"]["job"]
+
+@pytest.mark.asyncio
+async def test_run_test_job_routes_llm_providers(tmp_path):
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": [{"action": "click", "selector": "#go"}]}}
+
+    # Mock the HTTP client, agent and an overloaded and a healthy provider
+    mock_client = AsyncMock(httpx.AsyncClient)
+    navigate_response = MagicMock(status_code=200, text="<button id='go'>Go</button>")
+    execute_response = MagicMock(status_code=200)
+    execute_response.json.return_value = {"success": True, "results": [{"status": "success"}]}
+    mock_client.post.side_effect = [navigate_response, execute_response]
+    anthropic_llm = MagicMock()
+    anthropic_llm.generate_str = AsyncMock(side_effect=RuntimeError("Overloaded"))
+    openai_llm = MagicMock()
+    openai_llm.generate_str = AsyncMock(return_value=json.dumps(plan))
+    mock_agent = MagicMock()
+    mock_agent.attach_llm = AsyncMock(side_effect=lambda llm_class: anthropic_llm if llm_class is AnthropicAugmentedLLM else openai_llm)
+    run_context = RunContext(agent=mock_agent, client=mock_client, logger=MagicMock())
+
+    # Call the function
+    result = await run_test_job(run_context, "http://example.com", "Click go", output_dir=str(tmp_path), llm_provider="anthropic,openai")
+
+    # Assertions
+    assert result["test_plan"] == plan
+    assert result["llm_routing"]["failovers"] == 1
+    assert result["llm_routing"]["served"] == {"openai": 1}
+    assert run_context.provider_health.rank({"anthropic": 0.0, "openai": 0.0}) == ["openai", "anthropic"]
+
+@pytest.mark.asyncio
+async def test_run_test_job_rejects_unknown_llm_provider(tmp_path):
+    # Mock the HTTP client and agent
+    mock_client = AsyncMock(httpx.AsyncClient)
+    mock_client.post.return_value = MagicMock(status_code=200, text="<button id='go'>Go</button>")
+    run_context = RunContext(agent=MagicMock(), client=mock_client, logger=MagicMock())
+
+    # Call the function
+    with pytest.raises(ExecutionError, match="Unknown LLM provider"):
+        await run_test_job(run_context, "http://example.com", "Click go", output_dir=str(tmp_path), llm_provider="anthropic,gemini")
+
+@pytest.mark.asyncio
+async def test_get_llm_instance_rejects_unknown_provider():
+    agent = MagicMock()
+    agent.attach_llm = AsyncMock()
+
+    # Call the function and expect an exception, no LLM is attached
+    with pytest.raises(ExecutionError, match="Unknown LLM provider: gemini"):
+        await get_llm_instance(agent, "gemini")
+    agent.attach_llm.assert_not_called()
+    assert get_llm_model_name(MagicMock(), "gemini") is None
+
+@pytest.mark.asyncio
+async def test_run_test_job_fetches_while_agent_starts(tmp_path):
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": []}}
+
+    # Mock the HTTP client, agent and LLM
+    mock_client = AsyncMock(httpx.AsyncClient)
+    navigate_response = MagicMock(status_code=200, text="<button id='go'>Go</button>")
+    execute_response = MagicMock(status_code=200)
+    execute_response.json.return_value = {"result": "success"}
+    mock_client.post.side_effect = [navigate_response, execute_response]
+    mock_llm = MagicMock()
+    mock_llm.generate_str = AsyncMock(side_effect=[json.dumps(plan), "Analysis"])
+    mock_agent = MagicMock()
+    mock_agent.attach_llm = AsyncMock(return_value=mock_llm)
+    run_context = RunContext(agent=mock_agent, client=mock_client, logger=MagicMock(), agent_ready=asyncio.Event())
+
+    # Call the function before the agent is ready
+    job_task = asyncio.create_task(run_test_job(run_context, "http://example.com", "Click go", output_dir=str(tmp_path)))
+    await asyncio.sleep(0.05)
+
+    # The page is fetched, the LLM waits for the agent
+    assert mock_client.post.call_count == 1
+    mock_agent.attach_llm.assert_not_called()
+
+    run_context.agent_ready.set()
+    result = await job_task
+    assert result["test_plan"] == plan
+
+@pytest.mark.asyncio
+async def test_gather_or_cancel():
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def failing():
+        raise ExecutionError("Fetch failed")
+
+    # Call the function and expect an exception
+    with pytest.raises(ExecutionError, match="Fetch failed"):
+        await gather_or_cancel(slow(), failing())
+    await asyncio.sleep(0)
+    assert cancelled.is_set()
+
+def test_load_test_plans(tmp_path):
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": []}}
+    (tmp_path / "login.json").write_text(json.dumps(plan))
+    (tmp_path / "suite_summary.json").write_text(json.dumps({"total": 1}))
+    (tmp_path / "checkout").mkdir()
+    (tmp_path / "checkout" / "plan.json").write_text(json.dumps(plan))
+
+    # Call the function
+    plans = load_test_plans(str(tmp_path))
+
+    # Assertions
+    assert [plan_id for plan_id, _ in plans] == ["login", "checkout"]
+    assert plans[0][1] == plan
+
+def test_load_test_plans_latest_run(tmp_path):
+    old_plan = {"url": "http://example.com", "test_plan": {"description": "Old", "steps": []}}
+    new_plan = {"url": "http://example.com", "test_plan": {"description": "New", "steps": []}}
+    for run_id, plan in [("20250101T120000-00000001", old_plan), ("20250102T120000-00000002", new_plan)]:
+        (tmp_path / "checkout" / run_id).mkdir(parents=True)
+        (tmp_path / "checkout" / run_id / "plan.json").write_text(json.dumps(plan))
+
+    # Call the function with the suite directory and with a single job directory
+    plans = load_test_plans(str(tmp_path))
+    job_plans = load_test_plans(str(tmp_path / "checkout"))
+
+    # Assertions
+    assert plans == [("checkout", new_plan)]
+    assert job_plans == [("checkout", new_plan)]
+
+def test_load_test_plans_missing(tmp_path):
+    # Call the function and expect an exception
+    with pytest.raises(ExecutionError, match="No test plans found"):
+        load_test_plans(str(tmp_path))
+
+@pytest.mark.asyncio
+async def test_replay_test_plan_without_llm():
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": []}}
+
+    # Mock the HTTP client
+    mock_client = AsyncMock(httpx.AsyncClient)
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"result": "success"}
+    mock_client.post.return_value = mock_response
+    run_context = RunContext(agent=None, client=mock_client, logger=MagicMock())
+
+    # Call the function
+    result = await replay_test_plan(run_context, plan, "http://mock-playwright", skip_analysis=True)
+
+    # Assertions
+    assert result.pop("retries")["attempts"] == 1
+    assert "execute" in result.pop("metrics")["stages"]
+    assert result.pop("analysis").startswith("# Test Results Report")
+    assert is_run_id(result.pop("run_id"))
+    assert result == {"test_plan": plan, "results": {"result": "success"}}
+    mock_client.post.assert_called_once_with("http://mock-playwright/execute", json=plan, timeout=300.0)
+
+@pytest.mark.asyncio
+async def test_execute_sharded_test_plan():
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": [
+        {"action": "navigate", "value": "http://example.com"},
+        {"action": "click", "selector": "button:has-text('1')"},
+        {"action": "click", "selector": "button:has-text('AC')"},
+        {"action": "click", "selector": "button:has-text('2')"},
+    ]}}
+
+    # Mock the HTTP client, each segment reports one record per executed step
+    async def post(url, json, timeout):
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"results": [{"status": "success", "url": url} for _ in json["test_plan"]["steps"]]}
+        return response
+    mock_client = AsyncMock(httpx.AsyncClient)
+    mock_client.post.side_effect = post
+
+    # Call the function
+    result = await execute_sharded_test_plan(mock_client, ["http://one", "http://two"], plan, 1, 300, MagicMock())
+
+    # Assertions
+    assert mock_client.post.call_count == 2
+    assert len(result["results"]) == 4
+    assert {shard["endpoint"] for shard in result["shards"]} == {"http://one", "http://two"}
+
+    # Call the function with reset texts that don't occur in the plan
+    mock_client.post.reset_mock()
+    result = await execute_sharded_test_plan(
+        mock_client, ["http://one", "http://two"], plan, 1, 300, MagicMock(), reset_texts=["Start over"]
+    )
+
+    # Assertions, the plan runs unsplit
+    assert mock_client.post.call_count == 1
+    assert "shards" not in result
+
+@pytest.mark.asyncio
+async def test_repair_failed_steps():
+    steps = [
+        {"action": "navigate", "value": "http://example.com"},
+        {"action": "click", "selector": "button:has-text('1')"},
+        {"action": "click", "selector": "button:has-text('AC')"},
+        {"action": "click", "selector": "#missing"},
+        {"action": "check", "selector": ".display", "value": "2"},
+    ]
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": steps}}
+    results = {"results": [{"status": "success"}] * 3 + [{"status": "error", "error": "Element not found"}, {"status": "success"}]}
+
+    # Mock the HTTP client: page source for the fresh inventory, then the resumed execution
+    mock_client = AsyncMock(httpx.AsyncClient)
+    navigate_response = MagicMock(status_code=200, text="<button id='two'>2</button>")
+    execute_response = MagicMock(status_code=200)
+    execute_response.json.return_value = {"results": [{"status": "success"}] * 4}
+    mock_client.post.side_effect = [navigate_response, execute_response]
+    mock_llm = MagicMock()
+    mock_llm.generate_str = AsyncMock(return_value=json.dumps({"steps": [
+        {"action": "click", "selector": "#two"},
+        {"action": "check", "selector": ".display", "value": "2"},
+    ]}))
+    run_context = RunContext(agent=None, client=mock_client, logger=MagicMock())
+
+    # Call the function
+    repaired_plan, repaired_results, repairs = await repair_failed_steps(
+        run_context, mock_llm, "http://example.com", plan, results, ["http://mock-playwright"], 1, 300, 1
+    )
+
+    # Assertions
+    assert repaired_plan["test_plan"]["steps"][3] == {"action": "click", "selector": "#two"}
+    assert repairs == [{"failed_step": 4, "error": "Element not found", "checkpoint": 3, "patched_steps": 2}]
+    assert len(repaired_results["results"]) == 5
+    resumed_steps = mock_client.post.call_args_list[1].kwargs["json"]["test_plan"]["steps"]
+    assert resumed_steps == [steps[0], steps[2], {"action": "click", "selector": "#two"}, steps[4]]
+    assert "#two" in mock_llm.generate_str.call_args.kwargs["message"]
+
+@pytest.mark.asyncio
+async def test_repair_test_plan_ignores_prose_and_fences():
+    steps = [{"action": "click", "selector": "#missing"}]
+    mock_llm = MagicMock()
+    mock_llm.generate_str = AsyncMock(return_value=(
+        'Here are the fixed steps:\n```json\n{"steps": [{"action": "click", "selector": "#two"}]}\n```\nGood luck!'
+    ))
+
+    # Call the function
+    patch_steps = await repair_test_plan(mock_llm, "http://example.com", steps, 0, "Element not found", "- button -> #two", MagicMock())
+
+    # Assertions
+    assert patch_steps == [{"action": "click", "selector": "#two"}]
+
+@pytest.mark.asyncio
+async def test_repair_test_plan_rejects_off_schema_steps():
+    mock_llm = MagicMock()
+    mock_llm.generate_str = AsyncMock(return_value='{"steps": [{"action": "hover", "selector": "#two"}]}')
+
+    # Call the function and expect an exception
+    with pytest.raises(ExecutionError, match="repair response"):
+        await repair_test_plan(mock_llm, "http://example.com", [], 0, "Element not found", "", MagicMock())
+
+def test_check_test_plan_selectors_strict():
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": [
+        {"action": "click", "selector": "#go"},
+        {"action": "click", "selector": "#missing"},
+    ]}}
+
+    # Call the function and expect an exception
+    with pytest.raises(ExecutionError, match="Unresolved selectors in steps 2"):
+        check_test_plan_selectors(plan, "<button id='go'>Go</button>", "strict", MagicMock())
+
+    # Warn mode keeps the plan unchanged
+    assert check_test_plan_selectors(plan, "<button id='go'>Go</button>", "warn", MagicMock()) == plan
+
+STREAMED_PLAN = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": [
+    {"action": "click", "selector": "#one"},
+    {"action": "check", "selector": ".display", "value": "1"},
+    {"action": "screenshot"},
+    {"action": "click", "selector": "#clear"},
+]}}
+
+@pytest.mark.asyncio
+async def test_execute_test_plan_streaming():
+    # Serve the streaming protocol from a local stub with large screenshots
+    async with StubPlaywrightService(screenshot_bytes=100000) as stub:
+        async with httpx.AsyncClient() as client:
+            # Call the function
+            result = await execute_test_plan_streaming(client, stub.url, STREAMED_PLAN, 1, 30, MagicMock())
+
+    # Assertions
+    assert result["success"] is True
+    assert result["total_steps"] == 4
+    assert [record["step"] for record in result["results"]] == [1, 2, 3, 4]
+    assert result["results"][2]["screenshot"] == {"omitted_bytes": 133336}
+    assert stub.requests == ["/execute/stream"]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stream_results", [False, True])
+async def test_execute_sharded_test_plan_stores_artifacts(tmp_path, stream_results):
+    artifacts = ArtifactStore(str(tmp_path))
+
+    # Serve a large screenshot from a local stub
+    async with StubPlaywrightService(screenshot_bytes=100000) as stub:
+        async with httpx.AsyncClient() as client:
+            # Call the function
+            result = await execute_sharded_test_plan(
+                client, [stub.url], STREAMED_PLAN, 1, 30, MagicMock(), stream_results, artifacts=artifacts
+            )
+
+    # Assertions
+    reference = result["results"][2]["screenshot"]
+    assert reference["bytes"] == 100000
+    with open(artifacts.path(reference), "rb") as f:
+        assert f.read() == b"\0" * 100000
+    assert result["results"][1]["actual"] == "1"
+    assert artifacts.stats()["stored"] == 1
+
+@pytest.mark.asyncio
+async def test_execute_sharded_test_plan_keeps_long_errors(tmp_path):
+    artifacts = ArtifactStore(str(tmp_path))
+    error = "Timeout 30000ms exceeded waiting for selector .display\n" + "  - waiting for locator('.display') to be visible\n" * 40
+    screenshot = base64.b64encode(b"\x89PNG" + b"\0" * 4000).decode("ascii")
+
+    # Mock the HTTP client, the check step fails with a long error and a screenshot
+    mock_client = AsyncMock(httpx.AsyncClient)
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"success": False, "results": [
+        {"status": "success"}, {"status": "error", "error": error, "screenshot": screenshot}, {"status": "success"}, {"status": "success"}
+    ]}
+    mock_client.post.return_value = mock_response
+
+    # Call the function
+    result = await execute_sharded_test_plan(
+        mock_client, ["http://mock-playwright"], STREAMED_PLAN, 1, 30, MagicMock(), artifacts=artifacts
+    )
+
+    # Assertions
+    record = result["results"][1]
+    assert record["error"] == error
+    assert record["screenshot"]["artifact"].endswith(".png")
+    assert f"- Step 2 (check): {error}" in build_results_report(STREAMED_PLAN, result)
+    context_error = failure_context(STREAMED_PLAN, result)["steps"][-1]["record"]["error"]
+    assert context_error.startswith(error[:500])
+    assert artifacts.stats()["stored"] == 1
+
+@pytest.mark.asyncio
+async def test_execute_test_plan_streaming_fail_fast():
+    async with StubPlaywrightService(failing_steps={2}) as stub:
+        async with httpx.AsyncClient() as client:
+            # Call the function
+            result = await execute_test_plan_streaming(client, stub.url, STREAMED_PLAN, 1, 30, MagicMock(), fail_fast=True)
+
+    # Assertions
+    assert result["success"] is False
+    assert result["aborted"] is True
+    assert len(result["results"]) == 2
+
+@pytest.mark.asyncio
+async def test_execute_test_plan_streaming_fail_fast_closes_stream(monkeypatch):
+    closed = []
+
+    # Mock the stream, the service would keep executing steps until it is closed
+    async def stream_test_plan(client, playwright_url, test_plan, timeout, logger):
+        try:
+            yield {"status": "success", "action": "click"}
+            yield {"status": "error", "action": "check", "error": "Expected 1"}
+            yield {"status": "success", "action": "screenshot"}
+        finally:
+            closed.append(True)
+    monkeypatch.setattr(main, "stream_test_plan", stream_test_plan)
+
+    # Call the function
+    result = await execute_test_plan_streaming(MagicMock(), "http://mock-playwright", STREAMED_PLAN, 1, 30, MagicMock(), fail_fast=True)
+
+    # Assertions, the stream is closed before the function returns
+    assert result["aborted"] is True
+    assert closed == [True]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status_code, requests", [(400, 1), (404, 1), (429, 3), (503, 3)])
+async def test_execute_test_plan_streaming_retries_transient_errors(status_code, requests):
+    calls = []
+
+    # Serve an error status for every streaming request
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(status_code, text="Error")
+    retry_controller = RetryController(RetryPolicy(base_delay=0))
+
+    # Call the function and expect an exception
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        with pytest.raises(ExecutionError, match=f"HTTP {status_code} error"):
+            await execute_test_plan_streaming(client, "http://mock-playwright", STREAMED_PLAN, 2, 30, MagicMock(), retry_controller=retry_controller)
+
+    # Assertions, like execute_test_plan only 429 and 5xx are retried
+    assert len(calls) == requests
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("streaming", [False, True])
+async def test_rejected_probe_releases_circuit(streaming):
+    # Open the circuit, the next call is the half open trial call
+    retry_controller = RetryController(RetryPolicy(base_delay=0), breakers=CircuitBreakerRegistry(failure_threshold=2, reset_timeout=0))
+    for _ in range(2):
+        retry_controller.record_failure("http://mock-playwright")
+    execute = execute_test_plan_streaming if streaming else execute_test_plan
+
+    # Call the function and expect an exception, the service rejects the plan
+    async with httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(400, text="Error"))) as client:
+        with pytest.raises(ExecutionError, match="HTTP 400 error"):
+            await execute(client, "http://mock-playwright", STREAMED_PLAN, 2, 30, MagicMock(), retry_controller=retry_controller)
+
+    # Assertions, the service answered so the circuit closes again
+    breaker = retry_controller.breakers.get("http://mock-playwright")
+    assert breaker.state == "closed"
+    assert breaker.probe_started is None
+
+@pytest.mark.asyncio
+async def test_analyze_results_explains_failures_only():
+    plan = STREAMED_PLAN
+    failed = {"success": False, "results": [
+        {"status": "success"}, {"status": "success", "actual": "1"}, {"status": "error", "error": "Timeout"}, {"status": "success"}
+    ]}
+    mock_llm = MagicMock()
+    mock_llm.generate_str = AsyncMock(return_value="The screenshot timed out.")
+
+    # Call the function for passing and failing results
+    passed_analysis = await analyze_results(mock_llm, {"success": True, "results": [{"status": "success"}] * 4}, MagicMock(), plan_json=plan)
+    failed_analysis = await analyze_results(mock_llm, failed, MagicMock(), plan_json=plan)
+
+    # Assertions
+    assert "Failure Analysis" not in passed_analysis
+    assert "- Step 3 (screenshot): Timeout" in failed_analysis
+    assert failed_analysis.endswith("## Failure Analysis\n\nThe screenshot timed out.\n")
+    mock_llm.generate_str.assert_called_once()
+    assert '"failed_steps": [\n    3\n  ]' in mock_llm.generate_str.call_args.kwargs["message"]
+
+@pytest.mark.asyncio
+async def test_run_test_on_website_stops_job_when_agent_fails(monkeypatch):
+    job_started = asyncio.Event()
+    job_cancelled = []
+
+    async def run_test_job(*args):
+        job_started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            job_cancelled.append(True)
+            raise
+
+    # Mock the MCP application and an agent that fails to start
+    @contextlib.asynccontextmanager
+    async def run():
+        yield MagicMock()
+    async def start_agent(*args):
+        await job_started.wait()
+        raise RuntimeError("MCP server failed")
+    test_agent = MagicMock()
+    test_agent.__aenter__ = AsyncMock(side_effect=start_agent)
+    monkeypatch.setattr(main.app, "run", run)
+    monkeypatch.setattr(main, "create_test_agent", lambda: test_agent)
+    monkeypatch.setattr(main, "run_test_job", run_test_job)
+
+    # Call the function
+    result = await run_test_on_website("http://example.com", "Test", "http://mock-playwright", "output")
+
+    # Assertions
+    assert result["error"].startswith("Unexpected error")
+    assert job_cancelled == [True]
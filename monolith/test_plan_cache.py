@@ -0,0 +1,89 @@
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import plan_cache
+from plan_cache import PlanCache, make_plan_cache_key
+
+PLAN = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": []}}
+
+def test_plan_cache_hit_and_miss(tmp_path):
+    cache = PlanCache(str(tmp_path))
+    key = make_plan_cache_key("http://example.com", "- button -> #go", "Click go", "anthropic", "haiku")
+
+    # A miss before the plan is stored, a hit afterwards
+    assert cache.get(key) is None
+    cache.put(key, PLAN)
+    assert cache.get(key) == PLAN
+
+    # Assertions
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "hit_rate": 0.5}
+
+def test_plan_cache_key_normalization():
+    # Whitespace differences don't change the key
+    key = make_plan_cache_key("http://example.com", "- button  -> #go\n\n", "Click  go", "Anthropic", "haiku")
+    assert key == make_plan_cache_key("http://example.com", "- button -> #go", "Click go", "anthropic", "haiku")
+
+    # Any input that influences the plan does
+    assert key != make_plan_cache_key("http://example.com", "- button -> #go", "Click go", "openai", "haiku")
+    assert key != make_plan_cache_key("http://example.com", "- button -> #stop", "Click go", "anthropic", "haiku")
+
+def test_plan_cache_expiry(tmp_path, monkeypatch):
+    clock = [time.time()]
+    monkeypatch.setattr(plan_cache, "time", SimpleNamespace(time=lambda: clock[0]))
+    cache = PlanCache(str(tmp_path), max_age=60)
+    cache.put("old", PLAN)
+
+    # Age the entry past the maximum age
+    clock[0] += 120
+
+    # Assertions
+    path = os.path.join(str(tmp_path), "old.plan.json")
+    assert cache.get("old") is None
+    assert not os.path.exists(path)
+
+def test_plan_cache_expiry_ignores_hits(tmp_path, monkeypatch):
+    clock = [time.time()]
+    monkeypatch.setattr(plan_cache, "time", SimpleNamespace(time=lambda: clock[0]))
+    cache = PlanCache(str(tmp_path), max_age=60)
+    cache.put("busy", PLAN)
+
+    # Hits within the maximum age don't extend the plan's lifetime
+    for _ in range(3):
+        clock[0] += 20
+        assert cache.get("busy") == PLAN
+    clock[0] += 1
+
+    # Assertions
+    assert cache.get("busy") is None
+    assert cache.stats()["hits"] == 3
+
+def test_plan_cache_legacy_entry_expiry(tmp_path):
+    cache = PlanCache(str(tmp_path), max_age=60)
+
+    # Entries without a creation time fall back to the modification time
+    path = os.path.join(str(tmp_path), "legacy.plan.json")
+    with open(path, "w") as f:
+        json.dump(PLAN, f)
+    assert cache.get("legacy") == PLAN
+    stale = time.time() - 120
+    os.utime(path, (stale, stale))
+
+    # Assertions
+    assert cache.get("legacy") is None
+    assert not os.path.exists(path)
+
+def test_plan_cache_eviction(tmp_path):
+    cache = PlanCache(str(tmp_path), max_entries=2)
+    for index, key in enumerate(["a", "b", "c"]):
+        cache.put(key, PLAN)
+        timestamp = time.time() - 100 + index
+        os.utime(os.path.join(str(tmp_path), f"{key}.plan.json"), (timestamp, timestamp))
+    cache.evict()
+
+    # Assertions
+    assert cache.get("a") is None
+    assert cache.get("b") == PLAN
+    assert cache.get("c") == PLAN
+    assert cache.evictions == 1
@@ -0,0 +1,96 @@
+import json
+import pytest
+from plan_optimizer import DEFAULT_PLAN_OPTIMIZATIONS, PlanOptimizerError, optimize_test_plan, parse_optimizations
+
+def make_plan(steps):
+    return {"url": "http://example.com", "test_plan": {"description": "Test", "steps": steps}}
+
+def test_parse_optimizations():
+    # Call the function
+    rules = parse_optimizations("collapse_waits, max_screenshots=2")
+
+    # Assertions
+    assert rules == {"collapse_waits": None, "max_screenshots": 2}
+    assert parse_optimizations("none") == {}
+    assert list(parse_optimizations(DEFAULT_PLAN_OPTIMIZATIONS)) == ["collapse_waits", "drop_noop_navigations", "dedupe_screenshots"]
+    with pytest.raises(PlanOptimizerError, match="Unknown plan optimization"):
+        parse_optimizations("drop_checks")
+    with pytest.raises(PlanOptimizerError, match="screenshot count"):
+        parse_optimizations("max_screenshots")
+
+def test_replace_sleeps_and_collapse_waits():
+    plan = make_plan([
+        {"action": "navigate", "value": "http://example.com"},
+        {"action": "waitForLoadState", "value": "load"},
+        {"action": "wait", "value": "3000"},
+        {"action": "waitForLoadState"},
+        {"action": "wait", "selector": "#result"},
+        {"action": "click", "selector": "#go"},
+        {"action": "wait", "value": "500"},
+        {"action": "check", "selector": ".toast", "value": "Saved"},
+    ])
+
+    # Call the function
+    optimized, report = optimize_test_plan(plan, parse_optimizations("replace_sleeps,collapse_waits"))
+
+    # Assertions
+    assert optimized["test_plan"]["steps"] == [
+        {"action": "navigate", "value": "http://example.com"},
+        {"action": "waitForLoadState", "value": "networkidle"},
+        {"action": "wait", "selector": "#result"},
+        {"action": "click", "selector": "#go"},
+        {"action": "wait", "value": "500"},
+        {"action": "check", "selector": ".toast", "value": "Saved"},
+    ]
+    assert report.rules["replace_sleeps"]["steps"] == [3]
+    assert report.rules["collapse_waits"]["steps"] == [2, 4]
+    assert report.estimated_ms_saved == 2900 + 200
+    assert len(plan["test_plan"]["steps"]) == 8
+
+def test_collapse_waits_keeps_sleeps():
+    plan = make_plan([{"action": "wait", "value": "500"}, {"action": "wait", "value": "500"}])
+
+    # Call the function without replacing sleeps
+    optimized, report = optimize_test_plan(plan, parse_optimizations("collapse_waits"))
+
+    # Assertions
+    assert optimized == plan
+    assert not report.changed
+
+def test_drop_noop_navigations():
+    plan = make_plan([
+        {"action": "navigate", "value": "http://example.com/"},
+        {"action": "check", "selector": "h1", "value": "Home"},
+        {"action": "navigate", "value": "http://example.com"},
+        {"action": "click", "selector": "#go"},
+        {"action": "navigate", "value": "http://example.com"},
+    ])
+
+    # Call the function
+    optimized, report = optimize_test_plan(plan, parse_optimizations("drop_noop_navigations"))
+
+    # Assertions
+    assert [step["action"] for step in optimized["test_plan"]["steps"]] == ["navigate", "check", "click", "navigate"]
+    assert report.rules["drop_noop_navigations"]["steps"] == [3]
+
+def test_dedupe_and_cap_screenshots():
+    plan = make_plan([
+        {"action": "click", "selector": "#one"},
+        {"action": "screenshot"},
+        {"action": "check", "selector": ".display", "value": "1"},
+        {"action": "screenshot"},
+        {"action": "click", "selector": "#two"},
+        {"action": "screenshot"},
+        {"action": "click", "selector": "#three"},
+        {"action": "screenshot"},
+    ])
+
+    # Call the function
+    optimized, report = optimize_test_plan(plan, parse_optimizations("dedupe_screenshots,max_screenshots=2"))
+
+    # Assertions
+    assert [step["action"] for step in optimized["test_plan"]["steps"]].count("screenshot") == 2
+    assert report.rules["dedupe_screenshots"]["steps"] == [4]
+    assert report.rules["max_screenshots"]["steps"] == [8]
+    assert report.to_dict()["steps_after"] == 6
+    assert json.dumps(report.to_dict())
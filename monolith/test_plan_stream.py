@@ -0,0 +1,72 @@
+import pytest
+from plan_stream import PlanStreamError, PlanStreamParser
+
+PLAN = (
+    'Here is the test plan:\n```json\n'
+    '{"url": "http://example.com", "test_plan": {"description": "Add {1} + 2", "steps": ['
+    '{"action": "navigate", "value": "http://example.com"}, '
+    '{"action": "check", "selector": "#display", "value": "say \\"3\\""}]}}'
+    '\n```\nLet me know if you need anything else.'
+)
+
+def test_parse_streamed_plan():
+    steps = []
+    parser = PlanStreamParser(on_step=steps.append)
+
+    # Feed the plan in small chunks
+    done = [parser.feed(PLAN[start:start + 5]) for start in range(0, len(PLAN), 5)]
+    plan = parser.close()
+
+    # Assertions
+    assert plan["test_plan"]["description"] == "Add {1} + 2"
+    assert steps == plan["test_plan"]["steps"]
+    assert steps[1]["value"] == 'say "3"'
+    assert done.index(True) < len(done) - 1
+
+def test_parse_steps_as_they_arrive():
+    steps = []
+    parser = PlanStreamParser(on_step=steps.append)
+
+    # Feed the plan up to the end of the first step
+    parser.feed(PLAN[:PLAN.index("}, ") + 1])
+
+    # Assertions
+    assert steps == [{"action": "navigate", "value": "http://example.com"}]
+    assert not parser.done
+
+@pytest.mark.parametrize("response,message", [
+    ('{"test_plan": {"steps": {"action": "click"}}}', "is not an array"),
+    ('{"test_plan": {"steps": [{"action": "hover"}', "unknown action"),
+    ('{"test_plan": {"steps": ["click #go"', "not an object"),
+    ('{"url": "http://example.com"]', "Unbalanced"),
+    ("I cannot create a test plan for this page." * 100, "No JSON object"),
+])
+def test_parse_aborts_off_schema(response, message):
+    parser = PlanStreamParser()
+
+    # Call the function and expect an exception
+    with pytest.raises(PlanStreamError, match=message):
+        parser.feed(response)
+
+@pytest.mark.parametrize("response,message", [
+    ("Invalid JSON", "No JSON object"),
+    ('{"test_plan": {"steps": [', "incomplete"),
+    ('{"url": "http://example.com"}', "no test_plan.steps array"),
+])
+def test_close_without_plan(response, message):
+    parser = PlanStreamParser()
+    parser.feed(response)
+
+    # Call the function and expect an exception
+    with pytest.raises(PlanStreamError, match=message):
+        parser.close()
+
+def test_parse_custom_steps_path():
+    parser = PlanStreamParser(steps_path=("steps",))
+
+    # Call the function
+    parser.feed('{"steps": [{"action": "click", "selector": "#go"}]}')
+
+    # Assertions
+    assert parser.close() == {"steps": [{"action": "click", "selector": "#go"}]}
+    assert parser.steps == [{"action": "click", "selector": "#go"}]
@@ -0,0 +1,63 @@
+from report import build_results_report, failure_context, has_failures
+
+PLAN = {
+    "url": "http://example.com",
+    "test_plan": {
+        "description": "Calculator addition",
+        "steps": [
+            {"action": "navigate", "value": "http://example.com"},
+            {"action": "click", "selector": "button:has-text('1')"},
+            {"action": "click", "selector": "button:has-text('+')"},
+            {"action": "click", "selector": "button:has-text('1')"},
+            {"action": "check", "selector": ".display", "value": "2"},
+            {"action": "screenshot"},
+        ]
+    }
+}
+
+
+def test_build_results_report_passed():
+    results = {"success": True, "results": [{"status": "success"}] * 4 + [{"status": "success", "actual": "2"}, {"status": "success"}]}
+
+    report = build_results_report(PLAN, results)
+
+    assert "- **Outcome:** Passed" in report
+    assert "- **Success Rate:** 100%" in report
+    assert "- **Screenshots:** 1" in report
+    assert "| 5 | .display | 2 | 2 | ✅ |" in report
+    assert "## Errors" not in report
+
+def test_build_results_report_failed():
+    results = {"success": False, "results": [{"status": "success"}] * 4 + [{"status": "error", "actual": "11", "error": "Expected 2"}]}
+
+    report = build_results_report(PLAN, results)
+
+    assert "- **Outcome:** Failed" in report
+    assert "- **Not Reported:** 1" in report
+    assert "| 5 | .display | 2 | 11 | ❌ |" in report
+    assert "- Step 5 (check): Expected 2" in report
+    assert "| 2 | click | button:has-text('1') |  | ✅ passed |" in report
+
+def test_has_failures():
+    assert not has_failures({"result": "success"})
+    assert has_failures({"success": False})
+    assert has_failures({"results": [{"status": "failed"}]})
+
+def test_failure_context_trims_to_failing_steps():
+    results = {"results": [{"status": "success"}] * 4 + [{"status": "error", "screenshot": "x" * 5000}]}
+
+    context = failure_context(PLAN, results, context_steps=1)
+
+    assert context["failed_steps"] == [5]
+    assert [step["number"] for step in context["steps"]] == [4, 5]
+    assert context["steps"][1]["record"]["screenshot"] == {"omitted_bytes": 5000}
+
+def test_failure_context_truncates_long_errors():
+    error = "Timeout 30000ms exceeded.\nCall log:\n" + "  - waiting for locator('#missing')\n" * 40
+    results = {"results": [{"status": "success"}] * 4 + [{"status": "error", "error": error}]}
+
+    context = failure_context(PLAN, results)
+
+    record = context["steps"][-1]["record"]
+    assert record["error"].startswith("Timeout 30000ms exceeded.\nCall log:")
+    assert record["error"].endswith(f"... [{len(error) - 512} more characters]")
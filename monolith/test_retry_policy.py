@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+from retry_policy import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    RetryController,
+    RetryPolicy,
+    is_retryable_llm_error,
+    parse_retry_after,
+)
+
+
+class RateLimitError(Exception):
+    pass
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+def test_retry_policy_delay():
+    policy = RetryPolicy(base_delay=1, max_delay=5, jitter=False)
+
+    assert [policy.delay(attempt) for attempt in range(4)] == [1, 2, 4, 5]
+    assert policy.delay(0, retry_after=120) == policy.max_retry_after
+    assert 0 <= RetryPolicy(base_delay=1).delay(3) <= 8
+
+def test_retry_budget():
+    budget = RetryBudget(2)
+
+    assert [budget.try_acquire() for _ in range(3)] == [True, True, False]
+
+def test_circuit_breaker_opens_and_half_opens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    # The reset timeout has passed, one trial call goes through
+    assert breaker.allow() is True
+    assert breaker.state == "half_open"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.stats()["opened"] == 2
+
+    breaker.reset_timeout = 60
+    assert breaker.allow() is False
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_admits_one_trial_call():
+    controller = RetryController(RetryPolicy(base_delay=0))
+    breaker = controller.breakers.get("http://playwright")
+    breaker.reset_timeout = 0.05
+    for _ in range(5):
+        controller.record_failure("http://playwright")
+    await asyncio.sleep(0.06)
+    calls = []
+
+    async def operation():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    # Call the function from concurrent callers once the reset timeout passed
+    outcomes = await asyncio.gather(
+        *(controller.call("http://playwright", operation, 0, is_retryable_llm_error) for _ in range(5)),
+        return_exceptions=True,
+    )
+
+    # Assertions
+    assert len(calls) == 1
+    assert outcomes.count("ok") == 1
+    assert sum(isinstance(outcome, CircuitOpenError) for outcome in outcomes) == 4
+    assert breaker.state == "closed"
+    assert breaker.allow() is True
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_releases_trial_call_on_rejection():
+    controller = RetryController(RetryPolicy(base_delay=0))
+    breaker = controller.breakers.get("llm")
+    breaker.reset_timeout = 0
+    for _ in range(5):
+        controller.record_failure("llm")
+
+    async def operation():
+        raise ValueError("bad request")
+
+    # Call the function, the trial call fails with a non retryable error
+    with pytest.raises(ValueError):
+        await controller.call("llm", operation, 3, is_retryable_llm_error)
+
+    # Assertions, the endpoint answered so the circuit closes again
+    assert breaker.state == "closed"
+    assert breaker.probe_started is None
+
+def test_is_retryable_llm_error():
+    assert is_retryable_llm_error(RateLimitError("slow down"))
+    assert not is_retryable_llm_error(ValueError("bad request"))
+
+@pytest.mark.asyncio
+async def test_retry_controller_call():
+    controller = RetryController(RetryPolicy(base_delay=0))
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RateLimitError("slow down")
+        return "ok"
+
+    # Call the function
+    result = await controller.call("llm", flaky, 2, is_retryable_llm_error)
+
+    # Assertions
+    assert result == "ok"
+    assert controller.stats()["retries"] == 2
+    assert controller.stats()["budget_remaining"] == 8
+
+@pytest.mark.asyncio
+async def test_retry_controller_fails_fast_when_circuit_open():
+    controller = RetryController(RetryPolicy(base_delay=0), RetryBudget(1))
+    for _ in range(5):
+        controller.record_failure("http://playwright")
+
+    async def operation():
+        return "never called"
+
+    with pytest.raises(CircuitOpenError):
+        await controller.call("http://playwright", operation, 3, is_retryable_llm_error)
+    assert controller.stats()["circuit_rejections"] == 1
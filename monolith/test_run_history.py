@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import time
+from run_history import RunHistory, make_test_key
+from run_output import make_run_id
+
+def make_test_data(failed=False, job_ms=1000.0, started_at=None, screenshot=None):
+    record = {"status": "failed" if failed else "success", "action": "click"}
+    if screenshot:
+        record["screenshot"] = screenshot
+    return {
+        "test_plan": {"url": "http://example.com", "test_plan": {"description": "Test", "steps": [{"action": "click", "selector": "#go"}]}},
+        "results": {"success": not failed, "results": [record]},
+        "metrics": {"started_at": started_at or time.time(), "stages": {"job": job_ms, "plan": job_ms / 2}},
+    }
+
+def test_record_and_get_run(tmp_path):
+    history = RunHistory(str(tmp_path / "history.db"))
+    run_id = make_run_id()
+
+    # Call the function
+    history.record_run(run_id, "http://example.com", "Click go", make_test_data(screenshot="a" * 5000), "passed")
+    run = history.get_run(run_id)
+
+    # Assertions
+    assert run["status"] == "passed"
+    assert run["duration_ms"] == 1000.0
+    assert run["steps"] == 1
+    assert run["failed_steps"] == 0
+    assert run["test_key"] == make_test_key(" http://example.com", "Click  go")
+    assert run["data"]["test_plan"]["test_plan"]["description"] == "Test"
+    assert run["data"]["results"]["results"][0]["screenshot"] == {"omitted_bytes": 5000}
+    assert history.get_run("missing") is None
+
+def test_list_runs(tmp_path):
+    history = RunHistory(str(tmp_path / "history.db"))
+    history.record_run("1", "http://example.com", "Click go", make_test_data(started_at=time.time() - 10), "passed")
+    history.record_run("2", "http://example.com", "Click go", make_test_data(failed=True), "failed")
+    history.record_run("3", "http://other.com", "Search", {}, "error", error="Failed to navigate")
+
+    # Call the function
+    runs = history.list_runs()
+    failed = history.list_runs(status="failed")
+    other = history.list_runs(url="http://other.com")
+
+    # Assertions
+    assert [run["run_id"] for run in runs][0] != "1"
+    assert len(runs) == 3
+    assert [run["run_id"] for run in failed] == ["2"]
+    assert failed[0]["failed_steps"] == 1
+    assert other[0]["error"] == "Failed to navigate"
+    assert "data" not in runs[0]
+    assert history.stats()["runs"] == 3
+
+def test_flaky_tests(tmp_path):
+    history = RunHistory(str(tmp_path / "history.db"))
+    now = time.time()
+    for index, status in enumerate(["passed", "failed", "passed", "failed"]):
+        history.record_run(f"flaky-{index}", "http://example.com", "Click go", make_test_data(started_at=now - 100 + index), status)
+    for index in range(4):
+        history.record_run(f"stable-{index}", "http://example.com", "Search", make_test_data(started_at=now - 100 + index), "passed")
+    history.record_run("error", "http://example.com", "Click go", make_test_data(started_at=now), "error")
+
+    # Call the function
+    flaky = history.flaky_tests()
+
+    # Assertions
+    assert len(flaky) == 1
+    assert flaky[0]["description"] == "Click go"
+    assert flaky[0]["runs"] == 4
+    assert flaky[0]["flip_rate"] == 1.0
+    assert flaky[0]["pass_rate"] == 0.5
+
+def test_latency_trend(tmp_path):
+    history = RunHistory(str(tmp_path / "history.db"))
+    now = time.time()
+    for index, job_ms in enumerate([100.0, 200.0, 300.0]):
+        history.record_run(str(index), "http://example.com", "Click go", make_test_data(job_ms=job_ms, started_at=now - index), "passed")
+    history.record_run("old", "http://example.com", "Click go", make_test_data(started_at=now - 40 * 86400), "passed")
+
+    # Call the function
+    trend = history.latency_trend(url="http://example.com", days=30)
+    plan_trend = history.latency_trend(stage="plan", days=30)
+
+    # Assertions
+    assert sum(day["runs"] for day in trend) == 3
+    assert trend[-1]["p95_ms"] == 290.0
+    assert sum(day["runs"] for day in plan_trend) == 3
+
+def test_retention(tmp_path):
+    history = RunHistory(str(tmp_path / "history.db"), max_runs=3, max_age_days=1)
+    now = time.time()
+    history.record_run("old", "http://example.com", "Click go", make_test_data(started_at=now - 2 * 86400), "passed")
+
+    # Call the function
+    for index in range(5):
+        history.record_run(str(index), "http://example.com", "Click go", make_test_data(started_at=now + index), "passed")
+
+    # Assertions
+    assert [run["run_id"] for run in history.list_runs()] == ["4", "3", "2"]
+    with sqlite3.connect(str(tmp_path / "history.db")) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM stage_timings").fetchone()[0] == 6
+
+def test_compact(tmp_path):
+    history = RunHistory(str(tmp_path / "history.db"), max_runs=None)
+    for index in range(50):
+        history.record_run(str(index), "http://example.com", "Click go", make_test_data(screenshot=os.urandom(2000).hex()), "passed")
+    history.max_runs = 1
+
+    # Call the function
+    history.apply_retention()
+
+    # Assertions
+    assert history.stats()["runs"] == 1
+    assert not history.compact()
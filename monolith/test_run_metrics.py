@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from run_metrics import RunMetrics, activate_run_metrics, current_run_metrics, percentile, to_otel_spans, to_prometheus
+
+
+def make_metrics():
+    metrics = RunMetrics()
+    with metrics.span("job"):
+        with metrics.span("plan"):
+            metrics.record_llm_call("x" * 400, "y" * 40, 0.5)
+        metrics.record_transfer(100, 2000)
+    return metrics
+
+def test_spans_and_llm_calls():
+    data = make_metrics().to_dict({"retries": 2})
+
+    assert set(data["stages"]) == {"job", "plan"}
+    assert data["spans"][1]["parent_span_id"] == data["spans"][0]["span_id"]
+    assert data["llm"]["details"][0]["stage"] == "plan"
+    assert data["llm"]["prompt_tokens"] == 100
+    assert data["bytes_received"] == 2000
+    assert data["retries"] == 2
+    json.dumps(data)
+
+def test_span_records_errors():
+    metrics = RunMetrics()
+    with pytest.raises(ValueError):
+        with metrics.span("fetch"):
+            raise ValueError("boom")
+
+    assert metrics.spans[0]["status"] == "error"
+    assert metrics.spans[0]["duration_ms"] is not None
+
+def test_activate_run_metrics():
+    metrics = RunMetrics()
+    with activate_run_metrics(metrics):
+        assert current_run_metrics() is metrics
+    assert current_run_metrics() is None
+
+def test_to_prometheus():
+    text = to_prometheus(make_metrics().to_dict(), {"url": 'http://example.com/?q="a"'})
+
+    assert 'qe_agent_stage_duration_seconds{stage="plan",url="http://example.com/?q=\\"a\\""}' in text
+    assert 'qe_agent_bytes_received_total{url="http://example.com/?q=\\"a\\""} 2000' in text
+
+def test_to_otel_spans():
+    data = make_metrics().to_dict()
+
+    spans = to_otel_spans(data, {"url": "http://example.com"})
+
+    assert [span["name"] for span in spans] == ["job", "plan"]
+    assert spans[1]["parentSpanId"] == spans[0]["spanId"]
+    assert int(spans[0]["endTimeUnixNano"]) >= int(spans[0]["startTimeUnixNano"])
+    assert {"key": "url", "value": {"stringValue": "http://example.com"}} in spans[0]["attributes"]
+
+def test_percentile():
+    values = [4, 1, 3, 2]
+
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4
+    assert percentile([], 90) == 0.0
@@ -0,0 +1,59 @@
+import os
+
+from run_output import is_run_id, latest_run_file, list_run_dirs, make_run_id, prune_run_dirs, run_output_dir, run_started_at, write_text_atomic
+
+
+def test_make_run_id():
+    # Call the function
+    run_id = make_run_id()
+
+    # Assertions
+    assert is_run_id(run_id)
+    assert run_id != make_run_id()
+    assert not is_run_id("checkout")
+
+def test_latest_run_file(tmp_path):
+    for run_id in ["20250101T120000-00000001", "20250102T120000-00000002", "20250103T120000-00000003"]:
+        os.makedirs(run_output_dir(str(tmp_path), run_id))
+    (tmp_path / "20250101T120000-00000001" / "plan.json").write_text("first")
+    (tmp_path / "20250102T120000-00000002" / "plan.json").write_text("second")
+    (tmp_path / "checkout").mkdir()
+
+    # Call the function
+    path = latest_run_file(str(tmp_path), "plan.json")
+
+    # Assertions
+    assert path == str(tmp_path / "20250102T120000-00000002" / "plan.json")
+    assert len(list_run_dirs(str(tmp_path))) == 3
+    assert latest_run_file(str(tmp_path), "missing.json") is None
+    assert latest_run_file(str(tmp_path / "missing"), "plan.json") is None
+
+def test_prune_run_dirs(tmp_path):
+    new_run_ids = [make_run_id() for _ in range(3)]
+    for run_id in ["20200101T120000-00000001"] + new_run_ids:
+        os.makedirs(run_output_dir(str(tmp_path), run_id))
+        (tmp_path / run_id / "plan.json").write_text("{}")
+    (tmp_path / "checkout").mkdir()
+
+    # Call the function
+    removed = prune_run_dirs(str(tmp_path), max_runs=2, max_age_days=30)
+
+    # Assertions
+    assert str(tmp_path / "20200101T120000-00000001") in removed
+    assert len(removed) == 2
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(path) for path in list_run_dirs(str(tmp_path))] + ["checkout"])
+    assert len(list_run_dirs(str(tmp_path))) == 2
+    assert run_started_at("20200101T120000-00000001") == 1577880000.0
+    assert prune_run_dirs(str(tmp_path)) == []
+
+def test_write_text_atomic(tmp_path):
+    path = str(tmp_path / "plan.json")
+    write_text_atomic(path, "old")
+
+    # Call the function
+    write_text_atomic(path, "new")
+
+    # Assertions
+    with open(path) as f:
+        assert f.read() == "new"
+    assert os.listdir(tmp_path) == ["plan.json"]
@@ -0,0 +1,81 @@
+import selector_index
+from dom_extract import extract_element_inventory
+from selector_index import PageIndexBuilder, check_plan_selectors, get_page_index, parse_page_index, parse_selector
+
+PAGE_SOURCE = """<html><body><div class="calculator"><div class="display">0</div>
+<button>1</button><button>+</button><button class="btn clear">C</button>
+<input id="email" name="email"><a href="/services">Services</a>
+<script>document.write('<button>hidden</button>')</script></div></body></html>"""
+
+def test_resolve_selectors():
+    page_index = get_page_index(PAGE_SOURCE)
+
+    # Assertions
+    assert page_index.resolve("button:has-text('1')") == {"status": "resolved", "matches": 1}
+    assert page_index.resolve(".display")["status"] == "resolved"
+    assert page_index.resolve("input[name=\"email\"]")["status"] == "resolved"
+    assert page_index.resolve("a:has-text(\"services\")")["status"] == "resolved"
+    assert page_index.resolve("div.calculator > button.clear")["status"] == "resolved"
+    assert page_index.resolve("button:has-text('9')")["status"] == "unresolved"
+    assert page_index.resolve("button:has-text('hidden')")["status"] == "unresolved"
+    assert page_index.resolve("//div[@class='display']")["status"] == "unsupported"
+
+def test_page_index_is_cached():
+    # The same page source reuses the same index and its resolutions
+    assert get_page_index(PAGE_SOURCE) is get_page_index(PAGE_SOURCE)
+
+def test_page_index_cache_is_bounded_by_bytes(monkeypatch):
+    monkeypatch.setattr(selector_index, "PAGE_INDEX_CACHE_MAX_BYTES", len(PAGE_SOURCE) * 2)
+    pages = [PAGE_SOURCE.replace("Services", f"Page {index}") for index in range(3)]
+
+    # Call the function for more pages than fit, and for a page over the limit
+    indexes = [get_page_index(page) for page in pages]
+    large_page = PAGE_SOURCE * 3
+
+    # Assertions
+    assert get_page_index(pages[-1]) is indexes[-1]
+    assert get_page_index(pages[0]) is not indexes[0]
+    assert get_page_index(large_page) is not get_page_index(large_page)
+    assert selector_index._page_index_cache_bytes <= len(PAGE_SOURCE) * 2
+
+def test_page_index_from_inventory_parse():
+    builder = PageIndexBuilder()
+
+    # Call the function, the index is built from the parse of the inventory
+    extract_element_inventory(PAGE_SOURCE, listeners=[builder])
+    page_index = builder.build()
+
+    # Assertions
+    assert page_index.nodes == parse_page_index(PAGE_SOURCE).nodes
+    assert page_index.resolve("div.calculator > button.clear") == {"status": "resolved", "matches": 1}
+    assert page_index.resolve("button:has-text('hidden')")["status"] == "unresolved"
+    report = check_plan_selectors({"test_plan": {"steps": [{"action": "click", "selector": "#emial"}]}}, PAGE_SOURCE, page_index=page_index)
+    assert report["issues"][0]["suggestion"] == "#email"
+
+def test_parse_selector():
+    # Call the function
+    parsed = parse_selector("button.primary[type=submit]:has-text(\"Go\")")
+
+    # Assertions
+    assert parsed == {"tag": "button", "ids": [], "classes": ["primary"], "attrs": [("type", "=", "submit")], "texts": [("Go", False)]}
+    assert parse_selector("button >> text=Go") is None
+
+def test_check_plan_selectors_auto_correct():
+    plan = {"url": "http://example.com", "test_plan": {"description": "Test", "steps": [
+        {"action": "navigate", "value": "http://example.com"},
+        {"action": "type", "selector": "#emial", "value": "a@b.c"},
+        {"action": "click", "selector": "a.nav:has-text('Services')"},
+        {"action": "click", "selector": "#does-not-exist"},
+    ]}}
+
+    # Call the function
+    report = check_plan_selectors(plan, PAGE_SOURCE, auto_correct=True)
+
+    # Assertions
+    steps = report["plan"]["test_plan"]["steps"]
+    assert steps[1]["selector"] == "#email"
+    assert steps[2]["selector"] == 'a:has-text("Services")'
+    assert steps[3]["selector"] == "#does-not-exist"
+    assert [issue["step"] for issue in report["issues"]] == [2, 3, 4]
+    assert report["counts"]["corrected"] == 2
+    assert plan["test_plan"]["steps"][1]["selector"] == "#emial"
@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+import pytest
+
+from service import TestJobService
+
+async def http_request(port, method, path, payload=None):
+    # Send a raw HTTP request and return the status code and body
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), head.decode(), content
+
+@pytest.mark.asyncio
+async def test_service_runs_submitted_job():
+    release = asyncio.Event()
+
+    async def runner(job):
+        await release.wait()
+        return {"results": {"url": job["url"]}}
+
+    service = TestJobService(runner, workers=1)
+    server = await service.serve(port=0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        # Submit a job
+        status, _, content = await http_request(port, "POST", "/jobs", {"url": "http://example.com", "description": "Click go"})
+        job = json.loads(content)
+        assert status == 202
+        assert job["status"] == "queued"
+
+        # Stream its events while it finishes
+        events_task = asyncio.create_task(http_request(port, "GET", f"/jobs/{job['id']}/events"))
+        await asyncio.sleep(0.05)
+        release.set()
+        status, head, content = await events_task
+
+        # Assertions
+        assert status == 200
+        assert "Transfer-Encoding: chunked" in head
+        assert b'"status": "running"' in content
+        assert b'"status": "completed"' in content
+
+        status, _, content = await http_request(port, "GET", f"/jobs/{job['id']}")
+        assert json.loads(content)["result"] == {"results": {"url": "http://example.com"}}
+    finally:
+        server.close()
+        await service.stop()
+
+@pytest.mark.asyncio
+async def test_service_rejects_invalid_job():
+    service = TestJobService(None, workers=0)
+    server = await service.serve(port=0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        # Call the API with invalid requests
+        status, _, content = await http_request(port, "POST", "/jobs", {"url": "http://example.com"})
+        assert status == 422
+        assert "missing 'description'" in json.loads(content)["error"]
+
+        status, _, _ = await http_request(port, "GET", "/jobs/unknown")
+        assert status == 404
+    finally:
+        server.close()
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from sharding import LeastLoadedScheduler, is_reset_step, merge_segment_results, split_test_plan
+
+PLAN = {
+    "url": "http://example.com",
+    "test_plan": {
+        "description": "Calculator",
+        "steps": [
+            {"action": "navigate", "value": "http://example.com"},
+            {"action": "waitForLoadState"},
+            {"action": "click", "selector": "button:has-text('1')"},
+            {"action": "check", "selector": ".display", "value": "1"},
+            {"action": "click", "selector": "button:has-text('Clear')"},
+            {"action": "click", "selector": "button:has-text('2')"},
+            {"action": "check", "selector": ".display", "value": "2"},
+        ]
+    }
+}
+
+def test_split_test_plan():
+    # Call the function
+    segments = split_test_plan(PLAN)
+
+    # Assertions
+    assert [(segment.start, len(segment.steps)) for segment in segments] == [(0, 4), (4, 3)]
+    assert segments[0].prefix == []
+    assert segments[1].prefix == PLAN["test_plan"]["steps"][:2]
+    assert segments[1].to_plan(PLAN)["test_plan"]["steps"] == PLAN["test_plan"]["steps"][:2] + PLAN["test_plan"]["steps"][4:]
+
+def test_split_test_plan_keeps_dependent_steps_together():
+    plan = {"url": "http://example.com", "test_plan": {"description": "Checkout", "steps": [
+        {"action": "navigate", "value": "http://example.com/login"},
+        {"action": "click", "selector": "button:has-text('Log in')"},
+        {"action": "navigate", "value": "http://example.com/account"},
+        {"action": "click", "selector": "a:has-text('C')"},
+        {"action": "check", "selector": ".status", "value": "Signed in"},
+    ]}}
+
+    # Call the function
+    segments = split_test_plan(plan)
+
+    # Assertions
+    assert [(segment.start, len(segment.steps)) for segment in segments] == [(0, 5)]
+
+def test_split_example_plan():
+    with open(os.path.join(os.path.dirname(__file__), "output", "plan.json")) as f:
+        plan = json.load(f)
+
+    # Call the function, the calculator is reset with button:has-text('C')
+    segments = split_test_plan(plan)
+
+    # Assertions
+    assert len(segments) == 6
+    assert all(segment.steps[0]["selector"] == "button:has-text('C')" for segment in segments[1:])
+
+def test_is_reset_step_single_character():
+    def click(selector):
+        return {"action": "click", "selector": selector}
+
+    # Assertions, a single character only counts on a button with exactly that text
+    assert is_reset_step(click("button:has-text('C')"))
+    assert is_reset_step(click("[role=button]:text-is('C')"))
+    assert not is_reset_step(click("a:has-text('C')"))
+    assert not is_reset_step(click("button:has-text('c')"))
+    assert not is_reset_step(click("#keypad button:has-text('C')"))
+    assert not is_reset_step(click("button:has-text('C') >> nth=1"))
+    assert is_reset_step(click("div:has-text('Clear')"))
+
+def test_split_test_plan_custom_reset_texts():
+    plan = {"url": "http://example.com", "test_plan": {"description": "Form", "steps": [
+        {"action": "fill", "selector": "#name", "value": "Ada"},
+        {"action": "click", "selector": "button:has-text('Start over')"},
+        {"action": "click", "selector": "button:has-text('C')"},
+    ]}}
+
+    # Call the function with the default and with custom reset texts
+    default_segments = split_test_plan(plan)
+    custom_segments = split_test_plan(plan, reset_texts=["Start over"])
+
+    # Assertions
+    assert [segment.start for segment in default_segments] == [0, 2]
+    assert [segment.start for segment in custom_segments] == [0, 1]
+
+def test_merge_segment_results():
+    segments = split_test_plan(PLAN)
+    first = {"success": True, "results": [{"step": i, "status": "success"} for i in range(1, 5)]}
+    second = {"success": True, "results": [{"step": i, "status": "success"} for i in range(1, 6)]}
+
+    # Call the function with one successful and one failed shard
+    merged = merge_segment_results(segments, [
+        {"endpoint": "http://one", "results": first},
+        {"endpoint": "http://two", "results": second},
+    ])
+    failed = merge_segment_results(segments, [
+        {"endpoint": "http://one", "results": first},
+        {"endpoint": "http://two", "error": "Request timed out"},
+    ])
+
+    # Assertions
+    assert len(merged["results"]) == 7
+    assert merged["success"] is True
+    assert [shard["endpoint"] for shard in merged["shards"]] == ["http://one", "http://two"]
+    assert failed["success"] is False
+    assert [record["step"] for record in failed["results"]] == [1, 2, 3, 4, 5, 6, 7]
+    assert failed["results"][4]["error"] == "Request timed out"
+
+@pytest.mark.asyncio
+async def test_least_loaded_scheduler():
+    scheduler = LeastLoadedScheduler(["http://one", "http://two"])
+    used = []
+
+    async def work():
+        async with scheduler.slot() as endpoint:
+            used.append(endpoint)
+            await asyncio.sleep(0.01)
+
+    # Call the scheduler with more work than endpoints
+    await asyncio.gather(*(work() for _ in range(4)))
+
+    # Assertions
+    assert sorted(used) == ["http://one", "http://one", "http://two", "http://two"]
+    assert scheduler.in_flight == {"http://one": 0, "http://two": 0}
@@ -0,0 +1,91 @@
+import gzip
+import os
+import time
+from dom_extract import extract_element_inventory
+from snapshot_store import SnapshotStore, diff_inventories, inventory_signature, snapshot_key
+
+PAGE = "<body><button id='go'>Go</button><a href='/about'>About</a><input name='q' placeholder='Search'></body>"
+CHANGED_PAGE = "<body><button id='go'>Start</button><input name='q' placeholder='Search'><a href='/help'>Help</a></body>"
+
+def test_put_and_get(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+
+    # Call the function
+    update = store.put("http://example.com", PAGE)
+    snapshot = store.get("http://example.com")
+
+    # Assertions
+    assert not update.changed
+    assert update.diff is None
+    assert snapshot.page_source == PAGE
+    assert snapshot.age < 5
+    path = tmp_path / f"{snapshot_key('http://example.com')}.html.gz"
+    assert gzip.decompress(path.read_bytes()).decode("utf-8") == PAGE
+    assert store.get("http://example.com/other") is None
+    assert store.stats()["hits"] == 1
+
+def test_get_expired(tmp_path):
+    store = SnapshotStore(str(tmp_path), ttl=0.05)
+    store.put("http://example.com", PAGE)
+
+    # Wait for the snapshot to expire
+    time.sleep(0.1)
+
+    # Assertions
+    assert store.get("http://example.com") is None
+    assert store.stats()["misses"] == 1
+
+def test_put_changed_page(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.put("http://example.com", PAGE)
+
+    # Call the function with an unchanged, then a changed page
+    unchanged = store.put("http://example.com", PAGE)
+    changed = store.put("http://example.com", CHANGED_PAGE)
+
+    # Assertions
+    assert not unchanged.changed
+    assert changed.changed
+    assert changed.previous_sha256 == unchanged.sha256
+    assert [line for line in changed.diff["added"] if "Help" in line]
+    assert [line for line in changed.diff["removed"] if "About" in line]
+    assert len(changed.diff["changed"]) == 1
+    assert "Start" in changed.diff["changed"][0]["after"]
+    assert changed.diff["unchanged"] == 1
+    assert store.get("http://example.com").page_source == CHANGED_PAGE
+
+def test_diff_inventories_unchanged():
+    signature = inventory_signature(extract_element_inventory(PAGE))
+
+    # Call the function
+    diff = diff_inventories(signature, signature)
+
+    # Assertions
+    assert diff == {"added": [], "removed": [], "changed": [], "unchanged": 3}
+
+def test_evict(tmp_path):
+    store = SnapshotStore(str(tmp_path), max_entries=2)
+
+    # Store more pages than the store keeps
+    for index in range(3):
+        store.put(f"http://example.com/{index}", PAGE)
+        os.utime(tmp_path / f"{snapshot_key(f'http://example.com/{index}')}.meta.json", (index, index))
+    store.evict()
+
+    # Assertions
+    assert store.get("http://example.com/0") is None
+    assert store.get("http://example.com/2") is not None
+    assert len(os.listdir(tmp_path)) == 4
+
+def test_put_uses_extracted_inventory(tmp_path, monkeypatch):
+    store = SnapshotStore(str(tmp_path))
+    store.put("http://example.com", PAGE)
+    inventory = extract_element_inventory(CHANGED_PAGE, max_bytes=200)
+
+    # Call the function with the inventory extracted for planning, the page is not parsed again
+    monkeypatch.setattr("snapshot_store.extract_element_inventory", None)
+    update = store.put("http://example.com", CHANGED_PAGE, inventory)
+
+    # Assertions
+    assert update.changed
+    assert [line for line in update.diff["added"] if "Help" in line]
@@ -0,0 +1,60 @@
+import pytest
+
+from suite import load_suite_manifest, summarize_suite
+
+def test_load_suite_manifest_yaml(tmp_path):
+    manifest = tmp_path / "suite.yaml"
+    manifest.write_text("""
+defaults:
+  timeout: 120
+jobs:
+  - id: calculator addition
+    url: https://example.com/calc
+    description: Calculate 1+1
+  - url: https://example.com/form
+    description: Submit the form
+    timeout: 30
+""")
+
+    # Call the function
+    jobs = load_suite_manifest(str(manifest))
+
+    # Assertions
+    assert [job["id"] for job in jobs] == ["calculator-addition", "job-002"]
+    assert jobs[0]["timeout"] == 120
+    assert jobs[1]["timeout"] == 30
+
+def test_load_suite_manifest_jsonl(tmp_path):
+    manifest = tmp_path / "suite.jsonl"
+    manifest.write_text('{"url": "https://example.com", "description": "Click go"}\n\n'
+                        '{"id": "two", "url": "https://example.com", "description": "Click stop"}\n')
+
+    # Call the function
+    jobs = load_suite_manifest(str(manifest))
+
+    # Assertions
+    assert [job["id"] for job in jobs] == ["job-001", "two"]
+
+def test_load_suite_manifest_invalid(tmp_path):
+    manifest = tmp_path / "suite.yaml"
+    manifest.write_text("- url: https://example.com\n")
+
+    # Call the function and expect an exception
+    with pytest.raises(ValueError, match="missing 'description'"):
+        load_suite_manifest(str(manifest))
+
+    manifest.write_text("- {url: a, description: b, browser: firefox}\n")
+    with pytest.raises(ValueError, match="unknown settings: browser"):
+        load_suite_manifest(str(manifest))
+
+def test_summarize_suite():
+    # Call the function
+    summary = summarize_suite([
+        {"id": "one", "output_dir": "output/one", "result": {"results": {}}},
+        {"id": "two", "output_dir": "output/two", "result": {"error": "HTTP 500 error"}},
+    ])
+
+    # Assertions
+    assert summary["total"] == 2
+    assert summary["completed"] == 1
+    assert summary["jobs"][1] == {"id": "two", "status": "error", "output_dir": "output/two", "error": "HTTP 500 error"}